@@ -1,9 +1,10 @@
-"""
-Axion Language Interpreter Package
-Exposes main components for external use.
-"""
-
-from .cli import main
-from .lexer import tokenization
-from .parser import parser
-from .interpreter import Interpreter, Env
+"""
+Axion Language Interpreter Package
+Exposes main components for external use.
+"""
+
+from .cli import main
+from .lexer import tokenization
+from .parser import parser
+from .interpreter import Interpreter, Env
+from .embed import compile, Program
@@ -0,0 +1,253 @@
+"""
+AST node classes emitted by `axion.parser`.
+
+Every node is a small `__slots__` object whose class attribute `type` holds
+the node type name used throughout the implementation ("BinaryOp",
+"IDENTIFIER", ...). Fields are set positionally in the order listed in
+`__slots__`. `to_dict()` converts a tree back to the plain dict layout the
+parser used to produce, for tools that still consume it. Nodes compare by
+identity; compare `to_dict()` results to compare trees.
+
+Statements also carry `line`, the 1-based source line they start on, which
+the parser sets and the profiler reports time against. It is declared on
+`Statement` rather than in each class's `__slots__`, so it is not a field
+and is left out of `to_dict()`.
+
+`else` is a Python keyword, so the else branches of `if` and `match` are
+stored as `orelse` and renamed back to "else" by `to_dict()`.
+"""
+
+
+class Node:
+    __slots__ = ()
+    type = None
+
+    def __init_subclass__(cls):
+        # Generate a plain `__init__(self, a=None, b=None, ...)` per class:
+        # the parser builds nodes by the hundred thousand, and a generic
+        # setattr loop dominated parse time.
+        slots = cls.__slots__
+        params = "".join(f", {name}=None" for name in slots)
+        body = "".join(f"\n    self.{name} = {name}" for name in slots) or "\n    pass"
+        namespace = {}
+        exec(f"def __init__(self{params}):{body}", namespace)
+        cls.__init__ = namespace["__init__"]
+
+    def fields(self):
+        return [(name, getattr(self, name)) for name in self.__slots__]
+
+    def to_dict(self):
+        d = {} if self.type is None else {"type": self.type}
+        for name, value in self.fields():
+            d[DICT_KEYS.get(name, name)] = to_dict(value)
+        return d
+
+    def __repr__(self):
+        inner = ", ".join(f"{name}={value!r}" for name, value in self.fields())
+        return f"{self.__class__.__name__}({inner})"
+
+
+DICT_KEYS = {"orelse": "else"}
+
+
+def to_dict(value):
+    if isinstance(value, Node):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_dict(v) for v in value]
+    return value
+
+
+# -- statements -------------------------------------------------------------
+
+class Statement(Node):
+    __slots__ = ('line',)
+
+
+class Program(Node):
+    __slots__ = ('body',)
+    type = 'Program'
+
+
+class VarDecl(Statement):
+    __slots__ = ('name', 'value')
+    type = 'VarDecl'
+
+
+class ConstDecl(Statement):
+    __slots__ = ('name', 'value')
+    type = 'ConstDecl'
+
+
+class ExpressionStatement(Statement):
+    __slots__ = ('expr',)
+    type = 'ExpressionStatement'
+
+
+class IO(Statement):
+    # log/logln use `expr`; input uses `target` and `message`.
+    __slots__ = ('action', 'expr', 'target', 'message')
+    type = 'IO'
+
+    def fields(self):
+        if self.action == 'input':
+            return [('action', self.action), ('target', self.target), ('message', self.message)]
+        return [('action', self.action), ('expr', self.expr)]
+
+
+class IfStatement(Statement):
+    __slots__ = ('condition', 'body', 'elseifs', 'orelse')
+    type = 'IfStatement'
+
+
+class ElseIf(Node):
+    __slots__ = ('condition', 'body')
+
+
+class FuncDecl(Statement):
+    # `memo` is None for a plain function; for `memo func` it is the size
+    # given as `memo(<size>)`, or 0 for the default size.
+    __slots__ = ('name', 'params', 'body', 'memo')
+    type = 'FuncDecl'
+
+
+class ReturnStatement(Statement):
+    __slots__ = ('expr',)
+    type = 'ReturnStatement'
+
+
+class BreakStatement(Statement):
+    __slots__ = ()
+    type = 'BreakStatement'
+
+
+class SkipStatement(Statement):
+    __slots__ = ()
+    type = 'SkipStatement'
+
+
+class ForLoop(Statement):
+    __slots__ = ('var', 'start', 'end', 'step', 'body')
+    type = 'ForLoop'
+
+
+class ForInLoop(Statement):
+    __slots__ = ('var', 'iterable', 'body')
+    type = 'ForInLoop'
+
+
+class WhileLoop(Statement):
+    __slots__ = ('condition', 'body')
+    type = 'WhileLoop'
+
+
+class DoWhileLoop(Statement):
+    __slots__ = ('condition', 'body')
+    type = 'DoWhileLoop'
+
+
+class MatchStatement(Statement):
+    __slots__ = ('expr', 'cases', 'orelse')
+    type = 'MatchStatement'
+
+
+class Case(Node):
+    __slots__ = ('value', 'body')
+    type = 'Case'
+
+
+class ElseCase(Node):
+    __slots__ = ('body',)
+    type = 'ElseCase'
+
+
+class Include(Statement):
+    __slots__ = ('path',)
+    type = 'Include'
+
+
+# -- expressions ------------------------------------------------------------
+
+class Number(Node):
+    __slots__ = ('value',)
+    type = 'NUMBER'
+
+
+class String(Node):
+    __slots__ = ('value',)
+    type = 'STRING'
+
+
+class Constant(Node):
+    # A literal already converted to its Python value; produced by
+    # `axion.optimizer`, never by the parser.
+    __slots__ = ('value',)
+    type = 'Constant'
+
+
+class Template(Node):
+    # An interpolated string literal: `parts` mixes literal str segments
+    # with expression nodes. `value` keeps the raw text for to_dict().
+    __slots__ = ('value', 'parts')
+    type = 'Template'
+
+    def to_dict(self):
+        return {"type": "STRING", "value": self.value}
+
+
+class Identifier(Node):
+    __slots__ = ('value',)
+    type = 'IDENTIFIER'
+
+
+class MemberAccess(Node):
+    __slots__ = ('object', 'property')
+    type = 'MemberAccess'
+
+
+class BinaryOp(Node):
+    __slots__ = ('op', 'left', 'right')
+    type = 'BinaryOp'
+
+
+class UnaryOp(Node):
+    __slots__ = ('op', 'expr')
+    type = 'UnaryOp'
+
+
+class Assignment(Node):
+    __slots__ = ('target', 'op', 'value')
+    type = 'Assignment'
+
+
+class Call(Node):
+    __slots__ = ('callee', 'args')
+    type = 'Call'
+
+
+class ArrayLiteral(Node):
+    __slots__ = ('elements',)
+    type = 'ArrayLiteral'
+
+
+class MapLiteral(Node):
+    # Parallel lists: keys[i] maps to values[i].
+    __slots__ = ('keys', 'values')
+    type = 'MapLiteral'
+
+
+class Index(Node):
+    __slots__ = ('target', 'index')
+    type = 'Index'
+
+
+STATEMENTS = (
+    VarDecl, ConstDecl, ExpressionStatement, IO, IfStatement, FuncDecl,
+    ReturnStatement, BreakStatement, SkipStatement, ForLoop, ForInLoop, WhileLoop,
+    DoWhileLoop, MatchStatement, Include,
+)
+
+EXPRESSIONS = (
+    Number, String, Constant, Template, Identifier, MemberAccess, BinaryOp, UnaryOp,
+    Assignment, Call, ArrayLiteral, MapLiteral, Index,
+)
@@ -0,0 +1,164 @@
+"""
+Batch runner behind `axion run-many`.
+
+Runs many scripts on a pool of worker processes. Each worker imports the
+engines and loads the standard library (native modules imported, Axion
+modules parsed and compiled) once, when it starts, and then runs one job
+after another:
+
+* the job's standard output is captured, and its standard input is empty;
+* a job that runs longer than its timeout is stopped (on platforms with
+  SIGALRM);
+* the status, exit code, output, error and run time of every job are
+  returned to the parent, in the order the jobs were given.
+
+Exit codes follow `axion run` conventions where it has them: 0 for a job
+that ran to the end, 1 for an error and 124 for a timeout, as with
+timeout(1).
+"""
+
+import io
+import os
+import sys
+import time
+import signal
+import contextlib
+import importlib.resources
+from concurrent.futures import ProcessPoolExecutor
+
+from axion.cache import load_program, load_code, preload
+from axion.native import find_module
+
+OK, ERROR, TIMEOUT = "ok", "error", "timeout"
+EXIT_CODES = {OK: 0, ERROR: 1, TIMEOUT: 124}
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class Job:
+    __slots__ = ('file', 'timeout')
+
+    def __init__(self, file, timeout=None):
+        self.file = file
+        self.timeout = timeout
+
+
+def read_manifest(filename, default_timeout=None):
+    """Jobs from a JSON list whose entries are script paths or objects with
+    "file" and optionally "timeout" (seconds). Relative paths are relative
+    to the manifest."""
+    import json
+    with open(filename, "r") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{filename}: expected a JSON list of jobs")
+    base = os.path.dirname(os.path.abspath(filename))
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"file": entry}
+        if not isinstance(entry, dict) or "file" not in entry:
+            raise ValueError(f"{filename}: a job needs a \"file\": {entry!r}")
+        jobs.append(Job(os.path.join(base, entry["file"]), entry.get("timeout", default_timeout)))
+    return jobs
+
+
+# -- worker side ---------------------------------------------------------------
+
+# Set by init_worker() in each worker process.
+WORKER = {}
+
+
+def preload_stdlib(opt_level, kinds):
+    stdlib = importlib.resources.files("axion.stdlib")
+    for entry in sorted(stdlib.iterdir(), key=lambda e: e.name):
+        name, ext = os.path.splitext(entry.name)
+        if name.startswith("_"):
+            continue
+        if ext == ".py":
+            find_module(name)
+        elif ext == ".ax":
+            preload(name, opt_level, kinds)
+
+
+def init_worker(engine, opt_level, use_cache):
+    WORKER.update(engine=engine, options=dict(opt_level=opt_level, use_cache=use_cache))
+    preload_stdlib(opt_level, ("code",) if engine == "vm" else ("ast",))
+
+
+def alarm(signum, frame):
+    raise JobTimeout()
+
+
+def execute(filename):
+    from axion.cli import ENGINES
+    engine, options = WORKER["engine"], WORKER["options"]
+    with open(filename, "r") as f:
+        source = f.read()
+    if engine == "vm":
+        ENGINES[engine](code=load_code(source, filename, **options), **options).run()
+    else:
+        ENGINES[engine](load_program(source, filename, **options), **options).run()
+
+
+def run_job(job):
+    """Run one job in this worker and return its result dict."""
+    output = io.StringIO()
+    timer = job.timeout and hasattr(signal, "setitimer")
+    status, error = OK, None
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            sys.stdin = io.StringIO()
+            if timer:
+                signal.signal(signal.SIGALRM, alarm)
+                signal.setitimer(signal.ITIMER_REAL, job.timeout)
+            try:
+                execute(job.file)
+            finally:
+                if timer:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+    except JobTimeout:
+        status, error = TIMEOUT, f"timed out after {job.timeout} s"
+    except RecursionError:
+        status, error = ERROR, "maximum recursion depth exceeded"
+    except Exception as e:
+        status, error = ERROR, str(e)
+    finally:
+        sys.stdin = sys.__stdin__
+    return {
+        "file": job.file,
+        "status": status,
+        "exit_code": EXIT_CODES[status],
+        "seconds": time.perf_counter() - start,
+        "output": output.getvalue(),
+        "error": error,
+    }
+
+
+# -- parent side ---------------------------------------------------------------
+
+def run_many(jobs, workers=None, engine="vm", opt_level=1, use_cache=True):
+    """Run `jobs` on `workers` processes (default: one per CPU) and return
+    their results in order, plus the wall time of the whole batch."""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(engine, opt_level, use_cache)) as pool:
+        # Small jobs are sent in chunks to keep the per-job IPC cost down.
+        chunksize = max(1, len(jobs) // (workers * 8))
+        results = list(pool.map(run_job, jobs, chunksize=chunksize))
+    return results, time.perf_counter() - start
+
+
+def summary(results, wall):
+    counts = {status: 0 for status in EXIT_CODES}
+    for result in results:
+        counts[result["status"]] += 1
+    busy = sum(result["seconds"] for result in results)
+    rate = len(results) / wall if wall else 0.0
+    return (f"{len(results)} jobs: {counts[OK]} ok, {counts[ERROR]} failed, "
+            f"{counts[TIMEOUT]} timed out in {wall:.2f} s "
+            f"({rate:.1f} jobs/s, {busy:.2f} s in jobs)")
@@ -0,0 +1,231 @@
+"""
+Benchmark runner behind `axion bench`.
+
+Each benchmark is an .ax program, by default the ones in the
+`axion.corpus` package plus a large generated program that mostly exercises
+the lexer and parser. Every sample runs the program from source through
+four timed phases:
+
+    lex       tokenize the source
+    parse     build the AST
+    compile   optimize, then compile (vm) or transpile (py)
+    execute   run it, with output discarded
+
+After `warmup` untimed runs, `repeat` samples are taken and the median and
+standard deviation of each phase reported. Results can be written as JSON
+and compared against an earlier JSON file: a phase whose median grew by
+more than the threshold is a regression.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import importlib.resources
+import statistics
+import contextlib
+
+from axion.lexer import tokenize
+from axion.parser import parser
+from axion.optimizer import optimize
+from axion.cache import VERSION
+
+PHASES = ("lex", "parse", "compile", "execute")
+GENERATED = "generated_source"
+# Phases faster than this are too noisy to flag as regressions.
+NOISE_FLOOR = 0.0005
+
+CHUNK = """func weigh_{n}(a, b) {
+    set t = a * 3 + b % 7 - (a << 1);
+    if (t > 10 both a != b) then {
+        return t - 1;
+    } else if (t < 0) then {
+        return -t;
+    }
+    return t + 1;
+}
+set value_{n} = weigh_{n}({n}, 2);
+set label_{n} = "value {value_{n}} of {n}";
+/* block comment {n} */
+loop (i from 1 to 2 step 1) { value_{n} += i; }
+"""
+
+
+def generated_source(kb):
+    """An executable program of about `kb` kilobytes."""
+    parts = []
+    length = 0
+    n = 0
+    while length < kb * 1024:
+        chunk = CHUNK.replace("{n}", str(n))
+        parts.append(chunk)
+        length += len(chunk)
+        n += 1
+    return "".join(parts)
+
+
+def find_benchmarks(paths, source_kb):
+    """Return [(name, source)] for the .ax files in `paths` (files or
+    directories); with no paths, the default corpus and generated source."""
+    if not paths:
+        return sorted(corpus() + [(GENERATED, generated_source(source_kb))])
+    benchmarks = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".ax"))
+        else:
+            files = [path]
+        for filename in files:
+            with open(filename, "r") as f:
+                name = os.path.splitext(os.path.basename(filename))[0]
+                benchmarks.append((name, f.read()))
+    return sorted(benchmarks)
+
+
+def corpus():
+    """[(name, source)] for the programs of the `axion.corpus` package."""
+    benchmarks = []
+    for entry in importlib.resources.files("axion.corpus").iterdir():
+        name, ext = os.path.splitext(entry.name)
+        if ext == ".ax":
+            benchmarks.append((name, entry.read_text()))
+    return benchmarks
+
+
+def compile_for(engine, program, opt_level):
+    if opt_level:
+        program = optimize(program)
+    if engine == "vm":
+        from axion.compiler import compile_program
+        return compile_program(program)
+    if engine == "py":
+        from axion.transpile import CompiledModule
+        return CompiledModule(program)
+    return program
+
+
+def execute(engine, compiled, opt_level):
+    options = dict(opt_level=opt_level, use_cache=False)
+    if engine == "vm":
+        from axion.vm import VM
+        VM(code=compiled, **options).run()
+    elif engine == "py":
+        from axion.transpile import PyEngine
+        PyEngine(None, **options).execute(compiled)
+    else:
+        from axion.interpreter import Interpreter
+        Interpreter(compiled, **options).run()
+
+
+def sample(source, engine, opt_level):
+    """Run `source` once and return the seconds spent in each phase."""
+    clock = time.perf_counter
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = clock()
+        tokens = list(tokenize(source))
+        lexed = clock()
+        program = parser(tokens).parse_program()
+        parsed = clock()
+        compiled = compile_for(engine, program, opt_level)
+        built = clock()
+        execute(engine, compiled, opt_level)
+        done = clock()
+    return {"lex": lexed - start, "parse": parsed - lexed,
+            "compile": built - parsed, "execute": done - built}
+
+
+def summarize(samples):
+    summary = {}
+    for phase in PHASES + ("total",):
+        if phase == "total":
+            values = [sum(s.values()) for s in samples]
+        else:
+            values = [s[phase] for s in samples]
+        summary[phase] = {
+            "median": statistics.median(values),
+            "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+            "min": min(values),
+            "samples": values,
+        }
+    return summary
+
+
+def run_benchmarks(benchmarks, engine="vm", warmup=1, repeat=5, opt_level=1, progress=None):
+    """Return the JSON-ready results of running every benchmark."""
+    results = {}
+    for name, source in benchmarks:
+        if progress:
+            progress(name)
+        try:
+            for _ in range(warmup):
+                sample(source, engine, opt_level)
+            results[name] = summarize([sample(source, engine, opt_level) for _ in range(repeat)])
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return {
+        "engine": engine,
+        "opt_level": opt_level,
+        "warmup": warmup,
+        "repeat": repeat,
+        "axion": VERSION,
+        "python": platform.python_version(),
+        "implementation": sys.implementation.name,
+        "benchmarks": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return (name, phase, old, new) for every phase whose median grew by
+    more than `threshold` (a fraction) over the baseline."""
+    regressions = []
+    old_results = baseline.get("benchmarks", {})
+    for name, phases in results["benchmarks"].items():
+        old_phases = old_results.get(name)
+        if "error" in phases or not old_phases or "error" in old_phases:
+            continue
+        for phase in PHASES + ("total",):
+            old = old_phases[phase]["median"]
+            new = phases[phase]["median"]
+            if new >= NOISE_FLOOR and new > old * (1 + threshold):
+                regressions.append((name, phase, old, new))
+    return regressions
+
+
+def save(results, filename):
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+
+def load(filename):
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def change(old, new):
+    return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+
+
+def format_report(results, baseline=None):
+    out = io.StringIO()
+    header = "".join(f"{phase + ' ms':>18}" for phase in PHASES + ("total",))
+    out.write(f"{'benchmark':<20}{header}")
+    out.write(f"{'vs baseline':>14}\n" if baseline else "\n")
+    old_results = (baseline or {}).get("benchmarks", {})
+    for name, phases in results["benchmarks"].items():
+        out.write(f"{name:<20}")
+        if "error" in phases:
+            out.write(f"  error: {phases['error']}\n")
+            continue
+        for phase in PHASES + ("total",):
+            stats = phases[phase]
+            cell = f"{stats['median'] * 1000:.2f} ±{stats['stdev'] * 1000:.2f}"
+            out.write(f"{cell:>18}")
+        if baseline:
+            old = old_results.get(name)
+            if old and "error" not in old:
+                out.write(f"{change(old['total']['median'], phases['total']['median']):>14}")
+        out.write("\n")
+    return out.getvalue()
@@ -0,0 +1,172 @@
+"""
+On-disk cache of parsed and compiled Axion programs.
+
+Like CPython's `__pycache__`, results are stored next to the source in a
+`__axcache__` directory, one file per source file, engine artifact and
+optimization level:
+
+    __axcache__/math.ax.axion-0.3.cpython-311.opt1.ast
+
+Each file starts with a header holding the cache format, the interpreter
+version, the optimization level, the artifact kind, the SHA-256 of the
+source it was built from and a fingerprint of every native module the
+source includes, since the optimizer runs their pure functions ahead of
+time. A file whose header does not match is rebuilt and overwritten.
+Writes go to a temporary file in the same directory that is then renamed
+over the old entry, so concurrent runs never see a partially written file.
+A directory that cannot be written to simply disables caching for that
+file.
+
+Long-running processes can also `preload()` artifacts, usually of the
+standard library, into memory so that later includes skip even the disk.
+"""
+
+import os
+import sys
+import pickle
+import hashlib
+import tempfile
+
+from axion.lexer import tokenize
+from axion.parser import parser
+from axion.optimizer import optimize
+from axion.runtime import module_file
+from axion.native import fingerprint
+
+CACHE_DIR = "__axcache__"
+# Bump when the AST classes, the bytecode or the header format change.
+VERSION = "0.8"
+MAGIC = b"AXC1"
+
+
+def source_hash(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def cache_path(filename, opt_level, kind):
+    directory = os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR)
+    tag = sys.implementation.cache_tag
+    name = f"{os.path.basename(filename)}.axion-{VERSION}.{tag}.opt{opt_level}.{kind}"
+    return os.path.join(directory, name)
+
+
+def natives_match(natives):
+    return all(fingerprint(path) == digest for path, digest in natives)
+
+
+def native_includes(program):
+    """(path, fingerprint) of each native module `program` includes."""
+    natives = []
+    for stmt in program.body:
+        if stmt.type == 'Include':
+            digest = fingerprint(stmt.path)
+            if digest is not None:
+                natives.append((stmt.path, digest))
+    return tuple(natives)
+
+
+def load(filename, source, opt_level, kind):
+    """Return the cached (artifact, natives) for `source`, or None on a miss."""
+    expected = (MAGIC, VERSION, opt_level, kind, source_hash(source))
+    try:
+        with open(cache_path(filename, opt_level, kind), "rb") as f:
+            header = pickle.load(f)
+            if header[:5] != expected or not natives_match(header[5]):
+                return None
+            return pickle.load(f), header[5]
+    except Exception:
+        return None
+
+
+def store(filename, source, opt_level, kind, value, natives):
+    path = cache_path(filename, opt_level, kind)
+    header = (MAGIC, VERSION, opt_level, kind, source_hash(source), natives)
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+# Artifacts kept in memory by preload():
+# (filename, opt_level, kind) -> (source hash, natives, artifact).
+PRELOADED = {}
+
+
+def cached_entry(filename, source, opt_level, kind, build, use_cache=True):
+    """(artifact, natives) for `source`, where `build()` makes both: the
+    artifact and the `native_includes()` of the program behind it."""
+    if filename is None:
+        return build()
+    entry = PRELOADED.get((filename, opt_level, kind))
+    if entry is not None and entry[0] == source_hash(source) and natives_match(entry[1]):
+        return entry[2], entry[1]
+    if not use_cache:
+        return build()
+    found = load(filename, source, opt_level, kind)
+    if found is None:
+        found = build()
+        store(filename, source, opt_level, kind, *found)
+    return found
+
+
+def cached(filename, source, opt_level, kind, build, use_cache=True):
+    return cached_entry(filename, source, opt_level, kind, build, use_cache)[0]
+
+
+def parse_source(source, opt_level=1):
+    program = parser(tokenize(source)).parse_program()
+    if opt_level:
+        program = optimize(program)
+    return program
+
+
+def build_program(source, opt_level):
+    program = parse_source(source, opt_level)
+    return program, native_includes(program) if opt_level else ()
+
+
+def build_code(source, opt_level):
+    from axion.compiler import compile_program
+    program, natives = build_program(source, opt_level)
+    return compile_program(program), natives
+
+
+def load_program(source, filename=None, opt_level=1, use_cache=True):
+    """Parse (and optimize) `source`, going through the cache for files."""
+    return cached(filename, source, opt_level, "ast",
+                  lambda: build_program(source, opt_level), use_cache)
+
+
+def load_code(source, filename=None, opt_level=1, use_cache=True):
+    """Compile `source` to VM bytecode, going through the cache for files."""
+    return cached(filename, source, opt_level, "code",
+                  lambda: build_code(source, opt_level), use_cache)
+
+
+def preload(path, opt_level=1, kinds=("ast", "code")):
+    """Keep the parsed and compiled forms of the module `path` in memory for
+    the rest of the process. Engines must not mutate them."""
+    filename, source = read_module(path)
+    builders = {"ast": build_program, "code": build_code}
+    for kind in kinds:
+        value, natives = cached_entry(filename, source, opt_level, kind,
+                                      lambda: builders[kind](source, opt_level))
+        PRELOADED[(filename, opt_level, kind)] = (source_hash(source), natives, value)
+
+
+def read_module(path):
+    filename = module_file(path)
+    with open(filename, "r") as f:
+        return filename, f.read()
@@ -1,31 +1,289 @@
 import sys
-from axion.lexer import tokenization
-from axion.parser import parser
-from axion.interpreter import Interpreter,Env
+import argparse
+from axion import runtime
+from axion.cache import load_program, load_code
+from axion.interpreter import Interpreter
+from axion.vm import VM
+from axion.transpile import PyEngine
 
-def main():
-    if len(sys.argv) < 3 or sys.argv[1] != "run":
-        print("Usage: axion run <file.ax>")
-        return
+ENGINES = {
+    "vm": VM,
+    "tree": Interpreter,
+    "py": PyEngine,
+}
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="axion", usage="axion run <file.ax>")
+    sub = ap.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="run an Axion script")
+    run.add_argument("file")
+    run.add_argument("--engine", choices=sorted(ENGINES), default="vm",
+                     help="execution engine (default: vm)")
+    run.add_argument("--memo-size", type=int, default=runtime.MEMO_SIZE, metavar="N",
+                     help="results kept by a `memo func` declared without a size "
+                          f"(default: {runtime.MEMO_SIZE})")
+    run.add_argument("--memo-stats", action="store_true",
+                     help="print memo cache hits and misses to stderr after the run")
+    run.add_argument("--output", metavar="FILE",
+                     help="write log and logln output to FILE instead of stdout")
+    run.add_argument("--buffer-size", type=int, default=runtime.OUTPUT_BUFFER, metavar="CHARS",
+                     help="output collected before it is written, 0 to write every log at once "
+                          f"(default: {runtime.OUTPUT_BUFFER})")
+    run.add_argument("--flush-interval", type=float, default=runtime.FLUSH_INTERVAL,
+                     metavar="SECONDS", help="longest time collected output waits to be written "
+                                             f"(default: {runtime.FLUSH_INTERVAL})")
+
+    dis = sub.add_parser("dis", help="print the bytecode of an Axion script")
+    dis.add_argument("file")
+
+    transpile = sub.add_parser("transpile", help="print the Python source generated for --engine=py")
+    transpile.add_argument("file")
+
+    profile = sub.add_parser("profile", help="run an Axion script on the tree engine and report "
+                                             "where it spends its time")
+    profile.add_argument("file")
+    profile.add_argument("--limit", type=int, default=20, metavar="N",
+                         help="functions and lines to list (default: 20)")
+    profile.add_argument("--report", metavar="FILE",
+                         help="write the report to FILE instead of stderr")
+    profile.add_argument("--collapsed", metavar="FILE",
+                         help="write collapsed stacks for flamegraph tools to FILE")
+
+    bench = sub.add_parser("bench", help="time the benchmark corpus, or the given .ax files "
+                                         "and directories, phase by phase")
+    bench.add_argument("paths", nargs="*", metavar="path")
+    bench.add_argument("--engine", choices=sorted(ENGINES), default="vm",
+                       help="execution engine (default: vm)")
+    bench.add_argument("--warmup", type=int, default=1, metavar="N",
+                       help="untimed runs before sampling (default: 1)")
+    bench.add_argument("--repeat", type=int, default=5, metavar="N",
+                       help="timed samples per benchmark (default: 5)")
+    bench.add_argument("--json", metavar="FILE", help="write the results to FILE as JSON")
+    bench.add_argument("--baseline", metavar="FILE",
+                       help="compare against results saved with --json; exit with status 1 "
+                            "on a regression")
+    bench.add_argument("--threshold", type=float, default=10.0, metavar="PERCENT",
+                       help="slowdown of a median that counts as a regression (default: 10)")
+    bench.add_argument("--source-kb", type=int, default=256, metavar="KB",
+                       help="size of the generated source benchmark (default: 256)")
+    bench.add_argument("--no-opt", dest="opt_level", action="store_const", const=0, default=1,
+                       help="skip constant folding and literal pre-conversion")
+
+    many = sub.add_parser("run-many", help="run many Axion scripts on a pool of worker processes")
+    many.add_argument("files", nargs="*", metavar="file")
+    many.add_argument("--manifest", metavar="FILE",
+                      help="JSON list of jobs: script paths or {\"file\": ..., \"timeout\": ...}")
+    many.add_argument("-j", "--jobs", type=int, default=None, metavar="N",
+                      help="worker processes (default: one per CPU)")
+    many.add_argument("--timeout", type=float, default=None, metavar="SECONDS",
+                      help="stop a job that runs longer than this")
+    many.add_argument("--engine", choices=sorted(ENGINES), default="vm",
+                      help="execution engine (default: vm)")
+    many.add_argument("--output-dir", metavar="DIR",
+                      help="write each job's output to DIR/<n>-<name>.out instead of printing it")
+    many.add_argument("--json", metavar="FILE", help="write every job's result to FILE as JSON")
 
-    filename = sys.argv[2]
+    serve = sub.add_parser("serve", help="run Axion scripts sent as JSON requests over a socket")
+    loadtest = sub.add_parser("loadtest", help="measure the requests per second and latency "
+                                               "of an axion serve server")
+    loadtest.add_argument("file", help="script to send")
+    for command in (serve, loadtest):
+        command.add_argument("--host", default="127.0.0.1", help="TCP address (default: 127.0.0.1)")
+        command.add_argument("--port", type=int, default=7878, help="TCP port (default: 7878)")
+        command.add_argument("--unix", metavar="PATH", help="use a Unix socket at PATH instead of TCP")
+    serve.add_argument("-j", "--jobs", type=int, default=None, metavar="N",
+                       help="worker processes (default: one per CPU)")
+    serve.add_argument("--timeout", type=float, default=1.0, metavar="SECONDS",
+                       help="longest a script may run, 0 for no limit (default: 1)")
+    serve.add_argument("--no-opt", dest="opt_level", action="store_const", const=0, default=1,
+                       help="skip constant folding and literal pre-conversion")
+    loadtest.add_argument("-n", "--requests", type=int, default=1000, metavar="N",
+                          help="requests to send (default: 1000)")
+    loadtest.add_argument("-c", "--concurrency", type=int, default=8, metavar="N",
+                          help="connections sending requests in parallel (default: 8)")
+    loadtest.add_argument("--globals", default="{}", metavar="JSON",
+                          help="input bindings sent with every request")
 
+    for command in (run, dis, transpile, profile, many):
+        command.add_argument("--no-opt", dest="opt_level", action="store_const", const=0, default=1,
+                             help="skip constant folding and literal pre-conversion")
+        command.add_argument("--no-cache", dest="use_cache", action="store_false",
+                             help="do not read or write the __axcache__ directory")
+    return ap
+
+
+def read_source(filename):
     try:
         with open(filename, "r") as f:
-            source = f.read()
+            return f.read()
     except FileNotFoundError:
         print(f"File not found: {filename}")
+        return None
+
+
+def profile(args, program, options):
+    from axion.profiler import Profiler, ProfilingInterpreter
+    profiler = Profiler()
+    try:
+        ProfilingInterpreter(program, profiler, args.file, **options).run()
+    except Exception as e:
+        print(f"Error: {e}")
+    sys.stdout.flush()
+    report = profiler.report(args.limit)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report)
+    else:
+        print(report, end="", file=sys.stderr)
+    if args.collapsed:
+        with open(args.collapsed, "w") as f:
+            f.write(profiler.collapsed())
+
+
+def bench(args):
+    from axion import bench as runner
+    if args.repeat < 1 or args.warmup < 0:
+        print("Error: --repeat must be at least 1 and --warmup at least 0")
+        return 2
+    try:
+        benchmarks = runner.find_benchmarks(args.paths, args.source_kb)
+        baseline = runner.load(args.baseline) if args.baseline else None
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 2
+    results = runner.run_benchmarks(benchmarks, args.engine, args.warmup, args.repeat,
+                                    args.opt_level,
+                                    progress=lambda name: print(f"running {name}...", file=sys.stderr))
+    print(runner.format_report(results, baseline), end="")
+    if args.json:
+        runner.save(results, args.json)
+    if baseline is None:
+        return 0
+    regressions = runner.compare(results, baseline, args.threshold / 100)
+    for name, phase, old, new in regressions:
+        print(f"REGRESSION {name} {phase}: {old * 1000:.2f} ms -> {new * 1000:.2f} ms "
+              f"({runner.change(old, new)})")
+    return 1 if regressions else 0
+
+
+def run_many(args):
+    import os
+    import json
+    from axion import batch
+    try:
+        jobs = [batch.Job(f, args.timeout) for f in args.files]
+        if args.manifest:
+            jobs += batch.read_manifest(args.manifest, args.timeout)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 2
+    if not jobs:
+        print("Usage: axion run-many <file.ax>... | --manifest <jobs.json>")
+        return 2
+    results, wall = batch.run_many(jobs, args.jobs, args.engine, args.opt_level, args.use_cache)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for n, result in enumerate(results):
+        line = f"{result['status']:<8}{result['seconds'] * 1000:>9.1f} ms  {result['file']}"
+        print(line if result["error"] is None else f"{line}: {result['error']}")
+        if args.output_dir:
+            name = os.path.splitext(os.path.basename(result["file"]))[0]
+            with open(os.path.join(args.output_dir, f"{n}-{name}.out"), "w") as f:
+                f.write(result["output"])
+        elif result["output"]:
+            print(result["output"], end="" if result["output"].endswith("\n") else "\n")
+    print(batch.summary(results, wall))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"wall_seconds": wall, "jobs": results}, f, indent=2)
+    return 0 if all(result["status"] == batch.OK for result in results) else 1
+
+
+def serve(args):
+    import asyncio
+    from axion.server import Server
+    server = Server(args.jobs, args.timeout or None, args.opt_level)
+    ready = lambda where: print(f"axion serve: listening on {where}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def loadtest(args):
+    import json
+    import asyncio
+    from axion import server
+    source = read_source(args.file)
+    if source is None:
+        return 2
+    try:
+        stats = asyncio.run(server.load_test(source, args.requests, args.concurrency,
+                                             json.loads(args.globals),
+                                             args.host, args.port, args.unix))
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 2
+    print(server.format_load_test(stats))
+    return 1 if stats["errors"] else 0
+
+
+def main():
+    ap = build_parser()
+    args = ap.parse_args()
+    if args.command is None:
+        print("Usage: axion run <file.ax>")
+        return
+    commands = {"bench": bench, "run-many": run_many, "serve": serve, "loadtest": loadtest}
+    if args.command in commands:
+        status = commands[args.command](args)
+        if status:
+            sys.exit(status)
         return
 
+    source = read_source(args.file)
+    if source is None:
+        return
+
+    interpreter = None
+    output_file = None
     try:
-        tokens = tokenization(source)
-        p = parser(tokens)
-        ast = p.parse_program()
+        options = dict(opt_level=args.opt_level, use_cache=args.use_cache)
+        if args.command == "dis":
+            from axion.compiler import disassemble
+            print(disassemble(load_code(source, args.file, **options)))
+            return
+        if args.command == "transpile":
+            from axion.transpile import transpile
+            print(transpile(load_program(source, args.file, **options)), end="")
+            return
+        if args.command == "profile":
+            profile(args, load_program(source, args.file, **options), options)
+            return
 
-        env = Env()
-        interpreter = Interpreter(ast)
-        interpreter.global_env = env
+        if args.memo_size < 1:
+            raise ValueError("--memo-size must be at least 1")
+        if args.buffer_size < 0 or args.flush_interval < 0:
+            raise ValueError("--buffer-size and --flush-interval cannot be negative")
+        runtime.MEMO_SIZE = args.memo_size
+        if args.engine == "vm":
+            interpreter = VM(code=load_code(source, args.file, **options), **options)
+        else:
+            interpreter = ENGINES[args.engine](load_program(source, args.file, **options), **options)
+        if args.output:
+            output_file = open(args.output, "w")
+        interpreter.output = runtime.Output(output_file, args.buffer_size, args.flush_interval)
         interpreter.run()
 
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    if getattr(args, "memo_stats", False) and interpreter is not None and interpreter.memos:
+        sys.stdout.flush()
+        print(runtime.memo_report(interpreter.memos.values()), file=sys.stderr)
@@ -0,0 +1,611 @@
+"""
+Bytecode compiler for Axion.
+
+Lowers the AST produced by `parser.parse_program()` into `Code` objects: an
+opcode array, a parallel operand array and a constant pool. Every `func`
+declaration gets its own `Code` object, stored in the constant pool of the
+code that declares it. The resulting code is executed by `axion.vm.VM`.
+
+Variables are addressed through the frame slots assigned by
+`axion.resolver`; only names the resolver leaves unbound are looked up by
+name at run time. Such a lookup may find a block-scoped slot of a caller,
+so a block that declares one of those names clears its slots (CLEAR_SLOTS)
+when it is left, and a loop body at the end of every iteration. A parameter
+a call leaves out is looked up the same way, so parameters are read and
+written with their own opcodes (LOAD_PARAM, STORE_PARAM, AUG_PARAM), which
+fall back to the caller chain while the slot is unset.
+"""
+
+from axion.resolver import resolve, declared_name, LOCAL, GLOBAL, FUNCTION
+from axion.runtime import BINARY_OPS, UNARY_OPS, ASSIGN_OPS, number_value, case_table
+
+LOAD_CONST = 0
+LOAD_LOCAL = 1
+LOAD_GLOBAL = 2
+LOAD_DYNAMIC = 3
+LOAD_FUNCTION = 4
+STORE_LOCAL = 5
+STORE_GLOBAL = 6
+STORE_DYNAMIC = 7
+AUG_LOCAL = 8
+AUG_GLOBAL = 9
+AUG_DYNAMIC = 10
+POP = 11
+POP_N = 12
+DUP = 13
+BINARY = 14
+BINARY_CONST = 15
+UNARY = 16
+JUMP = 17
+JUMP_IF_FALSE = 18
+JUMP_IF_TRUE = 19
+FOR_ITER = 20
+BUILD_LIST = 21
+BUILD_STRING = 22
+INDEX = 23
+ASSIGN_INDEX = 24
+LOAD_MEMBER = 25
+CALL_NAME = 26
+CALL_MEMBER = 27
+CALL_INDEX = 28
+RETURN = 29
+MAKE_FUNCTION = 30
+INCLUDE = 31
+LOG = 32
+LOGLN = 33
+INPUT = 34
+RAISE = 35
+GET_ITER = 36
+NEXT_ITER = 37
+BUILD_MAP = 38
+MATCH_CASE = 39
+CLEAR_SLOTS = 40
+LOAD_PARAM = 41
+STORE_PARAM = 42
+AUG_PARAM = 43
+
+OPCODES = [
+    'LOAD_CONST',
+    'LOAD_LOCAL',
+    'LOAD_GLOBAL',
+    'LOAD_DYNAMIC',
+    'LOAD_FUNCTION',
+    'STORE_LOCAL',
+    'STORE_GLOBAL',
+    'STORE_DYNAMIC',
+    'AUG_LOCAL',
+    'AUG_GLOBAL',
+    'AUG_DYNAMIC',
+    'POP',
+    'POP_N',
+    'DUP',
+    'BINARY',
+    'BINARY_CONST',
+    'UNARY',
+    'JUMP',
+    'JUMP_IF_FALSE',
+    'JUMP_IF_TRUE',
+    'FOR_ITER',
+    'BUILD_LIST',
+    'BUILD_STRING',
+    'INDEX',
+    'ASSIGN_INDEX',
+    'LOAD_MEMBER',
+    'CALL_NAME',
+    'CALL_MEMBER',
+    'CALL_INDEX',
+    'RETURN',
+    'MAKE_FUNCTION',
+    'INCLUDE',
+    'LOG',
+    'LOGLN',
+    'INPUT',
+    'RAISE',
+    'GET_ITER',
+    'NEXT_ITER',
+    'BUILD_MAP',
+    'MATCH_CASE',
+    'CLEAR_SLOTS',
+    'LOAD_PARAM',
+    'STORE_PARAM',
+    'AUG_PARAM',
+]
+
+
+class Code:
+    __slots__ = ('name', 'params', 'ops', 'args', 'consts', 'nlocals',
+                 'slot_names', 'names', 'slots_by_name', 'const_slots', 'memo')
+
+    def __init__(self, name, params=(), layout=None, memo=None):
+        self.name = name
+        self.params = tuple(params)
+        # FuncDecl.memo: None, or the result cache size of a `memo func`.
+        self.memo = memo
+        self.ops = []
+        self.args = []
+        self.consts = []
+        # Frame layout from the resolver: one slot per declaration, with
+        # `names` mapping the outermost declarations for dynamic lookups.
+        self.slot_names = tuple(layout.slot_names) if layout else ()
+        self.nlocals = len(self.slot_names)
+        self.names = dict(layout.names) if layout else {}
+        # Every slot of each name, innermost block first: a block declares
+        # after the blocks around it, and sibling blocks are cleared on exit.
+        self.slots_by_name = {}
+        for slot, name in enumerate(self.slot_names):
+            self.slots_by_name[name] = (slot,) + self.slots_by_name.get(name, ())
+        self.const_slots = frozenset(layout.const_slots) if layout else frozenset()
+
+    def __repr__(self):
+        return f"<Code {self.name} ({len(self.ops)} ops)>"
+
+
+def disassemble(code, indent=""):
+    prefix = "" if code.memo is None else "memo "
+    lines = [f"{indent}{prefix}{code.name}({', '.join(code.params)}):"]
+    nested = []
+    for pc, (op, arg) in enumerate(zip(code.ops, code.args)):
+        if op == LOAD_CONST or op == MAKE_FUNCTION:
+            value = code.consts[arg]
+            if isinstance(value, Code):
+                nested.append(value)
+            shown = f"{arg} ({value!r})"
+        elif op in (LOAD_LOCAL, STORE_LOCAL, LOAD_PARAM, STORE_PARAM):
+            shown = f"{arg} ({code.slot_names[arg]})"
+        elif op in (BINARY, UNARY):
+            shown = getattr(arg, '__name__', repr(arg))
+        elif op == BINARY_CONST:
+            shown = f"{arg[0].__name__} {arg[1]!r}"
+        elif arg is None:
+            shown = ""
+        else:
+            shown = repr(arg)
+        lines.append(f"{indent}  {pc:4d} {OPCODES[op]:<14} {shown}")
+    for sub in nested:
+        lines.append(disassemble(sub, indent + "  "))
+    return "\n".join(lines)
+
+
+class Loop:
+    __slots__ = ('continue_target', 'breaks', 'depth')
+
+    def __init__(self, depth):
+        self.continue_target = None
+        self.breaks = []
+        # Number of enclosing scopes; break and skip leave the ones above.
+        self.depth = depth
+
+
+class Compiler:
+    def __init__(self, resolution):
+        self.res = resolution
+        self.code = None
+        self.const_index = {}
+        self.loops = []
+        # Slots to clear when each enclosing block is left, innermost last;
+        # None for the top level of a frame, which is never left.
+        self.scopes = [None]
+
+    def compile_program(self, program):
+        self.code = Code("<program>", layout=self.res.layout(program))
+        for stmt in program.body:
+            self.compile_statement(stmt)
+        self.emit(LOAD_CONST, self.const(None))
+        self.emit(RETURN)
+        return self.code
+
+    def compile_function(self, decl):
+        outer = (self.code, self.const_index, self.loops, self.scopes)
+        self.code = Code(decl.name, decl.params, self.res.layout(decl), decl.memo)
+        self.const_index = {}
+        self.loops = []
+        self.scopes = [None]
+        self.compile_statements(decl.body, tail=True)
+        self.emit(LOAD_CONST, self.const(None))
+        self.emit(RETURN)
+        code = self.code
+        self.code, self.const_index, self.loops, self.scopes = outer
+        return code
+
+    # -- emission helpers -------------------------------------------------
+
+    def emit(self, op, arg=None):
+        self.code.ops.append(op)
+        self.code.args.append(arg)
+        return len(self.code.ops) - 1
+
+    def const(self, value):
+        consts = self.code.consts
+        if isinstance(value, Code):
+            consts.append(value)
+            return len(consts) - 1
+        key = (type(value), value)
+        index = self.const_index.get(key)
+        if index is None:
+            index = self.const_index[key] = len(consts)
+            consts.append(value)
+        return index
+
+    def here(self):
+        return len(self.code.ops)
+
+    def patch(self, index, target=None):
+        self.code.args[index] = self.here() if target is None else target
+
+    def is_param(self, location):
+        return location[0] == LOCAL and location[1] < len(self.code.params)
+
+    def load(self, node):
+        name = node.value
+        location = self.res.location(node)
+        if location is None:
+            self.emit(LOAD_DYNAMIC, name)
+        elif self.is_param(location):
+            self.emit(LOAD_PARAM, location[1])
+        elif location[0] == LOCAL:
+            self.emit(LOAD_LOCAL, location[1])
+        elif location[0] == GLOBAL:
+            self.emit(LOAD_GLOBAL, (location[1], name))
+        else:
+            self.emit(LOAD_FUNCTION, name)
+
+    def store(self, node, fn=None):
+        name = node.value
+        location = self.res.location(node)
+        if fn is None:
+            if location is None:
+                self.emit(STORE_DYNAMIC, name)
+            elif self.is_param(location):
+                self.emit(STORE_PARAM, location[1])
+            elif location[0] == LOCAL:
+                self.emit(STORE_LOCAL, location[1])
+            else:
+                self.emit(STORE_GLOBAL, (location[1], name))
+        elif location is None:
+            self.emit(AUG_DYNAMIC, (name, fn))
+        elif self.is_param(location):
+            self.emit(AUG_PARAM, (location[1], fn))
+        elif location[0] == LOCAL:
+            self.emit(AUG_LOCAL, (location[1], fn))
+        else:
+            self.emit(AUG_GLOBAL, (location[1], name, fn))
+
+    def declare(self, stmt, name=None):
+        slot = self.res.location(stmt)[1]
+        if stmt.type != 'ForLoop' and stmt.type != 'ForInLoop':
+            self.emit(STORE_LOCAL, slot)
+        scope = self.scopes[-1]
+        if scope is not None and (name or declared_name(stmt)) in self.res.dynamic:
+            scope.append(slot)
+
+    def clear(self, scopes):
+        slots = tuple(slot for scope in scopes for slot in scope)
+        if slots:
+            self.emit(CLEAR_SLOTS, slots)
+
+    # -- statements ---------------------------------------------------------
+
+    def compile_block(self, stmts, tail=False):
+        self.scopes.append([])
+        self.compile_statements(stmts, tail)
+        self.clear([self.scopes.pop()])
+
+    def compile_statements(self, stmts, tail=False):
+        last = len(stmts) - 1
+        for i, stmt in enumerate(stmts):
+            self.compile_statement(stmt, tail and i == last)
+
+    def compile_statement(self, stmt, tail=False):
+        method = getattr(self, 'stmt_' + stmt.type, None)
+        if method is None:
+            raise SyntaxError(f"Cannot compile statement of type {stmt.type}")
+        method(stmt, tail)
+
+    def stmt_VarDecl(self, stmt, tail):
+        if stmt.value:
+            self.compile_expression(stmt.value)
+        else:
+            self.emit(LOAD_CONST, self.const(None))
+        self.declare(stmt)
+
+    def stmt_ConstDecl(self, stmt, tail):
+        if stmt.value is None:
+            self.emit(RAISE, (ValueError, f"Constant '{stmt.name}' must be initialized"))
+            return
+        self.compile_expression(stmt.value)
+        self.declare(stmt)
+
+    def stmt_ExpressionStatement(self, stmt, tail):
+        expr = stmt.expr
+        if not tail and expr.type == 'Assignment' and expr.target.type == 'IDENTIFIER':
+            self.compile_expression(expr.value)
+            self.store(expr.target, ASSIGN_OPS[expr.op])
+            return
+        self.compile_expression(expr)
+        self.emit(RETURN if tail else POP)
+
+    def stmt_IO(self, stmt, tail):
+        action = stmt.action
+        if action == 'log' or action == 'logln':
+            self.compile_expression(stmt.expr)
+            self.emit(LOG if action == 'log' else LOGLN)
+            return
+
+        if stmt.message:
+            self.compile_expression(stmt.message)
+        else:
+            self.emit(LOAD_CONST, self.const(""))
+        self.emit(INPUT)
+        target = stmt.target
+        if target.type == 'IDENTIFIER':
+            self.store(target)
+        elif target.type == 'Index':
+            self.compile_index_store(target, '=')
+            self.emit(POP)
+        else:
+            self.emit(POP)
+
+    def stmt_IfStatement(self, stmt, tail):
+        end_jumps = []
+        branches = [(stmt.condition, stmt.body)]
+        branches += [(e.condition, e.body) for e in stmt.elseifs]
+        for condition, body in branches:
+            self.compile_expression(condition)
+            skip = self.emit(JUMP_IF_FALSE)
+            self.compile_block(body, tail=tail)
+            end_jumps.append(self.emit(JUMP))
+            self.patch(skip)
+        if stmt.orelse:
+            self.compile_block(stmt.orelse, tail=tail)
+        for jump in end_jumps:
+            self.patch(jump)
+
+    def stmt_FuncDecl(self, stmt, tail):
+        self.emit(MAKE_FUNCTION, self.const(self.compile_function(stmt)))
+
+    def stmt_ReturnStatement(self, stmt, tail):
+        self.compile_expression(stmt.expr)
+        self.emit(RETURN)
+
+    def stmt_BreakStatement(self, stmt, tail):
+        if not self.loops:
+            raise SyntaxError("'break' outside loop")
+        self.clear(self.scopes[self.loops[-1].depth:])
+        self.loops[-1].breaks.append(self.emit(JUMP))
+
+    def stmt_SkipStatement(self, stmt, tail):
+        if not self.loops:
+            raise SyntaxError("'skip' outside loop")
+        self.clear(self.scopes[self.loops[-1].depth:])
+        self.emit(JUMP, self.loops[-1].continue_target)
+
+    def loop_body(self, loop, body):
+        self.loops.append(loop)
+        self.compile_block(body)
+        self.loops.pop()
+
+    def counted_body(self, stmt, loop):
+        # The loop variable shares the scope of the body, as in the resolver.
+        self.scopes.append([])
+        self.declare(stmt, stmt.var)
+        self.loops.append(loop)
+        self.compile_statements(stmt.body)
+        self.loops.pop()
+        self.clear([self.scopes.pop()])
+
+    def stmt_ForLoop(self, stmt, tail):
+        # The counter, end and step stay on the stack for the whole loop;
+        # FOR_ITER advances the counter and stores the loop variable's slot.
+        self.compile_expression(stmt.start)
+        self.compile_expression(stmt.end)
+        self.compile_expression(stmt.step)
+        loop = Loop(len(self.scopes))
+        top = self.here()
+        loop.continue_target = top
+        exit_jump = self.emit(FOR_ITER)
+        self.counted_body(stmt, loop)
+        self.emit(JUMP, top)
+        self.code.args[exit_jump] = (self.here(), self.res.location(stmt)[1])
+        for jump in loop.breaks:
+            self.patch(jump)
+        self.emit(POP_N, 3)
+
+    def stmt_ForInLoop(self, stmt, tail):
+        # The iterator stays on the stack for the whole loop; NEXT_ITER
+        # stores its next item in the loop variable's slot.
+        self.compile_expression(stmt.iterable)
+        self.emit(GET_ITER)
+        loop = Loop(len(self.scopes))
+        top = self.here()
+        loop.continue_target = top
+        exit_jump = self.emit(NEXT_ITER)
+        self.counted_body(stmt, loop)
+        self.emit(JUMP, top)
+        self.code.args[exit_jump] = (self.here(), self.res.location(stmt)[1])
+        for jump in loop.breaks:
+            self.patch(jump)
+        self.emit(POP)
+
+    def stmt_WhileLoop(self, stmt, tail):
+        loop = Loop(len(self.scopes))
+        top = self.here()
+        loop.continue_target = top
+        self.compile_expression(stmt.condition)
+        exit_jump = self.emit(JUMP_IF_FALSE)
+        self.loop_body(loop, stmt.body)
+        self.emit(JUMP, top)
+        self.patch(exit_jump)
+        for jump in loop.breaks:
+            self.patch(jump)
+
+    def stmt_DoWhileLoop(self, stmt, tail):
+        # `skip` inside repeat/while restarts the body without re-checking
+        # the condition, matching the tree-walking interpreter.
+        loop = Loop(len(self.scopes))
+        top = self.here()
+        loop.continue_target = top
+        self.loop_body(loop, stmt.body)
+        self.compile_expression(stmt.condition)
+        self.emit(JUMP_IF_TRUE, top)
+        for jump in loop.breaks:
+            self.patch(jump)
+
+    def stmt_MatchStatement(self, stmt, tail):
+        self.compile_expression(stmt.expr)
+        table = case_table(stmt.cases) if stmt.cases else None
+        if table is not None:
+            self.match_table(stmt, table, tail)
+            return
+        end_jumps = []
+        for case in stmt.cases:
+            self.emit(DUP)
+            self.compile_expression(case.value)
+            self.emit(BINARY, BINARY_OPS['=='])
+            skip = self.emit(JUMP_IF_FALSE)
+            self.emit(POP)
+            self.compile_block([case.body], tail)
+            end_jumps.append(self.emit(JUMP))
+            self.patch(skip)
+        self.emit(POP)
+        if stmt.orelse:
+            self.compile_block([stmt.orelse.body], tail)
+        for jump in end_jumps:
+            self.patch(jump)
+
+    def match_table(self, stmt, table, tail):
+        # MATCH_CASE pops the subject and jumps to the case it equals, or
+        # falls through to the else arm.
+        dispatch = self.emit(MATCH_CASE)
+        end_jumps = []
+        if stmt.orelse:
+            self.compile_block([stmt.orelse.body], tail)
+        end_jumps.append(self.emit(JUMP))
+        starts = []
+        for case in stmt.cases:
+            starts.append(self.here())
+            self.compile_block([case.body], tail)
+            end_jumps.append(self.emit(JUMP))
+        self.code.args[dispatch] = {value: starts[i] for value, i in table.items()}
+        for jump in end_jumps:
+            self.patch(jump)
+
+    def stmt_Include(self, stmt, tail):
+        self.emit(INCLUDE, stmt.path)
+        self.declare(stmt)
+
+    # -- expressions --------------------------------------------------------
+
+    def compile_expression(self, expr):
+        method = getattr(self, 'expr_' + expr.type, None)
+        if method is None:
+            raise SyntaxError(f"Cannot compile expression of type {expr.type}")
+        method(expr)
+
+    def expr_NUMBER(self, expr):
+        self.emit(LOAD_CONST, self.const(number_value(expr.value)))
+
+    def expr_STRING(self, expr):
+        self.emit(LOAD_CONST, self.const(expr.value))
+
+    def expr_Constant(self, expr):
+        self.emit(LOAD_CONST, self.const(expr.value))
+
+    def expr_Template(self, expr):
+        for part in expr.parts:
+            if isinstance(part, str):
+                self.emit(LOAD_CONST, self.const(part))
+            else:
+                self.compile_expression(part)
+        self.emit(BUILD_STRING, len(expr.parts))
+
+    def expr_IDENTIFIER(self, expr):
+        self.load(expr)
+
+    def expr_MemberAccess(self, expr):
+        self.compile_expression(expr.object)
+        self.emit(LOAD_MEMBER, expr.property)
+
+    def expr_BinaryOp(self, expr):
+        self.compile_expression(expr.left)
+        right = expr.right
+        if right.type == 'NUMBER':
+            self.emit(BINARY_CONST, (BINARY_OPS[expr.op], number_value(right.value)))
+            return
+        if right.type == 'Constant':
+            self.emit(BINARY_CONST, (BINARY_OPS[expr.op], right.value))
+            return
+        self.compile_expression(right)
+        self.emit(BINARY, BINARY_OPS[expr.op])
+
+    def expr_UnaryOp(self, expr):
+        if expr.op not in UNARY_OPS:
+            raise SyntaxError(f"Unknown unary operator: {expr.op}")
+        self.compile_expression(expr.expr)
+        self.emit(UNARY, UNARY_OPS[expr.op])
+
+    def compile_index_store(self, target, op):
+        self.compile_expression(target.target)
+        self.compile_expression(target.index)
+        # Constant targets the resolver could see are rejected statically;
+        # unresolved names are checked when the store happens.
+        inner = target.target
+        dynamic = inner.type == 'IDENTIFIER' and self.res.location(inner) is None
+        self.emit(ASSIGN_INDEX, (ASSIGN_OPS[op], inner.value if dynamic else None))
+
+    def expr_Assignment(self, expr):
+        target = expr.target
+        self.compile_expression(expr.value)
+        if target.type == 'IDENTIFIER':
+            fn = ASSIGN_OPS[expr.op]
+            if fn is None:
+                self.emit(DUP)
+                self.store(target)
+            else:
+                self.store(target, fn)
+                self.load(target)
+        elif target.type == 'Index':
+            self.compile_index_store(target, expr.op)
+        else:
+            self.emit(POP)
+            self.emit(LOAD_CONST, self.const(None))
+
+    def expr_Call(self, expr):
+        callee = expr.callee
+        args = expr.args
+        if callee.type == 'IDENTIFIER':
+            for arg in args:
+                self.compile_expression(arg)
+            self.emit(CALL_NAME, (callee.value, len(args), self.res.location(callee)))
+        elif callee.type == 'MemberAccess':
+            self.compile_expression(callee.object)
+            for arg in args:
+                self.compile_expression(arg)
+            self.emit(CALL_MEMBER, (callee.property, len(args)))
+        elif callee.type == 'Index':
+            self.compile_expression(callee.target)
+            self.compile_expression(callee.index)
+            for arg in args:
+                self.compile_expression(arg)
+            self.emit(CALL_INDEX, len(args))
+        else:
+            self.emit(RAISE, (Exception, f"Error: Unsupported callee type {callee.type}"))
+
+    def expr_ArrayLiteral(self, expr):
+        for el in expr.elements:
+            self.compile_expression(el)
+        self.emit(BUILD_LIST, len(expr.elements))
+
+    def expr_MapLiteral(self, expr):
+        for key, value in zip(expr.keys, expr.values):
+            self.compile_expression(key)
+            self.compile_expression(value)
+        self.emit(BUILD_MAP, len(expr.keys))
+
+    def expr_Index(self, expr):
+        self.compile_expression(expr.target)
+        self.compile_expression(expr.index)
+        self.emit(INDEX)
+
+
+def compile_program(program):
+    return Compiler(resolve(program)).compile_program(program)
@@ -0,0 +1,4 @@
+"""
+Axion Benchmark Corpus
+The .ax programs `axion bench` times when no files are given.
+"""
@@ -0,0 +1,87 @@
+"""
+Embedding API: compile a script once, run it many times.
+
+    import axion
+
+    rules = axion.compile(source)
+    env = {"price": 120, "rate": 0.2}
+    result = rules.run(globals=env, stdout=buffer)
+
+`compile()` lexes, parses, optimizes and compiles the source to VM bytecode
+once. Each `run()` executes that bytecode on a fresh VM, so runs do not
+see each other's variables or functions. Modules the script includes are
+loaded on the first run and shared by later runs of the same Program.
+
+Names in `globals` are visible to the script as top-level variables it
+did not declare itself, and the script may assign to them. After the run,
+the dict holds the final values of those names and of every top-level
+variable and function the script declared. `run()` returns the value of a top-level
+`return`, or None. Values cross between Axion and Python as they are:
+numbers, strings and lists are the Python objects themselves, and Axion
+functions are Python callables.
+"""
+
+from axion.cache import parse_source
+from axion.compiler import compile_program
+from axion.resolver import BUILTINS
+from axion.runtime import output_for
+from axion.vm import VM, Frame, Function, UNSET
+
+
+class HostScope:
+    """Stands in for the code of a frame holding the host's globals: name
+    lookups through frames only need the name -> slots mappings and the
+    slots of constants, of which the host has none."""
+    __slots__ = ('names', 'slots_by_name', 'const_slots')
+
+    def __init__(self, names):
+        self.names = names
+        self.slots_by_name = {name: (slot,) for name, slot in names.items()}
+        self.const_slots = frozenset()
+
+
+class Program:
+    def __init__(self, code, opt_level=1):
+        self.code = code
+        self.opt_level = opt_level
+        # Included modules, loaded by the first run that needs them.
+        self.modules = {}
+
+    def run(self, globals=None, stdout=None):
+        """Run the program in a fresh environment and return its result.
+
+        `globals` is an optional dict of host variables, updated in place
+        with the final values. `stdout` is where log and logln write
+        instead of sys.stdout: a text file such as an io.StringIO, a file
+        descriptor, or a runtime.Output to choose its buffering."""
+        vm = VM(code=self.code, opt_level=self.opt_level, use_cache=False)
+        vm.modules = self.modules
+        vm.output = output_for(stdout)
+        host = None
+        if globals:
+            names = {name: slot for slot, name in enumerate(globals)}
+            host = Frame(HostScope(names), list(globals.values()), None)
+        try:
+            return vm.run(host)
+        finally:
+            if globals is not None:
+                self.export(vm, host, globals)
+
+    def export(self, vm, host, globals):
+        if host is not None:
+            for name, slot in host.code.names.items():
+                globals[name] = host.values[slot]
+        if vm.global_frame is None:
+            return
+        values = vm.global_frame.values
+        for name, slot in self.code.names.items():
+            if name not in BUILTINS and values[slot] is not UNSET:
+                globals[name] = values[slot]
+        for name, fn in vm.functions.items():
+            if fn.__class__ is Function:
+                globals[name] = fn
+
+
+def compile(source, opt_level=1):
+    """Compile Axion `source` into a Program that can be run many times."""
+    return Program(compile_program(parse_source(source, opt_level)), opt_level)
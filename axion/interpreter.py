@@ -1,6 +1,7 @@
-import os
-import importlib.resources
-import time
+from axion.ast import Node, STATEMENTS, EXPRESSIONS
+from axion.runtime import (BINARY_OPS, UNARY_OPS, ASSIGN_OPS, Map, Memo, Output, iterate,
+                           module_name, set_index, case_table, case_index)
+from axion.native import NativeFunction, BUILTINS, load_module
 
 class Env:
     def __init__(self, parent=None):
@@ -54,6 +55,15 @@ class Env:
             return self.parent.is_const(name)
         return False
 
+    def lookup(self, name):
+        env = self
+        while env is not None:
+            record = env.vars.get(name)
+            if record is not None:
+                return record
+            env = env.parent
+        raise NameError(f"Variable '{name}' is not defined")
+
     def get_value(self, name):
         if name in self.vars:
             return self.vars[name]['value']
@@ -63,181 +73,322 @@ class Env:
             raise NameError(f"Variable '{name}' is not defined")
 
 
+# Statements that add a name to the scope they run in.
+DECLARATIONS = ('VarDecl', 'ConstDecl', 'Include')
+
+
+def function_values(program):
+    """Names of declared functions that the program reads as values.
+
+    Reading a function's name is the only way to get hold of the closure
+    bound to its call scope, whose parent chain reaches the scope it was
+    called from.
+    """
+    declared = set()
+    read = set()
+
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, Node):
+            return
+        if node.type == 'FuncDecl':
+            declared.add(node.name)
+        elif node.type == 'IDENTIFIER':
+            read.add(node.value)
+        elif node.type == 'Call' and node.callee.type == 'IDENTIFIER':
+            walk(node.args)
+            return
+        for _, value in node.fields():
+            walk(value)
+
+    walk(program)
+    return declared & read
+
+
+def count_up(i, end, step):
+    while i <= end:
+        yield i
+        i += step
+
+
 class Interpreter:
-    def __init__(self, ast):
+    def __init__(self, ast, opt_level=1, use_cache=True):
         self.ast = ast
-        self.global_env = Env()
+        self.opt_level = opt_level
+        self.use_cache = use_cache
+        # Builtins get a scope of their own above the program's, which may
+        # declare the same names.
+        self.global_env = Env(Env())
         self.functions = {}
+        # Result caches of `memo func` declarations, shared with modules.
+        self.memos = {}
+        # Where log and logln write, shared with modules.
+        self.output = Output()
         self.loaded_modules = set()
         self.base_dir = "."
-        self.global_env.declare("time_now", lambda: int(time.time() * 1000))
-        self.functions["time_now"] = {"builtin": True, "impl": lambda: int(time.time() * 1000)}
+        # Jump tables of literal-only match statements, built on first use.
+        self.case_tables = {}
+        for name, fn in BUILTINS.items():
+            self.global_env.parent.declare(name, fn)
+            self.functions[name] = fn
+        # Per-node-type dispatch tables, keyed by node class.
+        self.statement_table = {cls: getattr(self, 'stmt_' + cls.type) for cls in STATEMENTS}
+        self.expression_table = {cls: getattr(self, 'expr_' + cls.type) for cls in EXPRESSIONS}
+        # Unless a closure could keep a loop's scope alive, loops run their
+        # body in one scope for all iterations instead of a new one each.
+        self.reuse_loop_scopes = not function_values(ast)
 
     def run(self):
-        return self.eval_program(self.ast, self.global_env)
+        with self.output:
+            return self.eval_program(self.ast, self.global_env)
 
     def eval_program(self, program, env):
         result = None
-        for stmt in program['body']:
+        for stmt in program.body:
             result = self.eval_statement(stmt, env)
+            if result.__class__ is dict and result.get('type') == 'return':
+                return result['value']
         return result
 
     def eval_statement(self, stmt, env):
-        t = stmt['type']
-
-        if t == 'VarDecl':
-            init_val = self.eval_expression(stmt['value'], env) if stmt['value'] else None
-            env.declare(stmt['name'], init_val)
-
-        elif t == 'ConstDecl':
-            if stmt['value'] is None:
-                raise ValueError(f"Constant '{stmt['name']}' must be initialized")
-            init_val = self.eval_expression(stmt['value'], env)
-            env.declare(stmt['name'], init_val, is_const=True)
-
-        elif t == 'ExpressionStatement':
-            return self.eval_expression(stmt['expr'], env)
-        elif t == 'IO':
-            if stmt['action'] == 'log':
-                value = self.eval_expression(stmt['expr'], env)
-                print(value,end="")
-            elif stmt['action'] == 'input':
-                message = self.eval_expression(stmt['message'], env) if 'message' in stmt else ""
-                raw = input(str(message))
-                try:
-                    if '.' in raw:
-                        value = float(raw)
-                    else:
-                        value = int(raw)
-                except ValueError:
-                    value = raw
-                
-                if stmt['target']['type'] == "IDENTIFIER":
-                    env.set(stmt['target']['value'], value)
-
-                elif stmt['target']['type'] == "Index":
-                    if stmt['target']['target']['type'] == "IDENTIFIER":
-                        varname = stmt['target']['target']['value']
-                        if env.is_const(varname):
-                            raise ValueError(f"Cannot modify constant '{varname}'")
-                    arr = self.eval_expression(stmt['target']['target'], env)
-                    idx = self.eval_expression(stmt['target']['index'], env)
-                    while len(arr) <= idx:
-                        arr.append(None)
-                    arr[idx] = value
-
-            
-            elif stmt['action']=='logln':
-                value = self.eval_expression(stmt['expr'],env)
-                print(value)
-
-        elif t == 'IfStatement':
-            if self.eval_expression(stmt['condition'], env):
-                return self.eval_block(stmt['body'], Env(env))
-            for elseif in stmt.get('elseifs', []):
-                if self.eval_expression(elseif['condition'], env):
-                    return self.eval_block(elseif['body'], Env(env))
-            if stmt.get('else'):
-                return self.eval_block(stmt['else'], Env(env))
-        elif t == 'FuncDecl':
-            self.functions[stmt['name']] = stmt
-
-        elif t == 'ReturnStatement':
-            return {'type': 'return', 'value': self.eval_expression(stmt['expr'], env)}
-
-        elif t == 'BreakStatement':
-            return "Break"
-        elif t == 'SkipStatement':
-            return "Skip"
-        elif t == 'ForLoop':
-            start = self.eval_expression(stmt['start'], env)
-            end = self.eval_expression(stmt['end'], env)
-            step = self.eval_expression(stmt['step'], env)
-            var = stmt['var']
-            i = start
-            while i <= end:
-                loop_env = Env(env)
-                loop_env.declare(var, i)
-                res = self.eval_block(stmt['body'], loop_env)
-                if res == "Skip":
-                    i += step
-                    continue
-                if res == "Break":
-                    break
+        return self.statement_table[stmt.__class__](stmt, env)
+
+    def stmt_VarDecl(self, stmt, env):
+        init_val = self.eval_expression(stmt.value, env) if stmt.value else None
+        env.declare(stmt.name, init_val)
+
+    def stmt_ConstDecl(self, stmt, env):
+        if stmt.value is None:
+            raise ValueError(f"Constant '{stmt.name}' must be initialized")
+        init_val = self.eval_expression(stmt.value, env)
+        env.declare(stmt.name, init_val, is_const=True)
+
+    def stmt_ExpressionStatement(self, stmt, env):
+        return self.eval_expression(stmt.expr, env)
+
+    def stmt_IO(self, stmt, env):
+        if stmt.action == 'log':
+            value = self.eval_expression(stmt.expr, env)
+            self.output.log(value)
+        elif stmt.action == 'input':
+            message = self.eval_expression(stmt.message, env) if stmt.message else ""
+            raw = self.output.input(str(message))
+            try:
+                if '.' in raw:
+                    value = float(raw)
+                else:
+                    value = int(raw)
+            except ValueError:
+                value = raw
+
+            target = stmt.target
+            if target.type == "IDENTIFIER":
+                env.set(target.value, value)
+
+            elif target.type == "Index":
+                if target.target.type == "IDENTIFIER":
+                    varname = target.target.value
+                    if env.is_const(varname):
+                        raise ValueError(f"Cannot modify constant '{varname}'")
+                arr = self.eval_expression(target.target, env)
+                idx = self.eval_expression(target.index, env)
+                set_index(arr, idx, value)
+
+        elif stmt.action=='logln':
+            value = self.eval_expression(stmt.expr,env)
+            self.output.logln(value)
+
+    def stmt_IfStatement(self, stmt, env):
+        if self.eval_expression(stmt.condition, env):
+            return self.eval_block(stmt.body, Env(env))
+        for elseif in stmt.elseifs:
+            if self.eval_expression(elseif.condition, env):
+                return self.eval_block(elseif.body, Env(env))
+        if stmt.orelse:
+            return self.eval_block(stmt.orelse, Env(env))
+
+    def stmt_FuncDecl(self, stmt, env):
+        self.functions[stmt.name] = stmt
+
+    def stmt_ReturnStatement(self, stmt, env):
+        return {'type': 'return', 'value': self.eval_expression(stmt.expr, env)}
+
+    def stmt_BreakStatement(self, stmt, env):
+        return "Break"
+
+    def stmt_SkipStatement(self, stmt, env):
+        return "Skip"
+
+    def stmt_ForLoop(self, stmt, env):
+        start = self.eval_expression(stmt.start, env)
+        end = self.eval_expression(stmt.end, env)
+        step = self.eval_expression(stmt.step, env)
+        var = stmt.var
+        if self.reuse_loop_scopes:
+            return self.counted_loop(stmt, env, start, end, step)
+        i = start
+        while i <= end:
+            loop_env = Env(env)
+            loop_env.declare(var, i)
+            res = self.eval_block(stmt.body, loop_env)
+            if res == "Skip":
                 i += step
-        elif t == 'WhileLoop':
-            while self.eval_expression(stmt['condition'], env):
-                res = self.eval_block(stmt['body'], Env(env))
-                if res == "Break":
-                    break
-                if res == "Skip":
-                    continue
-        elif t == 'DoWhileLoop':
-            while True:
-                res = self.eval_block(stmt['body'], Env(env))
-                if res == "Break":
-                    break
-                if res == "Skip":
-                    continue
-                if not self.eval_expression(stmt['condition'], env):
-                    break
-
-        elif t == 'MatchStatement':
-            expr_value = self.eval_expression(stmt['expr'], env)
-            for case in stmt['cases']:
-                if self.eval_expression(case['value'], env) == expr_value:
-                    return self.eval_statement(case['body'], Env(env))
-            if stmt.get('else'):
-                return self.eval_statement(stmt['else']['body'], Env(env))
-        
-        elif t == "Include":
-            self.handle_include(stmt["path"], env)
-            return
+                continue
+            if res == "Break":
+                break
+            if res.__class__ is dict:
+                return res
+            i += step
+
+    def counted_loop(self, stmt, env, start, end, step):
+        if start.__class__ is int and end.__class__ is int and step.__class__ is int and step > 0:
+            counter = range(start, end + 1, step)
+        else:
+            counter = count_up(start, end, step)
+        return self.each_loop(stmt, env, counter)
+
+    def stmt_ForInLoop(self, stmt, env):
+        items = iterate(self.eval_expression(stmt.iterable, env))
+        if self.reuse_loop_scopes:
+            return self.each_loop(stmt, env, items)
+        for item in items:
+            loop_env = Env(env)
+            loop_env.declare(stmt.var, item)
+            res = self.eval_block(stmt.body, loop_env)
+            if res == "Break":
+                break
+            if res.__class__ is dict:
+                return res
+
+    def each_loop(self, stmt, env, items):
+        # One scope and one variable record serve every iteration; the scope
+        # is only emptied between iterations when the body declares names.
+        loop_env = Env(env)
+        names = loop_env.vars
+        record = {"value": None, "const": False}
+        names[stmt.var] = record
+        body = stmt.body
+        fresh = any(s.type in DECLARATIONS for s in body)
+        run = self.eval_block
+        for i in items:
+            if fresh:
+                names.clear()
+                names[stmt.var] = record
+            record["value"] = i
+            res = run(body, loop_env)
+            if res is not None:
+                if res.__class__ is str:
+                    if res == "Break":
+                        break
+                elif res.__class__ is dict:
+                    return res
+
+    def loop_scope(self, body, env):
+        """Return the scope the body of a while/repeat loop runs in and
+        whether it must be emptied before each iteration, or None."""
+        if not self.reuse_loop_scopes:
+            return None, False
+        return Env(env), any(s.type in DECLARATIONS for s in body)
+
+    def stmt_WhileLoop(self, stmt, env):
+        loop_env, fresh = self.loop_scope(stmt.body, env)
+        while self.eval_expression(stmt.condition, env):
+            if loop_env is None:
+                res = self.eval_block(stmt.body, Env(env))
+            else:
+                if fresh:
+                    loop_env.vars.clear()
+                res = self.eval_block(stmt.body, loop_env)
+            if res == "Break":
+                break
+            if res == "Skip":
+                continue
+            if res.__class__ is dict:
+                return res
+
+    def stmt_DoWhileLoop(self, stmt, env):
+        loop_env, fresh = self.loop_scope(stmt.body, env)
+        while True:
+            if loop_env is None:
+                res = self.eval_block(stmt.body, Env(env))
+            else:
+                if fresh:
+                    loop_env.vars.clear()
+                res = self.eval_block(stmt.body, loop_env)
+            if res == "Break":
+                break
+            if res == "Skip":
+                continue
+            if res.__class__ is dict:
+                return res
+            if not self.eval_expression(stmt.condition, env):
+                break
+
+    def stmt_MatchStatement(self, stmt, env):
+        expr_value = self.eval_expression(stmt.expr, env)
+        try:
+            table = self.case_tables[stmt]
+        except KeyError:
+            table = self.case_tables[stmt] = case_table(stmt.cases)
+        if table is not None:
+            index = case_index(table, expr_value)
+            if index is not None:
+                return self.eval_arm(stmt.cases[index].body, env)
+        else:
+            for case in stmt.cases:
+                if self.eval_expression(case.value, env) == expr_value:
+                    return self.eval_arm(case.body, env)
+        if stmt.orelse:
+            return self.eval_arm(stmt.orelse.body, env)
+
+    def eval_arm(self, body, env):
+        # An arm is one statement: only a declaration needs a scope of its own.
+        if body.type in DECLARATIONS:
+            env = Env(env)
+        return self.statement_table[body.__class__](body, env)
+
+    def stmt_Include(self, stmt, env):
+        self.handle_include(stmt.path, env)
 
     def eval_block(self, block, env):
+        dispatch = self.statement_table
         result = None
         for stmt in block:
-            result = self.eval_statement(stmt, env)
-            if result == "Break":
-                return "Break"
-            if isinstance(result, dict) and result.get('type') == 'return':
+            result = dispatch[stmt.__class__](stmt, env)
+            if result is None:
+                continue
+            if result.__class__ is str:
+                if result == "Break" or result == "Skip":
+                    return result
+            elif result.__class__ is dict and result.get('type') == 'return':
                 return result
-            if result == 'Skip':
-                return "Skip"
         return result
     
     def handle_include(self, path, env):
         if path in self.loaded_modules:
             return 
 
-        code = None
-        if path.endswith(".ax") or path.startswith(".") or path.startswith("/"):
-            abs_path = os.path.abspath(path)
-            if not os.path.exists(abs_path):
-                raise RuntimeError(f"Module file not found: {path}")
-            with open(abs_path, "r") as f:
-                code = f.read()
-        else:
-            try:
-                import importlib.resources
-                with importlib.resources.open_text("axion.stdlib", f"{path}.ax") as f:
-                    code = f.read()
-            except FileNotFoundError:
-                raise RuntimeError(f"Stdlib module not found: {path}")
-
-        self.loaded_modules.add(path)
+        native = load_module(path)
+        if native is not None:
+            self.loaded_modules.add(path)
+            env.declare(module_name(path), native)
+            return
 
-        from axion.lexer import tokenization
-        from axion.parser import parser
+        from axion.cache import read_module, load_program
 
-        tokens = tokenization(code)
-        p = parser(tokens)
-        program = p.parse_program()
+        filename, code = read_module(path)
+        self.loaded_modules.add(path)
+        program = load_program(code, filename, self.opt_level, self.use_cache)
 
-        module_interpreter = Interpreter(program)
+        module_interpreter = self.module_interpreter(program, filename, path)
         module_interpreter.loaded_modules = self.loaded_modules 
+        module_interpreter.memos = self.memos
+        module_interpreter.output = self.output
         module_env = Env(None)
-        module_interpreter.eval_block(program['body'], module_env)
+        module_interpreter.eval_block(program.body, module_env)
         
         def make_module_func(func_name, interpreter_instance):
             def func(*args):
@@ -252,231 +403,181 @@ class Interpreter:
         for func_name in module_interpreter.functions:
             module_dict[func_name] = make_module_func(func_name, module_interpreter)
 
-        module_name = os.path.splitext(os.path.basename(path))[0]
-        env.declare(module_name, module_dict)
+        env.declare(module_name(path), module_dict)
     
+    def module_interpreter(self, program, filename, path):
+        return Interpreter(program, self.opt_level, self.use_cache)
+
     def call_function(self, func_decl, args, calling_env):
+        if func_decl.memo is not None:
+            return self.call_memo(func_decl, args, calling_env)
+        return self.call_body(func_decl, args, calling_env)
+
+    def call_memo(self, func_decl, args, calling_env):
+        memo = self.memos.get(func_decl)
+        if memo is None:
+            memo = self.memos[func_decl] = Memo(func_decl.name, func_decl.memo)
+        return memo.call(lambda *a: self.call_body(func_decl, a, calling_env), args)
+
+    def call_body(self, func_decl, args, calling_env):
         func_env = Env(calling_env)
 
-        func_name = func_decl['name']
+        func_name = func_decl.name
         func_env.declare(func_name, lambda *a: self.call_function(func_decl, a, func_env))
         
-        for pname, arg_val in zip(func_decl['params'], args):
+        for pname, arg_val in zip(func_decl.params, args):
             func_env.declare(pname, arg_val)
         
-        result = self.eval_block(func_decl['body'], func_env)
+        result = self.eval_block(func_decl.body, func_env)
         
-        if isinstance(result, dict) and result.get('type') == 'return':
+        if result.__class__ is dict and result.get('type') == 'return':
             return result['value']
         return result
 
     def eval_expression(self, expr, env):
-        t = expr['type']
-        if t == 'NUMBER':
-            if '.' in expr['value']:
-                return float(expr['value'])
-            else:
-                return int(expr['value'])
-
-        elif t == 'STRING':
-            raw_str = expr['value']
-            result = ""
-            i = 0
-            while i < len(raw_str):
-                if raw_str[i] == '{':
-                    j = i + 1
-                    while j < len(raw_str) and raw_str[j] != '}':
-                        j += 1
-                    if j >= len(raw_str):
-                        raise Exception("Unclosed interpolation in string")
-
-                    inner_code = raw_str[i+1:j].strip()
-
-                    from axion.lexer import tokenization
-                    from axion.parser import parser
-
-                    inner_tokens = tokenization(inner_code)
-                    inner_ast = parser(inner_tokens).parse_expression()
-                    value = self.eval_expression(inner_ast, env)
-
-                    result += str(value)
-                    i = j + 1
-                else:
-                    result += raw_str[i]
-                    i += 1
-            return result
+        return self.expression_table[expr.__class__](expr, env)
 
-        elif t == 'IDENTIFIER':
-            return env.get_value(expr['value'])
-        elif t == "MemberAccess":
-            obj = self.eval_expression(expr["object"], env)
-            prop = expr["property"]
+    def expr_NUMBER(self, expr, env):
+        if '.' in expr.value:
+            return float(expr.value)
+        else:
+            return int(expr.value)
 
-            if isinstance(obj, dict) and prop in obj:
-                return obj[prop]
-            elif hasattr(obj, prop):
-                return getattr(obj, prop)
-            else:
-                raise RuntimeError(f"Property '{prop}' not found on {obj}")
-        elif t == 'BinaryOp':
-            left = self.eval_expression(expr['left'], env)
-            right = self.eval_expression(expr['right'], env)
-            op = expr['op']
-            if op == '+': return left + right
-            elif op == '-': return left - right
-            elif op == '*': return left * right
-            elif op == '/': return left / right
-            elif op == '%': return left % right
-            elif op == '==': return left == right
-            elif op == '!=': return left != right
-            elif op == '<': return left < right
-            elif op == '<=': return left <= right
-            elif op == '>': return left > right
-            elif op == '>=': return left >= right
-            elif op == 'both': return left and right
-            elif op == 'any': return left or right
-
-            elif op == '&': return int(left) & int(right)
-            elif op == '|': return int(left) | int(right)
-            elif op == '^': return int(left) ^ int(right)
-            elif op == '<<': return int(left) << int(right)
-            elif op == '>>': return int(left) >> int(right)
-
-        elif t == 'UnaryOp':
-            op = expr['op']
-            if op == '~':
-                val = self.eval_expression(expr['expr'], env)
-                return ~val
-            elif op == 'invert':
-                val = self.eval_expression(expr['expr'], env)
-                def _to_bool(v):
-                    if isinstance(v, bool):
-                        return v
-                    if isinstance(v, (int, float)):
-                        return v != 0
-                    if isinstance(v, str):
-                        s = v.strip().lower()
-                        if s == 'true':
-                            return True
-                        if s == 'false':
-                            return False
-                        try:
-                            return float(s) != 0
-                        except Exception:
-                            return len(s) > 0
-                    return bool(v)
-                return not _to_bool(val)
-            elif op == '-':
-                val = self.eval_expression(expr['expr'], env)
-                return -val
-            else:
-                raise SyntaxError(f"Unknown unary operator: {op}")
+    def expr_STRING(self, expr, env):
+        return expr.value
 
-        elif t == 'Assignment':
-            target = expr['target']
-            value = self.eval_expression(expr['value'], env)
-            op = expr['op']
+    def expr_Constant(self, expr, env):
+        return expr.value
 
-            if target['type'] == "IDENTIFIER":
-                name = target['value']
+    def expr_Template(self, expr, env):
+        dispatch = self.expression_table
+        return "".join([part if part.__class__ is str else str(dispatch[part.__class__](part, env))
+                        for part in expr.parts])
+
+    def expr_IDENTIFIER(self, expr, env):
+        return env.get_value(expr.value)
+
+    def expr_MemberAccess(self, expr, env):
+        obj = self.eval_expression(expr.object, env)
+        prop = expr.property
+
+        if isinstance(obj, dict) and prop in obj:
+            return obj[prop]
+        elif hasattr(obj, prop):
+            return getattr(obj, prop)
+        else:
+            raise RuntimeError(f"Property '{prop}' not found on {obj}")
+
+    def expr_BinaryOp(self, expr, env):
+        dispatch = self.expression_table
+        left = dispatch[expr.left.__class__](expr.left, env)
+        right = dispatch[expr.right.__class__](expr.right, env)
+        fn = BINARY_OPS.get(expr.op)
+        if fn is not None:
+            return fn(left, right)
+
+    def expr_UnaryOp(self, expr, env):
+        fn = UNARY_OPS.get(expr.op)
+        if fn is None:
+            raise SyntaxError(f"Unknown unary operator: {expr.op}")
+        return fn(self.eval_expression(expr.expr, env))
+
+    def expr_Assignment(self, expr, env):
+        target = expr.target
+        value = self.eval_expression(expr.value, env)
+        fn = ASSIGN_OPS.get(expr.op)
+
+        if target.type == "IDENTIFIER":
+            name = target.value
+            record = env.lookup(name)
+            if record['const']:
+                raise ValueError(f"Cannot modify constant '{name}'")
+            record['value'] = value if fn is None else fn(record['value'], value)
+            return record['value']
+
+        elif target.type == "Index":
+            arr = self.eval_expression(target.target, env)
+            idx = self.eval_expression(target.index, env)
+
+            if target.target.type == "IDENTIFIER":
+                name = target.target.value
                 if env.is_const(name):
                     raise ValueError(f"Cannot modify constant '{name}'")
 
-                if op == '=':
-                    env.update(name, value)
-                elif op == '+=':
-                    env.update(name, env.get_value(name) + value)
-                elif op == '-=':
-                    env.update(name, env.get_value(name) - value)
-                elif op == '*=':
-                    env.update(name, env.get_value(name) * value)
-                elif op == '/=':
-                    env.update(name, env.get_value(name) / value)
-                elif op == '%=':
-                    env.update(name, env.get_value(name) % value)
-                return env.get_value(name)
-
-            elif target['type'] == "Index":
-                arr = self.eval_expression(target['target'], env)
-                idx = self.eval_expression(target['index'], env)
-
-                if target['target']['type'] == "IDENTIFIER":
-                    name = target['target']['value']
-                    if env.is_const(name):
-                        raise ValueError(f"Cannot modify constant '{name}'")
-
-                if op == '=':
-                    while len(arr) <= idx:
-                        arr.append(None)
-                    arr[idx] = value
-                else:
-                    current = arr[idx]
-                    if op == '+=': arr[idx] = current + value
-                    elif op == '-=': arr[idx] = current - value
-                    elif op == '*=': arr[idx] = current * value
-                    elif op == '/=': arr[idx] = current / value
-                    elif op == '%=': arr[idx] = current % value
-
-                return arr[idx]
-
-        elif t == 'Call':
-            callee = expr['callee']
-
-            if callee['type'] == 'IDENTIFIER':
-                func_name = callee['value']
-                
-                if func_name in self.functions:
-                    func_def = self.functions[func_name]
-                    if func_def.get("builtin"):
-                        return func_def["impl"]()
-                    func_env = Env(env)
-
-                    func_env.declare(func_name, lambda *args: self.call_function(func_def, args, func_env))
-
-                    for pname, arg_expr in zip(func_def['params'], expr['args']):
-                        func_env.declare(pname, self.eval_expression(arg_expr, env))
-                    result = self.eval_block(func_def['body'], func_env)
-                    if isinstance(result, dict) and result.get('type') == 'return':
-                        return result['value']
-                    return result
+            if fn is None:
+                set_index(arr, idx, value)
+            else:
+                arr[idx] = fn(arr[idx], value)
 
-            
-                
-                try:
-                    func = env.get_value(func_name)
-                    if not callable(func):
-                        raise Exception(f"Error: Variable '{func_name}' is not callable")
-                    return func(*[self.eval_expression(arg, env) for arg in expr['args']])
-                except NameError:
-                    raise Exception(f"Error: Function '{func_name}' is not defined")
-
-            elif callee['type'] == 'MemberAccess':
-                obj = self.eval_expression(callee['object'], env)
-                prop = callee['property']
-                func = None
-                if isinstance(obj, dict) and prop in obj:
-                    func = obj[prop]
-                elif hasattr(obj, prop):
-                    func = getattr(obj, prop)
-                if not callable(func):
-                    raise Exception(f"Error: '{prop}' is not callable on {obj}")
-                args = [self.eval_expression(arg, env) for arg in expr['args']]
-                return func(*args)
-
-            elif callee['type'] == 'Index':
-                obj = self.eval_expression(callee['target'], env)
-                idx = self.eval_expression(callee['index'], env)
-                func = obj[idx]
+            return arr[idx]
+
+    def expr_Call(self, expr, env):
+        callee = expr.callee
+
+        if callee.type == 'IDENTIFIER':
+            func_name = callee.value
+
+            if func_name in self.functions:
+                func_def = self.functions[func_name]
+                if func_def.__class__ is NativeFunction:
+                    return func_def(*[self.eval_expression(arg, env) for arg in expr.args])
+                if func_def.memo is not None:
+                    args = [self.eval_expression(arg, env) for _, arg in zip(func_def.params, expr.args)]
+                    return self.call_memo(func_def, args, env)
+                func_env = Env(env)
+
+                func_env.declare(func_name, lambda *args: self.call_function(func_def, args, func_env))
+
+                for pname, arg_expr in zip(func_def.params, expr.args):
+                    func_env.declare(pname, self.eval_expression(arg_expr, env))
+                result = self.eval_block(func_def.body, func_env)
+                if result.__class__ is dict and result.get('type') == 'return':
+                    return result['value']
+                return result
+
+            try:
+                func = env.get_value(func_name)
                 if not callable(func):
-                    raise Exception(f"Error: Element at index {idx} is not callable")
-                return func(*[self.eval_expression(arg, env) for arg in expr['args']])
+                    raise Exception(f"Error: Variable '{func_name}' is not callable")
+                return func(*[self.eval_expression(arg, env) for arg in expr.args])
+            except NameError:
+                raise Exception(f"Error: Function '{func_name}' is not defined")
+
+        elif callee.type == 'MemberAccess':
+            obj = self.eval_expression(callee.object, env)
+            prop = callee.property
+            func = None
+            if isinstance(obj, dict) and prop in obj:
+                func = obj[prop]
+            elif hasattr(obj, prop):
+                func = getattr(obj, prop)
+            if not callable(func):
+                raise Exception(f"Error: '{prop}' is not callable on {obj}")
+            args = [self.eval_expression(arg, env) for arg in expr.args]
+            return func(*args)
+
+        elif callee.type == 'Index':
+            obj = self.eval_expression(callee.target, env)
+            idx = self.eval_expression(callee.index, env)
+            func = obj[idx]
+            if not callable(func):
+                raise Exception(f"Error: Element at index {idx} is not callable")
+            return func(*[self.eval_expression(arg, env) for arg in expr.args])
 
-            else:
-                raise Exception(f"Error: Unsupported callee type {callee['type']}")
-
-        elif t == 'ArrayLiteral':
-            return [self.eval_expression(el, env) for el in expr['elements']]
-        elif t == 'Index':
-            arr = self.eval_expression(expr['target'], env)
-            idx = self.eval_expression(expr['index'], env)
-            return arr[idx]
\ No newline at end of file
+        else:
+            raise Exception(f"Error: Unsupported callee type {callee.type}")
+
+    def expr_ArrayLiteral(self, expr, env):
+        return [self.eval_expression(el, env) for el in expr.elements]
+
+    def expr_MapLiteral(self, expr, env):
+        result = Map()
+        for key, value in zip(expr.keys, expr.values):
+            key = self.eval_expression(key, env)
+            result[key] = self.eval_expression(value, env)
+        return result
+
+    def expr_Index(self, expr, env):
+        arr = self.eval_expression(expr.target, env)
+        idx = self.eval_expression(expr.index, env)
+        return arr[idx]
\ No newline at end of file
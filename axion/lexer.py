@@ -1,49 +1,104 @@
-def token_identification(token):
-    keywords = {'if', 'else', 'while', 'return', 'func', 'set', 'const', 'then', 'loop', 'from', 'to', 'step', 'do', 'match', 'case', 'default', 'break', 'repeat', 'input', 'log','logln','skip','include'}
-    operators = {'+', '-', '*', '/', '=','%', '==', '!=', '<', '>', '<=', '>=', 'both', 'any', 'invert', '+=', '-=', '*=', '/=', '%=', '->','&','|','^','<<','>>','~'}
-    punctuation = {'.', ',', ';', '(', ')', '{', '}', '[', ']'}
+"""
+Lexer for Axion source code.
+
+The whole token grammar is one regular expression compiled at import time.
+`tokenize()` walks it lazily and yields one `(kind, text, start, line)`
+tuple per token: `kind` is an integer code from the tables below, `start`
+the offset of the token in the source and `line` its 1-based line number.
+`//` and `/* ... */` comments are skipped, as is any character that starts
+no token.
+
+`tokenization()` is the older interface: a list of `(text, type)` pairs
+where type is one of "NUMBER", "STRING", "IDENTIFIER", "KEYWORD",
+"OPERATOR" or "PUNCTUATION".
+"""
+
+import re
+
+# Field positions in a token tuple.
+KIND, TEXT, START, LINE = range(4)
+
+KEYWORDS = ('if', 'else', 'while', 'return', 'func', 'set', 'const', 'then', 'loop', 'from', 'to', 'step',
+            'do', 'match', 'case', 'default', 'break', 'repeat', 'input', 'log', 'logln', 'skip', 'include')
+OPERATORS = ('+', '-', '*', '/', '=', '%', '==', '!=', '<', '>', '<=', '>=', '+=', '-=', '*=', '/=', '%=',
+             '->', '&', '|', '^', '<<', '>>', '~')
+PUNCTUATION = ('.', ',', ';', ':', '(', ')', '{', '}', '[', ']')
+# Spelled like identifiers, and lexed as identifiers, but used as operators.
+WORD_OPERATORS = ('both', 'any', 'invert')
+
+# Kind codes. Every keyword, operator and punctuation mark has its own
+# kind; OPERATOR covers any other run of operator characters.
+EOF = 0
+NUMBER = 1
+STRING = 2
+IDENTIFIER = 3
+OPERATOR = 4
+
+KIND_NAMES = ['EOF', 'NUMBER', 'STRING', 'IDENTIFIER', 'OPERATOR']
+TYPE_NAMES = ['None', 'NUMBER', 'STRING', 'IDENTIFIER', 'OPERATOR']
+KINDS = {}
 
-    if token in keywords:
-        return 'KEYWORD'
-    elif token.isidentifier():
+for _type, _texts in (('KEYWORD', KEYWORDS), ('OPERATOR', OPERATORS),
+                      ('PUNCTUATION', PUNCTUATION), ('IDENTIFIER', WORD_OPERATORS)):
+    for _text in _texts:
+        KINDS[_text] = len(KIND_NAMES)
+        KIND_NAMES.append(_text)
+        TYPE_NAMES.append(_type)
+
+TOKEN_PATTERN = re.compile(r'''\s*(?:
+      (//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))                                  # 1 comment
+    | (\d+(?:\.\d+)?)                                                   # 2 number
+    | ([a-zA-Z_]\w*)                                                    # 3 identifier / keyword
+    | (".*?"|'.*?')                                                     # 4 string
+    | (<<=|>>=|<<|>>|<=|>=|==|!=|[+\-*/%=<>!&|^~]+)                     # 5 operator
+    | ([.,;:(){}\[\]])                                                  # 6 punctuation
+    | (.)                                                               # 7 anything else
+)''', re.VERBOSE)
+
+_COMMENT, _NUMBER, _WORD, _STRING, _OPERATOR, _PUNCT, _OTHER = range(1, 8)
+
+
+def tokenize(source_code):
+    """Yield the tokens of `source_code` one at a time."""
+    kinds = KINDS.get
+    newlines = source_code.count
+    line = 1
+    last = 0
+    for m in TOKEN_PATTERN.finditer(source_code):
+        group = m.lastindex
+        if group == _COMMENT or group == _OTHER:
+            continue
+        text = m.group(group)
+        start = m.start(group)
+        line += newlines('\n', last, start)
+        last = start
+        if group == _WORD:
+            kind = kinds(text, IDENTIFIER)
+        elif group == _NUMBER:
+            kind = NUMBER
+        elif group == _STRING:
+            kind = STRING
+        elif group == _PUNCT:
+            kind = KINDS[text]
+        else:
+            kind = kinds(text, OPERATOR)
+        yield (kind, text, start, line)
+
+
+def token_identification(token):
+    kind = KINDS.get(token)
+    if kind is not None and TYPE_NAMES[kind] != 'IDENTIFIER':
+        return TYPE_NAMES[kind]
+    if token.isidentifier():
         return 'IDENTIFIER'
     elif token.isdigit():
         return 'NUMBER'
     elif (token.startswith('"') and token.endswith('"')) or (token.startswith("'") and token.endswith("'")):
         return 'STRING'
-    elif token in operators:
-        return 'OPERATOR'
-    elif token in punctuation:
-        return 'PUNCTUATION'
     else:
         return 'UNKNOWN'
 
 
 def tokenization(source_code):
-    import re
-    token_pattern = r'\s*(?:(\d+(\.\d+)?)|([a-zA-Z_]\w*)|(".*?")|(\'.*?\')|(<<=|>>=|<<|>>|<=|>=|==|!=|both|any|invert|[+\-*/%=<>!&|^~]+)|([.,;(){}\[\]]))'
-    tokens = []
-
-    for match in re.finditer(token_pattern, source_code):
-        groups = match.groups()
-        number = groups[0]
-        identifier = groups[2]
-        double_quoted = groups[3]
-        single_quoted = groups[4]
-        operator = groups[5]
-        punct = groups[6]
-        if number:
-            tokens.append((number, 'NUMBER'))
-        elif identifier:
-            token_type = token_identification(identifier)
-            tokens.append((identifier, token_type))
-        elif double_quoted:
-            tokens.append((double_quoted, 'STRING'))
-        elif single_quoted:
-            tokens.append((single_quoted, 'STRING'))
-        elif operator:
-            tokens.append((operator, 'OPERATOR'))
-        elif punct:
-            tokens.append((punct, 'PUNCTUATION'))
-
-    return tokens
+    types = TYPE_NAMES
+    return [(text, types[kind]) for kind, text, _, _ in tokenize(source_code)]
@@ -0,0 +1,190 @@
+"""
+Native (Python-implemented) functions and modules.
+
+A native module is loaded with `include "<name>";` exactly like a module
+written in Axion, but its functions are Python callables that every engine
+calls directly with the evaluated arguments:
+
+    from axion import native
+
+    native.register_module("vec", {
+        "dot": {"impl": dot, "arity": 2, "pure": True},
+        "norm": norm,
+        "ORIGIN": [0, 0],
+    })
+
+Each member is either a callable, a spec dict holding the callable under
+"impl" plus optional "arity" (the exact number of arguments, None for any)
+and "pure" (no side effects and the result depends only on the arguments,
+which lets the optimizer evaluate calls with constant arguments ahead of
+time), or any other value, exported as is. Functions that print should
+call `native.write(text)`, which keeps their text in order with the
+program's own log and logln output.
+
+A bare include name resolves to a registered module first, then to
+`axion/stdlib/<name>.py`, which is imported and registers itself, and only
+then to `axion/stdlib/<name>.ax`.
+"""
+
+import sys
+import hashlib
+import time
+import importlib
+import importlib.resources
+
+from axion.runtime import RUNNING, is_stdlib_path
+
+
+class NativeFunction:
+    __slots__ = ('name', 'impl', 'arity', 'pure')
+
+    def __init__(self, name, impl, arity=None, pure=False):
+        self.name = name
+        self.impl = impl
+        self.arity = arity
+        self.pure = pure
+
+    def __call__(self, *args):
+        if self.arity is not None and len(args) != self.arity:
+            raise Exception(f"Error: Function '{self.name}' takes {self.arity} "
+                            f"argument(s), got {len(args)}")
+        return self.impl(*args)
+
+    def __repr__(self):
+        return f"<native function {self.name}>"
+
+
+def native_function(name, value):
+    if isinstance(value, NativeFunction):
+        return value
+    if isinstance(value, dict):
+        return NativeFunction(name, value["impl"], value.get("arity"), value.get("pure", False))
+    if callable(value):
+        return NativeFunction(name, value)
+    return value
+
+
+# Registered modules: name -> {member: NativeFunction or value}.
+MODULES = {}
+
+
+def register_module(name, members):
+    """Make `include "<name>";` load `members`, replacing any earlier module."""
+    module = {member: native_function(f"{name}.{member}", value)
+              for member, value in members.items()}
+    MODULES[name] = module
+    return module
+
+
+def find_module(path):
+    """Return the registered module an include path refers to, or None."""
+    module = MODULES.get(path)
+    if module is not None:
+        return module
+    if not is_stdlib_path(path) or not path.isidentifier() or path.startswith("_"):
+        return None
+    if not (importlib.resources.files("axion.stdlib") / f"{path}.py").is_file():
+        return None
+    importlib.import_module(f"axion.stdlib.{path}")
+    return MODULES.get(path)
+
+
+def load_module(path):
+    """Return a fresh module dict for `include path`, or None if it is not native."""
+    module = find_module(path)
+    return None if module is None else dict(module)
+
+
+# Fingerprints by module name, kept with the module dict they describe.
+FINGERPRINTS = {}
+
+
+def fingerprint(path):
+    """A digest of the native module `include path` loads, or None if it is
+    not native: its members, their arity and purity, and the Python source
+    files implementing them. Ahead-of-time results of its pure functions
+    are only valid while this stays the same."""
+    module = find_module(path)
+    if module is None:
+        return None
+    known = FINGERPRINTS.get(path)
+    if known is not None and known[0] is module:
+        return known[1]
+    digest = hashlib.sha256()
+    files = set()
+    for member, value in sorted(module.items()):
+        if isinstance(value, NativeFunction):
+            impl = value.impl
+            where = (getattr(impl, "__module__", None), getattr(impl, "__qualname__", None))
+            digest.update(repr((member, value.arity, value.pure, where)).encode())
+            python_module = sys.modules.get(where[0])
+            filename = getattr(python_module, "__file__", None)
+            if filename is not None:
+                files.add(filename)
+        else:
+            digest.update(repr((member, value)).encode())
+    for filename in sorted(files):
+        try:
+            with open(filename, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(filename.encode())
+    FINGERPRINTS[path] = (module, digest.hexdigest())
+    return FINGERPRINTS[path][1]
+
+
+def write(text):
+    """Write `text` to the output of the running program."""
+    if RUNNING:
+        RUNNING[-1].write(text)
+    else:
+        sys.stdout.write(text)
+
+
+def time_now():
+    return int(time.time() * 1000)
+
+
+def lazy_range(*args):
+    """range(end), range(start, end) or range(start, end, step): the
+    integers from start up to, but not including, end. Nothing is stored;
+    `loop (i in range(...))` produces them one at a time."""
+    if not 1 <= len(args) <= 3:
+        raise Exception(f"Error: Function 'range' takes 1 to 3 argument(s), got {len(args)}")
+    for arg in args:
+        if arg.__class__ is not int:
+            raise TypeError(f"range() arguments must be integers, got {arg!r}")
+    if len(args) == 3 and args[2] == 0:
+        raise ValueError("range() step must not be zero")
+    return range(*args)
+
+
+def has(collection, item):
+    """Whether a map has the key, a list the item, or a string the text."""
+    return item in collection
+
+
+def keys(collection):
+    """The keys of a map, in the order they were added."""
+    if not isinstance(collection, dict):
+        raise TypeError(f"keys() expects a map, got {collection!r}")
+    return list(collection)
+
+
+def remove(collection, key):
+    """Remove a key from a map and return its value."""
+    if not isinstance(collection, dict):
+        raise TypeError(f"remove() expects a map, got {collection!r}")
+    if key not in collection:
+        raise RuntimeError(f"Key {key!r} not found in map")
+    return collection.pop(key)
+
+
+# Functions every program can call without an include.
+BUILTINS = {
+    "time_now": NativeFunction("time_now", time_now, 0),
+    "range": NativeFunction("range", lazy_range),
+    "has": NativeFunction("has", has, 2),
+    "keys": NativeFunction("keys", keys, 1),
+    "remove": NativeFunction("remove", remove, 2),
+}
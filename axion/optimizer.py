@@ -0,0 +1,196 @@
+"""
+AST optimizer run between `parser.parse_program()` and execution.
+
+- NUMBER and STRING literals become Constant nodes holding the Python value,
+  so no engine converts literal text at run time.
+- BinaryOp, UnaryOp and Template nodes whose operands are all constants are
+  evaluated once and replaced by a Constant. Operations that would raise
+  (for example a division by zero) are left for run time, so the error
+  surfaces exactly where it did before.
+- A top-level `const` with a constant initializer is substituted into the
+  reads that follow it, provided nothing else in the program declares the
+  same name. Functions run in their caller's scope, so a name that is also
+  used as a local, a parameter or a loop variable is never propagated.
+- Calls to functions a native module marks pure, such as `math.sqrt(2)`
+  after a top-level `include "math";`, are evaluated when every argument is
+  a constant, under the same conditions as const propagation.
+"""
+
+import math
+
+from axion.ast import Node, Constant
+from axion.runtime import BINARY_OPS, UNARY_OPS, number_value, module_name
+from axion.native import NativeFunction, find_module
+
+# Folding must not blow up the program: leave huge results to run time.
+MAX_FOLDED_LENGTH = 4096
+
+
+def declared_names(node, counts):
+    if isinstance(node, list):
+        for item in node:
+            declared_names(item, counts)
+        return counts
+    if not isinstance(node, Node):
+        return counts
+    t = node.type
+    names = ()
+    if t == 'VarDecl' or t == 'ConstDecl':
+        names = (node.name,)
+    elif t == 'FuncDecl':
+        names = node.params
+    elif t == 'ForLoop' or t == 'ForInLoop':
+        names = (node.var,)
+    elif t == 'Include':
+        names = (module_name(node.path),)
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+    for _, value in node.fields():
+        if isinstance(value, (Node, list)):
+            declared_names(value, counts)
+    return counts
+
+
+def foldable(value):
+    if isinstance(value, str):
+        return len(value) <= MAX_FOLDED_LENGTH
+    if isinstance(value, int):
+        return value.bit_length() <= MAX_FOLDED_LENGTH
+    return isinstance(value, float)
+
+
+class Optimizer:
+    def __init__(self):
+        self.declarations = {}
+        self.consts = {}
+        self.natives = {}
+
+    def optimize_program(self, program):
+        self.declarations = declared_names(program.body, {})
+        body = []
+        for stmt in program.body:
+            stmt = self.visit(stmt)
+            if (stmt.type == 'ConstDecl' and isinstance(stmt.value, Constant)
+                    and self.declarations.get(stmt.name) == 1):
+                self.consts[stmt.name] = stmt.value.value
+            elif stmt.type == 'Include' and self.declarations.get(module_name(stmt.path)) == 1:
+                module = find_module(stmt.path)
+                if module is not None:
+                    self.natives[module_name(stmt.path)] = module
+            body.append(stmt)
+        program.body = body
+        return program
+
+    # -- traversal ------------------------------------------------------------
+
+    def visit(self, node):
+        method = getattr(self, f'visit_{node.type}', None)
+        if method is not None:
+            return method(node)
+        self.visit_fields(node)
+        return node
+
+    def visit_value(self, value):
+        if isinstance(value, Node):
+            return self.visit(value)
+        if isinstance(value, list):
+            return [self.visit_value(v) for v in value]
+        return value
+
+    def visit_fields(self, node):
+        for name, value in node.fields():
+            setattr(node, name, self.visit_value(value))
+
+    def visit_target(self, target):
+        # Assignment targets keep their identifiers so constant checks and
+        # name errors still happen where the engines expect them.
+        if target.type == 'Index':
+            if target.target.type != 'IDENTIFIER':
+                target.target = self.visit(target.target)
+            target.index = self.visit(target.index)
+        elif target.type != 'IDENTIFIER':
+            return self.visit(target)
+        return target
+
+    # -- statements -----------------------------------------------------------
+
+    def visit_IO(self, node):
+        if node.action == 'input':
+            node.target = self.visit_target(node.target)
+            if node.message:
+                node.message = self.visit(node.message)
+        else:
+            node.expr = self.visit(node.expr)
+        return node
+
+    # -- expressions ----------------------------------------------------------
+
+    def visit_NUMBER(self, node):
+        try:
+            return Constant(number_value(node.value))
+        except ValueError:
+            return node
+
+    def visit_STRING(self, node):
+        return Constant(node.value)
+
+    def visit_IDENTIFIER(self, node):
+        if node.value in self.consts:
+            return Constant(self.consts[node.value])
+        return node
+
+    def visit_Template(self, node):
+        node.parts = self.visit_value(node.parts)
+        if all(isinstance(p, (str, Constant)) for p in node.parts):
+            text = "".join(p if isinstance(p, str) else str(p.value) for p in node.parts)
+            if foldable(text):
+                return Constant(text)
+        return node
+
+    def visit_BinaryOp(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        if isinstance(node.left, Constant) and isinstance(node.right, Constant):
+            return self.fold(node, BINARY_OPS.get(node.op), node.left.value, node.right.value)
+        return node
+
+    def visit_UnaryOp(self, node):
+        node.expr = self.visit(node.expr)
+        if isinstance(node.expr, Constant):
+            return self.fold(node, UNARY_OPS.get(node.op), node.expr.value)
+        return node
+
+    def fold(self, node, fn, *operands):
+        if fn is None:
+            return node
+        try:
+            value = fn(*operands)
+        except Exception:
+            return node
+        if isinstance(value, bool) or (foldable(value) and not
+                                       (isinstance(value, float) and math.isnan(value))):
+            return Constant(value)
+        return node
+
+    def visit_Assignment(self, node):
+        node.value = self.visit(node.value)
+        node.target = self.visit_target(node.target)
+        return node
+
+    def visit_Call(self, node):
+        if node.callee.type != 'IDENTIFIER':
+            node.callee = self.visit(node.callee)
+        node.args = [self.visit(arg) for arg in node.args]
+        callee = node.callee
+        if (callee.type == 'MemberAccess' and callee.object.type == 'IDENTIFIER'
+                and callee.object.value in self.natives
+                and all(isinstance(arg, Constant) for arg in node.args)):
+            fn = self.natives[callee.object.value].get(callee.property)
+            if (isinstance(fn, NativeFunction) and fn.pure
+                    and (fn.arity is None or fn.arity == len(node.args))):
+                return self.fold(node, fn.impl, *[arg.value for arg in node.args])
+        return node
+
+
+def optimize(program):
+    return Optimizer().optimize_program(program)
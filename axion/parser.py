@@ -1,212 +1,370 @@
+"""
+Recursive-descent parser for Axion.
+
+Statements are parsed by one method per statement keyword. Expressions use
+a table-driven Pratt parser: every binary operator's token kind maps to the
+precedence level(s) it is parsed at, loosest first:
+
+    1  both any
+    2  == !=
+    3  < <= > >=
+    4  & | ^ << >>
+    5  + -
+    6  << >>
+    7  * / %
+
+then prefix `invert ~ -`, then primaries with their `[...]`, `.name` and
+`(...)` suffixes. Assignment sits below level 1 and is right-associative.
+
+By default the parser reproduces the grammar the language has always had,
+where the right operand of some levels is parsed tighter than the left:
+after `<`, `<=`, `>` and `>=` it is parsed at level 5 and after `+` and `-`
+at level 7, and `<<`/`>>` are also accepted at level 4. So `2 + 3 << 1` is
+`(2 + 3) << 1`, while `1 << 2 + 1` is `(1 << 2) + 1`, and `a < b & c` is a
+syntax error. Passing `compat=False` drops the quirks: every operand is
+parsed one level tighter than its operator and shifts only live at level 6.
+"""
+
+from axion.ast import *
+from axion.lexer import (tokenize, KINDS, KIND_NAMES, TYPE_NAMES, WORD_OPERATORS,
+                         EOF, NUMBER, STRING, IDENTIFIER, OPERATOR)
+
+def split_interpolation(raw_str):
+    """Split a string literal into literal text and `{expr}` source parts.
+
+    Returns a list of (is_expr, text) pairs, or raises when a brace is left
+    unclosed.
+    """
+    parts = []
+    start = 0
+    i = 0
+    while i < len(raw_str):
+        if raw_str[i] == '{':
+            j = raw_str.find('}', i + 1)
+            if j == -1:
+                raise SyntaxError("Unclosed interpolation in string")
+            if i > start:
+                parts.append((False, raw_str[start:i]))
+            parts.append((True, raw_str[i+1:j].strip()))
+            i = start = j + 1
+        else:
+            i += 1
+    if start < len(raw_str):
+        parts.append((False, raw_str[start:]))
+    return parts
+
+
+LEVELS = (
+    ('both', 'any'),
+    ('==', '!='),
+    ('<', '<=', '>', '>='),
+    ('&', '|', '^', '<<', '>>'),
+    ('+', '-'),
+    ('<<', '>>'),
+    ('*', '/', '%'),
+)
+UNARY_LEVEL = len(LEVELS) + 1
+# Level each operator's right operand is parsed at in compatibility mode.
+COMPAT_RIGHT = (None, 2, 3, 5, 5, 7, 7, 8)
+
+
+def binding_powers(levels):
+    """Map token kinds to the levels they bind at, tightest first."""
+    table = {}
+    for level, ops in enumerate(levels, 1):
+        for op in ops:
+            table[KINDS[op]] = (level,) + table.get(KINDS[op], ())
+    return table
+
+
+COMPAT_POWERS = binding_powers(LEVELS)
+STRICT_POWERS = binding_powers(
+    tuple(tuple(op for op in ops if op not in ('<<', '>>')) if level == 4 else ops
+          for level, ops in enumerate(LEVELS, 1)))
+STRICT_RIGHT = (None,) + tuple(range(2, UNARY_LEVEL + 1))
+
+ASSIGN_KINDS = frozenset(KINDS[op] for op in ('=', '+=', '-=', '*=', '/=', '%='))
+PREFIX_KINDS = frozenset(KINDS[op] for op in ('invert', '~', '-'))
+# `both`, `any` and `invert` are also valid names.
+NAME_KINDS = frozenset((IDENTIFIER,) + tuple(KINDS[op] for op in WORD_OPERATORS))
+
+LBRACKET, RBRACKET, LPAREN, RPAREN = KINDS['['], KINDS[']'], KINDS['('], KINDS[')']
+LBRACE, RBRACE, DOT, COMMA, SEMICOLON = KINDS['{'], KINDS['}'], KINDS['.'], KINDS[','], KINDS[';']
+COLON = KINDS[':']
+SUFFIX_KINDS = frozenset((LBRACKET, DOT, LPAREN))
+FUNC = KINDS['func']
+
+STATEMENT_METHODS = {
+    KINDS['set']: 'parse_var_decl',
+    KINDS['const']: 'parse_const_decl',
+    KINDS['func']: 'parse_func_decl',
+    KINDS['if']: 'parse_if',
+    KINDS['loop']: 'parse_loop',
+    KINDS['while']: 'parse_while',
+    KINDS['repeat']: 'parse_do_while',
+    KINDS['match']: 'parse_match',
+    KINDS['return']: 'parse_return',
+    KINDS['log']: 'parse_io',
+    KINDS['logln']: 'parse_io',
+    KINDS['input']: 'parse_io',
+    KINDS['break']: 'parse_break',
+    KINDS['skip']: 'parse_skip',
+    KINDS['include']: 'parse_include',
+}
+
+
+def legacy_kind(text, token_type):
+    kind = KINDS.get(text)
+    if kind is not None and TYPE_NAMES[kind] == token_type:
+        return kind
+    return {'NUMBER': NUMBER, 'STRING': STRING, 'IDENTIFIER': IDENTIFIER}.get(token_type, OPERATOR)
+
+
 class parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, compat=True):
+        """`tokens` is an iterable of `lexer.tokenize()` tuples, or a list of
+        `(text, type)` pairs from `lexer.tokenization()`."""
+        tokens = list(tokens)
+        if tokens and len(tokens[0]) == 2:
+            tokens = [(legacy_kind(text, token_type), text, -1, 0) for text, token_type in tokens]
+        tokens.append((EOF, 'None', -1, tokens[-1][3] if tokens else 1))
         self.tokens = tokens
         self.pos = 0
-    
+        self.compat = compat
+        if compat:
+            self.powers, self.right = COMPAT_POWERS, COMPAT_RIGHT
+        else:
+            self.powers, self.right = STRICT_POWERS, STRICT_RIGHT
+
     def current(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else ('None', 'None')
-    
+        kind, text = self.tokens[self.pos][:2]
+        return text, TYPE_NAMES[kind]
+
     def match(self, expected):
-        token, token_type = self.current()
-        if token == expected or token_type == expected:
+        kind, text = self.tokens[self.pos][:2]
+        if text == expected or TYPE_NAMES[kind] == expected:
             self.pos += 1
-            return token
-        raise SyntaxError(f"Expected {expected}, got {token}")
-    
-    def parse_expression(self):
-        return self.parse_assignment()
-
-    def parse_assignment(self):
-        expr = self.parse_logical()
-        if self.current()[0] in ["=", "+=", "-=", "*=", "/=", "%="]:
-            op = self.match(self.current()[0])
-            value = self.parse_expression()
-            return {
-                "type": "Assignment",
-                "target": expr,
-                "op": op,
-                "value": value
-            }
-        return expr
-
-    def parse_logical(self):
-        expr = self.parse_equality()
-        while self.current()[0] in ["both", "any"]:
-            op = self.match(self.current()[0])
-            right = self.parse_equality()
-            expr = {"type": "BinaryOp", "op": op, "left": expr, "right": right}
-        return expr
+            return text
+        raise SyntaxError(f"Expected {expected}, got {text}")
+
+    def expect(self, kind):
+        token = self.tokens[self.pos]
+        if token[0] != kind:
+            raise SyntaxError(f"Expected {KIND_NAMES[kind]}, got {token[1]}")
+        self.pos += 1
+        return token[1]
+
+    def expect_name(self):
+        token = self.tokens[self.pos]
+        if token[0] not in NAME_KINDS:
+            raise SyntaxError(f"Expected IDENTIFIER, got {token[1]}")
+        self.pos += 1
+        return token[1]
+
+    def peek(self):
+        return self.tokens[self.pos][0]
 
-    def parse_equality(self):
-        expr = self.parse_comparison()
-        while self.current()[0] in ["==", "!="]:
-            op = self.match(self.current()[0])
-            right = self.parse_comparison()
-            expr = {"type": "BinaryOp", "op": op, "left": expr, "right": right}
-        return expr
-
-    def parse_comparison(self):
-        # expr = self.parse_additive()
-        expr = self.parse_bitwise()
-        while self.current()[0] in ["<", "<=", ">", ">="]:
-            op = self.match(self.current()[0])
-            right = self.parse_additive()
-            expr = {"type": "BinaryOp", "op": op, "left": expr, "right": right}
-        return expr
-    def parse_shift(self):
-        expr = self.parse_multiplicative()
-        while self.current()[0] in ["<<", ">>"]:
-            op = self.match(self.current()[0])
-            right = self.parse_multiplicative()
-            expr = {"type": "BinaryOp", "op": op, "left": expr, "right": right}
-        return expr
-
-    def parse_bitwise(self):
-        expr = self.parse_additive()
-        while self.current()[0] in ["&", "|", "^","<<",">>"]:
-            op = self.match(self.current()[0])
-            right = self.parse_additive()
-            expr = {"type": "BinaryOp", "op": op, "left": expr, "right": right}
+    def parse_expression(self):
+        expr = self.parse_binary(1)
+        token = self.tokens[self.pos]
+        if token[0] in ASSIGN_KINDS:
+            self.pos += 1
+            return Assignment(expr, token[1], self.parse_expression())
         return expr
 
+    parse_assignment = parse_expression
 
-    def parse_additive(self):
-        # expr = self.parse_multiplicative()
-        expr = self.parse_shift()
-        while self.current()[0] in ["+", "-"]:
-            op = self.match(self.current()[0])
-            right = self.parse_multiplicative()
-            expr = {"type": "BinaryOp", "op": op, "left": expr, "right": right}
-        return expr
-
-    def parse_multiplicative(self):
-        expr = self.parse_unary()
-        while self.current()[0] in ["*", "/", "%"]:
-            op = self.match(self.current()[0])
-            right = self.parse_unary()
-            expr = {"type": "BinaryOp", "op": op, "left": expr, "right": right}
-        return expr
+    def parse_logical(self):
+        return self.parse_binary(1)
+
+    def parse_binary(self, min_level):
+        """Parse operators binding at `min_level` or tighter.
+
+        `ceiling` sits just above the level of the last operator taken: the
+        loop only moves to the same or looser levels, like returning out of
+        one descent method per level would, which is what keeps operators
+        listed at two levels and the compatibility right operands parsing
+        exactly as they always did.
+        """
+        tokens = self.tokens
+        pos = self.pos
+        token = tokens[pos]
+        # Bare names and numbers are most operands: build them inline.
+        if token[0] == NUMBER:
+            self.pos = pos + 1
+            left = Number(token[1])
+        elif token[0] == IDENTIFIER and tokens[pos + 1][0] not in SUFFIX_KINDS:
+            self.pos = pos + 1
+            left = Identifier(token[1])
+        elif token[0] in PREFIX_KINDS:
+            left = self.parse_unary()
+        else:
+            left = self.parse_primary()
+        powers = self.powers
+        right = self.right
+        ceiling = UNARY_LEVEL
+        while True:
+            token = tokens[self.pos]
+            levels = powers.get(token[0])
+            if levels is None:
+                return left
+            for level in levels:
+                if level < ceiling:
+                    break
+            else:
+                return left
+            if level < min_level:
+                return left
+            ceiling = level + 1
+            pos = self.pos + 1
+            # A bare operand followed by nothing that binds at least as
+            # tightly as the right operand's level needs no recursion.
+            operand = tokens[pos]
+            kind = operand[0]
+            if kind == NUMBER or (kind == IDENTIFIER and tokens[pos + 1][0] not in SUFFIX_KINDS):
+                after = powers.get(tokens[pos + 1][0])
+                if after is None or after[0] < right[level]:
+                    self.pos = pos + 1
+                    value = Number(operand[1]) if kind == NUMBER else Identifier(operand[1])
+                    left = BinaryOp(token[1], left, value)
+                    continue
+            self.pos = pos
+            left = BinaryOp(token[1], left, self.parse_binary(right[level]))
 
     def parse_unary(self):
-        if self.current()[0] in ["invert", "~","-"]:
-            op = self.match(self.current()[0])
-            right = self.parse_unary()
-            return {"type": "UnaryOp", "op": op, "expr": right}
+        token = self.tokens[self.pos]
+        if token[0] in PREFIX_KINDS:
+            self.pos += 1
+            return UnaryOp(token[1], self.parse_unary())
         return self.parse_primary()
 
     def parse_primary(self):
-        token, token_type = self.current()
+        tokens = self.tokens
+        token = tokens[self.pos]
+        kind = token[0]
 
-        if token_type == "NUMBER":
-            self.match("NUMBER")
-            return {"type": "NUMBER", "value": token}
+        if kind == NUMBER:
+            self.pos += 1
+            return Number(token[1])
 
-        elif token_type == "STRING":
-            self.match("STRING")
-            return {"type": "STRING", "value": token.strip('"').strip("'")}
+        elif kind == STRING:
+            self.pos += 1
+            return self.parse_string(token[1].strip('"').strip("'"))
 
-        elif token_type == "IDENTIFIER":
-            node = {"type": "IDENTIFIER", "value": self.match("IDENTIFIER")}
+        elif kind in NAME_KINDS:
+            self.pos += 1
+            node = Identifier(token[1])
 
-            while self.current()[0] in ["[", ".", "("]:
-                if self.current()[0] == "[":
-                    self.match("[")
+            while tokens[self.pos][0] in SUFFIX_KINDS:
+                kind = tokens[self.pos][0]
+                self.pos += 1
+                if kind == LBRACKET:
                     index_expr = self.parse_expression()
-                    self.match("]")
-                    node = {"type": "Index", "target": node, "index": index_expr}
+                    self.expect(RBRACKET)
+                    node = Index(node, index_expr)
 
-                elif self.current()[0] == ".":
-                    self.match(".")
-                    prop = self.match("IDENTIFIER")
-                    node = {"type": "MemberAccess", "object": node, "property": prop}
+                elif kind == DOT:
+                    node = MemberAccess(node, self.expect_name())
 
-                elif self.current()[0] == "(":
-                    self.match("(")
-                    args = self.parse_elements() if self.current()[0] != ")" else []
-                    self.match(")")
-                    node = {"type": "Call", "callee": node, "args": args}
+                else:
+                    args = self.parse_elements() if tokens[self.pos][0] != RPAREN else []
+                    self.expect(RPAREN)
+                    node = Call(node, args)
 
             return node
 
-
-        elif token == "(":
-            self.match("(")
+        elif kind == LPAREN:
+            self.pos += 1
             expr = self.parse_expression()
-            self.match(")")
+            self.expect(RPAREN)
             return expr
 
-        elif token == "[":
+        elif kind == LBRACKET:
             return self.parse_array()
 
+        elif kind == LBRACE:
+            return self.parse_map()
+
         else:
             raise SyntaxError(f"Unexpected token in expression: {self.current()}")
 
+    def parse_string(self, raw):
+        """Split `{expr}` interpolations out of a string literal once, here."""
+        if '{' not in raw:
+            return String(raw)
+        parts = []
+        for is_expr, text in split_interpolation(raw):
+            if is_expr:
+                parts.append(parser(tokenize(text), self.compat).parse_expression())
+            else:
+                parts.append(text)
+        return Template(raw, parts)
+
     def parse_array(self):
-        self.match("[")
-        elements = self.parse_elements() if self.current()[0] != "]" else []
-        self.match("]")
-        return {"type": "ArrayLiteral", "elements": elements}
+        self.expect(LBRACKET)
+        elements = self.parse_elements() if self.peek() != RBRACKET else []
+        self.expect(RBRACKET)
+        return ArrayLiteral(elements)
+
+    def parse_map(self):
+        self.expect(LBRACE)
+        keys = []
+        values = []
+        if self.peek() != RBRACE:
+            while True:
+                keys.append(self.parse_expression())
+                self.expect(COLON)
+                values.append(self.parse_expression())
+                if self.peek() != COMMA:
+                    break
+                self.expect(COMMA)
+        self.expect(RBRACE)
+        return MapLiteral(keys, values)
 
     def parse_elements(self):
         elements = [self.parse_expression()]
-        while self.current()[0] == ",":
-            self.match(",")
+        while self.peek() == COMMA:
+            self.expect(COMMA)
             elements.append(self.parse_expression())
         return elements
     def parse_include(self):
         self.match("include")
-        path_token = self.match("STRING")
-        self.match(";")
-        return {
-            "type":"Include",
-            "path": path_token.strip('"')
-        }
+        path_token = self.expect(STRING)
+        self.expect(SEMICOLON)
+        return Include(path_token.strip('"'))
 
     def parse_io(self):
         if self.current()[0] == "log":
             self.match("log")
-            self.match("(")
+            self.expect(LPAREN)
             expr = self.parse_expression()
-            self.match(")")
-            self.match(";")
-            return {
-                "type": "IO",
-                "action": "log",
-                "expr": expr
-            }
+            self.expect(RPAREN)
+            self.expect(SEMICOLON)
+            return IO("log", expr)
         elif    self.current()[0] == "logln":
                 self.match("logln")
-                self.match("(")
+                self.expect(LPAREN)
                 expr = self.parse_expression()
-                self.match(")")
-                self.match(";")
-                return {
-                    "type": "IO",
-                    "action": "logln",
-                    "expr": expr
-                }
+                self.expect(RPAREN)
+                self.expect(SEMICOLON)
+                return IO("logln", expr)
 
         elif self.current()[0] == "input":
             self.match("input")
-            self.match("(")
+            self.expect(LPAREN)
             target = self.parse_expression()
             message = ""
-            if self.current()[0] == ",":
-                self.match(",")
-                tok = self.match("STRING")
+            if self.peek() == COMMA:
+                self.expect(COMMA)
+                tok = self.expect(STRING)
                 if (tok.startswith('"') and tok.endswith('"')) or (tok.startswith("'") and tok.endswith("'")):
                     msg_val = tok[1:-1]
                 else:
                     msg_val = tok
-                message = {"type": "STRING", "value": msg_val}
-            self.match(")")
-            self.match(";")
-            return {
-                "type": "IO",
-                "action": "input",
-                "target": target,
-                "message": message
-            }
+                message = self.parse_string(msg_val)
+            self.expect(RPAREN)
+            self.expect(SEMICOLON)
+            return IO("input", None, target, message)
 
 
         else:
@@ -216,246 +374,205 @@ class parser:
     def parse_return(self):
         self.match("return")
         expr = self.parse_expression()
-        self.match(";")
-        return {
-            "type": "ReturnStatement",
-            "expr": expr
-        }
+        self.expect(SEMICOLON)
+        return ReturnStatement(expr)
     def parse_break(self):
         self.match("break")
-        self.match(";")
-        return{
-            "type": "BreakStatement",
-        }
+        self.expect(SEMICOLON)
+        return BreakStatement()
     def parse_skip(self):
         self.match("skip")
-        self.match(";")
-        return{
-            "type": "SkipStatement",
-        }
+        self.expect(SEMICOLON)
+        return SkipStatement()
 
     def parse_match(self):
         self.match("match")
-        self.match("(")
+        self.expect(LPAREN)
         expr = self.parse_expression()
-        self.match(")")
-        self.match("{")
+        self.expect(RPAREN)
+        self.expect(LBRACE)
 
         cases = []
         else_case = None
 
-        while self.current()[0] not in ["}"]:
+        while self.peek() != RBRACE:
             if self.current()[0] == "else":
                 else_case = self.parse_case(is_else=True)
             else:
                 cases.append(self.parse_case())
 
-        self.match("}")
+        self.expect(RBRACE)
 
-        return {
-            "type": "MatchStatement",
-            "expr": expr,
-            "cases": cases,
-            "else": else_case
-        }
+        return MatchStatement(expr, cases, else_case)
 
     def parse_case(self, is_else=False):
         if is_else:
             self.match("else")
             self.match("->")
             stmt = self.parse_statement()
-            return {"type": "ElseCase", "body": stmt}
+            return ElseCase(stmt)
         else:
             value = self.parse_expression()
             self.match("->")
             stmt = self.parse_statement()
-            return {"type": "Case", "value": value, "body": stmt}
+            return Case(value, stmt)
 
     def parse_loop(self):
         self.match("loop")
-        self.match("(")
-        varname = self.match("IDENTIFIER")
+        self.expect(LPAREN)
+        varname = self.expect_name()
+        # `in` is only a keyword here, so it stays a valid name elsewhere.
+        token = self.tokens[self.pos]
+        if token[0] == IDENTIFIER and token[1] == "in":
+            self.pos += 1
+            iterable = self.parse_expression()
+            self.expect(RPAREN)
+            return ForInLoop(varname, iterable, self.parse_block())
         self.match("from")
         start = self.parse_expression()
         self.match("to")
         end = self.parse_expression()
         self.match("step")
         step = self.parse_expression()
-        self.match(")")
+        self.expect(RPAREN)
         body = self.parse_block()
-        return {
-            "type": "ForLoop",
-            "var": varname,
-            "start": start,
-            "end": end,
-            "step": step,
-            "body": body
-        }
+        return ForLoop(varname, start, end, step, body)
 
     def parse_while(self):
         self.match("while")
-        self.match("(")
+        self.expect(LPAREN)
         condition = self.parse_expression()
-        self.match(")")
+        self.expect(RPAREN)
         body = self.parse_block()
-        return {
-            "type": "WhileLoop",
-            "condition": condition,
-            "body": body
-        }
+        return WhileLoop(condition, body)
 
     def parse_do_while(self):
         self.match("repeat")
         body = self.parse_block()
         self.match("while")
-        self.match("(")
+        self.expect(LPAREN)
         condition = self.parse_expression()
-        self.match(")")
-        self.match(";")
-        return {
-            "type": "DoWhileLoop",
-            "condition": condition,
-            "body": body
-        }
+        self.expect(RPAREN)
+        self.expect(SEMICOLON)
+        return DoWhileLoop(condition, body)
 
 
     def parse_if(self):
         self.match("if")
-        self.match("(")
+        self.expect(LPAREN)
         condition = self.parse_expression()
-        self.match(")")
+        self.expect(RPAREN)
         self.match("then")
 
-        if self.current()[0] == "{":
+        if self.peek() == LBRACE:
             body = self.parse_block()
         else:
             body = [self.parse_statement()]
 
         elseifs = []
-        while self.current()[0] == "else" and self.tokens[self.pos+1][0] == "if":
+        while self.current()[0] == "else" and self.tokens[self.pos+1][1] == "if":
             self.match("else")
             self.match("if")
-            self.match("(")
+            self.expect(LPAREN)
             cond = self.parse_expression()
-            self.match(")")
+            self.expect(RPAREN)
             self.match("then")
-            blk = self.parse_block() if self.current()[0] == "{" else [self.parse_statement()]
-            elseifs.append({"condition": cond, "body": blk})
+            blk = self.parse_block() if self.peek() == LBRACE else [self.parse_statement()]
+            elseifs.append(ElseIf(cond, blk))
 
         else_block = None
         if self.current()[0] == "else":
             self.match("else")
-            else_block = self.parse_block() if self.current()[0] == "{" else [self.parse_statement()]
+            else_block = self.parse_block() if self.peek() == LBRACE else [self.parse_statement()]
 
-        return {
-            "type": "IfStatement",
-            "condition": condition,
-            "body": body,
-            "elseifs": elseifs,
-            "else": else_block
-        }
+        return IfStatement(condition, body, elseifs, else_block)
 
     
     def parse_func_decl(self):
         self.match("func")
-        name = self.match("IDENTIFIER")
-        self.match("(")
+        name = self.expect_name()
+        self.expect(LPAREN)
         params = self.parse_params()
-        self.match(")")
+        self.expect(RPAREN)
         body = self.parse_block()
-        return {
-            "type": "FuncDecl",
-            "name": name,
-            "params": params,
-            "body": body
-        }
+        return FuncDecl(name, params, body)
+
+    def parse_memo_func(self):
+        """`memo func ...` or `memo(<size>) func ...`."""
+        self.pos += 1
+        size = 0
+        if self.peek() == LPAREN:
+            self.expect(LPAREN)
+            text = self.expect(NUMBER)
+            if not text.isdigit() or int(text) < 1:
+                raise SyntaxError(f"memo size must be a positive integer, got {text}")
+            size = int(text)
+            self.expect(RPAREN)
+        decl = self.parse_func_decl()
+        decl.memo = size
+        return decl
+
+    def is_memo_func(self):
+        tokens, pos = self.tokens, self.pos
+        if tokens[pos + 1][0] == FUNC:
+            return True
+        return (tokens[pos + 1][0] == LPAREN and tokens[pos + 2][0] == NUMBER
+                and tokens[pos + 3][0] == RPAREN and tokens[pos + 4][0] == FUNC)
 
     def parse_params(self):
         params = []
-        token, token_type = self.current()
-        if token_type == "IDENTIFIER":
-            params.append(self.match("IDENTIFIER"))
-            while self.current()[0] == ",":
-                self.match(",")
-                params.append(self.match("IDENTIFIER"))
+        if self.peek() in NAME_KINDS:
+            params.append(self.expect_name())
+            while self.peek() == COMMA:
+                self.expect(COMMA)
+                params.append(self.expect_name())
         return params
 
     def parse_block(self):
-        self.match("{")
+        self.expect(LBRACE)
         statements = []
-        while self.current()[0] != "}":
+        while self.peek() != RBRACE:
             statements.append(self.parse_statement())
-        self.match("}")
+        self.expect(RBRACE)
         return statements
 
 
     def parse_var_decl(self):
         self.match("set")
-        name = self.match("IDENTIFIER")
+        name = self.expect_name()
         value = None
         if self.current()[0] == "=": 
             self.match("=")
             value = self.parse_expression()
-        self.match(";")
-        return {
-            "type": "VarDecl",
-            "name": name,
-            "value": value
-        }
+        self.expect(SEMICOLON)
+        return VarDecl(name, value)
 
     def parse_const_decl(self):
         self.match("const")
-        name = self.match("IDENTIFIER")
+        name = self.expect_name()
         value = None
         if self.current()[0] == "=": 
             self.match("=")
             value = self.parse_expression()
-        self.match(";")
-        return {
-            "type": "ConstDecl",
-            "name": name,
-            "value": value
-        }
+        self.expect(SEMICOLON)
+        return ConstDecl(name, value)
 
     def parse_statement(self):
-        token, token_type = self.current()
-        if token == "set":
-            return self.parse_var_decl()
-        elif token == "const":
-            return self.parse_const_decl()
-        elif token == "func":
-            return self.parse_func_decl()
-        elif token == "if":
-            return self.parse_if()
-        elif token == "loop":
-            return self.parse_loop()
-        elif token == "while":
-            return self.parse_while()
-        elif token == "repeat":
-            return self.parse_do_while()
-        elif token == "match":
-            return self.parse_match()
-        elif token == "return":
-            return self.parse_return()
-        elif token in ("log", "input","logln"):
-            return self.parse_io()
-        elif token == "break":
-            return self.parse_break()
-        elif token == "skip":
-            return self.parse_skip()
-        elif token == "include":
-            return self.parse_include()
+        token = self.tokens[self.pos]
+        method = STATEMENT_METHODS.get(token[0])
+        if method is not None:
+            stmt = getattr(self, method)()
+        # `memo` is only a keyword in front of `func`.
+        elif token[1] == 'memo' and self.is_memo_func():
+            stmt = self.parse_memo_func()
         else:
-            expr = self.parse_expression()
-            self.match(";")
-            return {"type": "ExpressionStatement", "expr": expr}
-    
+            stmt = ExpressionStatement(self.parse_expression())
+            self.expect(SEMICOLON)
+        stmt.line = token[3]
+        return stmt
+
     def parse_program(self):
         statements = []
-        while self.pos < len(self.tokens):
+        while self.tokens[self.pos][0] != EOF:
             statements.append(self.parse_statement())
-        return {
-            "type": "Program",
-            "body": statements
-        }
-        
+        return Program(statements)
@@ -0,0 +1,185 @@
+"""
+Profiler behind `axion profile`.
+
+`ProfilingInterpreter` is the tree-walking interpreter with a timer around
+every statement and every call of an Axion or native function. Only this
+subclass is instrumented, so ordinary runs on any engine pay nothing for
+profiling. It records:
+
+* per function: calls, self time (spent in its own statements) and
+  cumulative time (including the functions it calls);
+* per source line: executions, self time (excluding statements nested in
+  it and the calls it makes) and total time;
+* per call stack: self time, written out as collapsed stacks
+  (`<main>;fib;fib 1234`, in microseconds) for flamegraph tools such as
+  flamegraph.pl, inferno or speedscope.
+
+Time spent in a recursive function or line is counted once in its
+cumulative total, not once per level of recursion.
+"""
+
+import time
+import linecache
+
+from axion.interpreter import Interpreter
+from axion.native import NativeFunction
+from axion.runtime import memo_report, module_name
+
+MAIN = "<main>"
+
+
+class Timings:
+    """Counts and times of possibly nested, possibly recursive intervals."""
+
+    def __init__(self):
+        # key -> [count, self time, total time]
+        self.stats = {}
+        # Open intervals: [key, start, time spent in nested intervals].
+        self.stack = []
+        self.active = {}
+
+    def enter(self, key):
+        self.stack.append([key, time.perf_counter(), 0.0])
+        self.active[key] = self.active.get(key, 0) + 1
+
+    def leave(self):
+        """Close the innermost interval and return its self time."""
+        key, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed - nested
+        depth = self.active[key] - 1
+        self.active[key] = depth
+        if depth == 0:
+            stats[2] += elapsed
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        return elapsed - nested
+
+    def ranked(self):
+        return sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+
+
+class Profiler:
+    def __init__(self):
+        self.functions = Timings()
+        self.lines = Timings()
+        # Function call stack -> self time spent with exactly that stack.
+        self.stacks = {}
+        self.path = []
+        self.memos = ()
+
+    def enter_function(self, name):
+        self.functions.enter(name)
+        self.path.append(name)
+
+    def leave_function(self):
+        stack = tuple(self.path)
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + self.functions.leave()
+        self.path.pop()
+
+    def total(self):
+        stats = self.functions.stats.get(MAIN)
+        return stats[2] if stats else 0.0
+
+    def report(self, limit=20):
+        lines = [f"Total time: {self.total() * 1000:.1f} ms", "",
+                 "Functions by self time",
+                 f"{'calls':>9} {'self ms':>10} {'cumul ms':>10}  function"]
+        for name, (count, own, total) in self.functions.ranked()[:limit]:
+            lines.append(f"{count:>9} {own * 1000:>10.1f} {total * 1000:>10.1f}  {name}")
+        lines += ["", "Lines by self time",
+                  f"{'hits':>9} {'self ms':>10} {'total ms':>10}  line"]
+        for (filename, line), (count, own, total) in self.lines.ranked()[:limit]:
+            source = linecache.getline(filename, line).strip()
+            lines.append(f"{count:>9} {own * 1000:>10.1f} {total * 1000:>10.1f}  "
+                         f"{filename}:{line}  {source}")
+        if self.memos:
+            lines += ["", memo_report(self.memos)]
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self):
+        """Collapsed stacks, one `frame;frame;... microseconds` per line."""
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            micros = round(seconds * 1e6)
+            if micros:
+                lines.append(f"{';'.join(stack)} {micros}")
+        return "\n".join(lines) + "\n"
+
+
+class ProfilingInterpreter(Interpreter):
+    def __init__(self, ast, profiler, filename, opt_level=1, use_cache=True, module=None):
+        super().__init__(ast, opt_level, use_cache)
+        self.profiler = profiler
+        self.filename = filename
+        # Functions of an included module are reported as `module.name`.
+        self.prefix = "" if module is None else module + "."
+        self.statement_table = {cls: self.timed_statement(method)
+                                for cls, method in self.statement_table.items()}
+
+    def timed_statement(self, method):
+        lines = self.profiler.lines
+        filename = self.filename
+
+        def run(stmt, env):
+            lines.enter((filename, getattr(stmt, 'line', 0)))
+            try:
+                return method(stmt, env)
+            finally:
+                lines.leave()
+        return run
+
+    def run(self):
+        self.profiler.enter_function(MAIN)
+        try:
+            return super().run()
+        finally:
+            self.profiler.leave_function()
+            self.profiler.memos = list(self.memos.values())
+
+    def module_interpreter(self, program, filename, path):
+        return ProfilingInterpreter(program, self.profiler, filename, self.opt_level,
+                                    self.use_cache, module=module_name(path))
+
+    def handle_include(self, path, env):
+        super().handle_include(path, env)
+        module = env.vars.get(module_name(path))
+        if module is not None and isinstance(module['value'], dict):
+            members = module['value']
+            for name, value in members.items():
+                if value.__class__ is NativeFunction:
+                    members[name] = self.timed_native(value)
+
+    def timed_native(self, fn):
+        profiler = self.profiler
+
+        def call(*args):
+            profiler.enter_function(fn.name)
+            try:
+                return fn(*args)
+            finally:
+                profiler.leave_function()
+        return call
+
+    def call_body(self, func_decl, args, calling_env):
+        self.profiler.enter_function(self.prefix + func_decl.name)
+        try:
+            return super().call_body(func_decl, args, calling_env)
+        finally:
+            self.profiler.leave_function()
+
+    def expr_Call(self, expr, env):
+        # Calls by name are inlined in Interpreter.expr_Call; route them
+        # through call_function so that call_body can time them.
+        callee = expr.callee
+        if callee.type == 'IDENTIFIER':
+            func_def = self.functions.get(callee.value)
+            if func_def is not None and func_def.__class__ is not NativeFunction:
+                args = [self.eval_expression(arg, env) for _, arg in zip(func_def.params, expr.args)]
+                return self.call_function(func_def, args, env)
+        return super().expr_Call(expr, env)
+
@@ -0,0 +1,376 @@
+"""
+Static scope resolution for the bytecode compiler.
+
+The resolver walks a parsed Program once and gives every variable a
+(depth, slot) location. Block scopes are flattened into the frame of the
+enclosing function (or of the program), so a location is either a slot in
+the current frame (depth LOCAL) or a slot in the program's global frame
+(depth GLOBAL). Shadowing declarations simply get a new slot.
+
+Axion functions run in the scope of their caller. A free name inside a
+function is only bound to a global slot when no function or nested block
+anywhere in the program declares the same name; otherwise it is left
+unresolved and looked up by name along the caller chain at run time.
+`Resolution.dynamic` collects those names, so the compiler knows which
+block-scoped slots such a lookup may reach.
+
+Assignments to constants and duplicate declarations in one scope are
+reported here, before the program runs.
+"""
+
+from axion.ast import Node
+from axion.runtime import module_name
+from axion.native import BUILTINS as NATIVE_BUILTINS
+
+LOCAL = 0
+GLOBAL = 1
+FUNCTION = 2
+
+BUILTINS = tuple(NATIVE_BUILTINS)
+
+
+class FrameLayout:
+    __slots__ = ('slot_names', 'names', 'const_slots')
+
+    def __init__(self):
+        self.slot_names = []
+        self.names = {}
+        self.const_slots = set()
+
+    def add(self, name, const=False, outermost=False):
+        slot = len(self.slot_names)
+        self.slot_names.append(name)
+        if const:
+            self.const_slots.add(slot)
+        if outermost:
+            self.names[name] = slot
+        return slot
+
+
+class Resolution:
+    def __init__(self):
+        self.locations = {}
+        self.layouts = {}
+        # Names some code leaves to be looked up along the caller chain.
+        self.dynamic = set()
+
+    def location(self, node):
+        return self.locations.get(id(node))
+
+    def layout(self, node):
+        return self.layouts[id(node)]
+
+
+def declared_name(stmt):
+    t = stmt.type
+    if t == 'VarDecl' or t == 'ConstDecl':
+        return stmt.name
+    if t == 'Include':
+        return module_name(stmt.path)
+    return None
+
+
+def shadowed_names(program):
+    """Names declared anywhere but at the top level of `program`: by a
+    nested block, as a parameter or as a loop variable. A function reading
+    one of them may get its caller's binding rather than the global."""
+    names = set()
+
+    def collect(node, nested):
+        if isinstance(node, list):
+            for item in node:
+                collect(item, nested)
+            return
+        if not isinstance(node, Node):
+            return
+        t = node.type
+        if nested:
+            name = declared_name(node)
+            if name is not None:
+                names.add(name)
+        if t == 'FuncDecl':
+            names.update(node.params)
+        elif t == 'ForLoop' or t == 'ForInLoop':
+            names.add(node.var)
+        for _, value in node.fields():
+            if isinstance(value, (Node, list)):
+                collect(value, True)
+
+    for stmt in program.body:
+        collect(stmt, False)
+    return names
+
+
+class Resolver:
+    def __init__(self):
+        self.res = Resolution()
+        self.layout = None
+        self.blocks = None
+        self.function = None
+        self.globals = {}
+        self.shadowed = set()
+
+    def resolve_program(self, program):
+        layout = self.layout = FrameLayout()
+        for name in BUILTINS:
+            layout.add(name, outermost=True)
+
+        outermost = {}
+        for stmt in program.body:
+            name = declared_name(stmt)
+            if name is None:
+                continue
+            if name in self.globals:
+                if stmt.type != 'Include':
+                    raise NameError(f"Variable '{name}' already declared in this scope")
+                continue
+            const = stmt.type == 'ConstDecl'
+            self.globals[name] = (layout.add(name, const, outermost=True), const)
+        self.shadowed = shadowed_names(program)
+
+        self.blocks = [outermost]
+        for stmt in program.body:
+            self.statement(stmt)
+        self.res.layouts[id(program)] = layout
+        return self.res
+
+    # -- scopes -------------------------------------------------------------
+
+    def declare(self, node, name, const=False):
+        block = self.blocks[-1]
+        if name in block:
+            if node.type == 'Include':
+                self.res.locations[id(node)] = (LOCAL, block[name][0])
+                return
+            raise NameError(f"Variable '{name}' already declared in this scope")
+        if self.function is None and len(self.blocks) == 1:
+            slot = self.globals[name][0]
+        else:
+            outermost = self.function is not None and len(self.blocks) == 1
+            slot = self.layout.add(name, const, outermost)
+        block[name] = (slot, const)
+        self.res.locations[id(node)] = (LOCAL, slot)
+
+    def lookup(self, name):
+        """Return (location, const) for `name` at the current point."""
+        for block in reversed(self.blocks):
+            if name in block:
+                slot, const = block[name]
+                return (LOCAL, slot), const
+        if self.function is not None and name == self.function.name:
+            return (FUNCTION, None), False
+        if name in self.globals:
+            if self.function is None or name not in self.shadowed:
+                slot, const = self.globals[name]
+                return (GLOBAL, slot), const
+        if name in BUILTINS and name not in self.shadowed:
+            return (GLOBAL, BUILTINS.index(name)), False
+        return None, False
+
+    def reference(self, node):
+        location, _ = self.lookup(node.value)
+        if location is not None:
+            self.res.locations[id(node)] = location
+        else:
+            self.res.dynamic.add(node.value)
+
+    def assign(self, node, message="Cannot modify constant"):
+        name = node.value
+        location, const = self.lookup(name)
+        if const:
+            raise ValueError(f"{message} '{name}'")
+        if location is not None and location[0] == FUNCTION:
+            location = None
+        if location is not None:
+            self.res.locations[id(node)] = location
+        else:
+            self.res.dynamic.add(name)
+
+    def block(self, stmts):
+        self.blocks.append({})
+        for stmt in stmts:
+            self.statement(stmt)
+        self.blocks.pop()
+
+    # -- statements ---------------------------------------------------------
+
+    def statement(self, stmt):
+        getattr(self, 'stmt_' + stmt.type)(stmt)
+
+    def stmt_VarDecl(self, stmt):
+        if stmt.value:
+            self.expression(stmt.value)
+        self.declare(stmt, stmt.name)
+
+    def stmt_ConstDecl(self, stmt):
+        if stmt.value is not None:
+            self.expression(stmt.value)
+            self.declare(stmt, stmt.name, const=True)
+
+    def stmt_ExpressionStatement(self, stmt):
+        self.expression(stmt.expr)
+
+    def stmt_IO(self, stmt):
+        if stmt.action in ('log', 'logln'):
+            self.expression(stmt.expr)
+            return
+        if stmt.message:
+            self.expression(stmt.message)
+        target = stmt.target
+        if target.type == 'IDENTIFIER':
+            self.assign(target, "Cannot reassign constant")
+        elif target.type == 'Index':
+            self.index_target(target)
+
+    def stmt_IfStatement(self, stmt):
+        self.expression(stmt.condition)
+        self.block(stmt.body)
+        for elseif in stmt.elseifs:
+            self.expression(elseif.condition)
+            self.block(elseif.body)
+        if stmt.orelse:
+            self.block(stmt.orelse)
+
+    def stmt_FuncDecl(self, stmt):
+        outer = (self.layout, self.blocks, self.function)
+        self.layout = FrameLayout()
+        self.blocks = [{}]
+        self.function = stmt
+        # A parameter a call leaves out is looked up along the caller chain.
+        self.res.dynamic.update(stmt.params)
+        for pname in stmt.params:
+            if pname in self.blocks[0] or pname == stmt.name:
+                raise NameError(f"Variable '{pname}' already declared in this scope")
+            self.blocks[0][pname] = (self.layout.add(pname, outermost=True), False)
+        for s in stmt.body:
+            self.statement(s)
+        self.res.layouts[id(stmt)] = self.layout
+        self.layout, self.blocks, self.function = outer
+
+    def stmt_ReturnStatement(self, stmt):
+        self.expression(stmt.expr)
+
+    def stmt_BreakStatement(self, stmt):
+        pass
+
+    def stmt_SkipStatement(self, stmt):
+        pass
+
+    def stmt_ForLoop(self, stmt):
+        self.expression(stmt.start)
+        self.expression(stmt.end)
+        self.expression(stmt.step)
+        self.blocks.append({})
+        self.declare(stmt, stmt.var)
+        for s in stmt.body:
+            self.statement(s)
+        self.blocks.pop()
+
+    def stmt_ForInLoop(self, stmt):
+        self.expression(stmt.iterable)
+        self.blocks.append({})
+        self.declare(stmt, stmt.var)
+        for s in stmt.body:
+            self.statement(s)
+        self.blocks.pop()
+
+    def stmt_WhileLoop(self, stmt):
+        self.expression(stmt.condition)
+        self.block(stmt.body)
+
+    def stmt_DoWhileLoop(self, stmt):
+        self.block(stmt.body)
+        self.expression(stmt.condition)
+
+    def stmt_MatchStatement(self, stmt):
+        self.expression(stmt.expr)
+        for case in stmt.cases:
+            self.expression(case.value)
+            self.block([case.body])
+        if stmt.orelse:
+            self.block([stmt.orelse.body])
+
+    def stmt_Include(self, stmt):
+        self.declare(stmt, declared_name(stmt))
+
+    # -- expressions --------------------------------------------------------
+
+    def expression(self, expr):
+        getattr(self, 'expr_' + expr.type)(expr)
+
+    def expr_NUMBER(self, expr):
+        pass
+
+    def expr_STRING(self, expr):
+        pass
+
+    def expr_Constant(self, expr):
+        pass
+
+    def expr_Template(self, expr):
+        for part in expr.parts:
+            if not isinstance(part, str):
+                self.expression(part)
+
+    def expr_IDENTIFIER(self, expr):
+        self.reference(expr)
+
+    def expr_MemberAccess(self, expr):
+        self.expression(expr.object)
+
+    def expr_BinaryOp(self, expr):
+        self.expression(expr.left)
+        self.expression(expr.right)
+
+    def expr_UnaryOp(self, expr):
+        self.expression(expr.expr)
+
+    def index_target(self, target):
+        inner = target.target
+        if inner.type == 'IDENTIFIER':
+            location, const = self.lookup(inner.value)
+            if const:
+                raise ValueError(f"Cannot modify constant '{inner.value}'")
+        self.expression(inner)
+        self.expression(target.index)
+
+    def expr_Assignment(self, expr):
+        self.expression(expr.value)
+        target = expr.target
+        if target.type == 'IDENTIFIER':
+            self.assign(target)
+        elif target.type == 'Index':
+            self.index_target(target)
+
+    def expr_Call(self, expr):
+        callee = expr.callee
+        if callee.type == 'IDENTIFIER':
+            location, _ = self.lookup(callee.value)
+            if location is not None and location[0] != FUNCTION:
+                self.res.locations[id(callee)] = location
+            elif location is None:
+                self.res.dynamic.add(callee.value)
+        elif callee.type == 'MemberAccess':
+            self.expression(callee.object)
+        elif callee.type == 'Index':
+            self.expression(callee.target)
+            self.expression(callee.index)
+        for arg in expr.args:
+            self.expression(arg)
+
+    def expr_ArrayLiteral(self, expr):
+        for el in expr.elements:
+            self.expression(el)
+
+    def expr_MapLiteral(self, expr):
+        for key, value in zip(expr.keys, expr.values):
+            self.expression(key)
+            self.expression(value)
+
+    def expr_Index(self, expr):
+        self.expression(expr.target)
+        self.expression(expr.index)
+
+
+def resolve(program):
+    return Resolver().resolve_program(program)
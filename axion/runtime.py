@@ -0,0 +1,347 @@
+"""
+Runtime helpers shared by the Axion execution engines.
+"""
+
+import os
+import sys
+import time
+import operator
+import importlib.resources
+from collections import OrderedDict
+
+
+def to_bool(v):
+    if isinstance(v, bool):
+        return v
+    if isinstance(v, (int, float)):
+        return v != 0
+    if isinstance(v, str):
+        s = v.strip().lower()
+        if s == 'true':
+            return True
+        if s == 'false':
+            return False
+        try:
+            return float(s) != 0
+        except Exception:
+            return len(s) > 0
+    return bool(v)
+
+
+def invert(v):
+    return not to_bool(v)
+
+
+def both(left, right):
+    return left and right
+
+
+def either(left, right):
+    return left or right
+
+
+def bit_and(left, right):
+    return int(left) & int(right)
+
+
+def bit_or(left, right):
+    return int(left) | int(right)
+
+
+def bit_xor(left, right):
+    return int(left) ^ int(right)
+
+
+def shift_left(left, right):
+    return int(left) << int(right)
+
+
+def shift_right(left, right):
+    return int(left) >> int(right)
+
+
+BINARY_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'both': both,
+    'any': either,
+    '&': bit_and,
+    '|': bit_or,
+    '^': bit_xor,
+    '<<': shift_left,
+    '>>': shift_right,
+}
+
+UNARY_OPS = {
+    '-': operator.neg,
+    '~': operator.invert,
+    'invert': invert,
+}
+
+ASSIGN_OPS = {
+    '=': None,
+    '+=': operator.add,
+    '-=': operator.sub,
+    '*=': operator.mul,
+    '/=': operator.truediv,
+    '%=': operator.mod,
+}
+
+
+def number_value(text):
+    return float(text) if '.' in text else int(text)
+
+
+def case_table(cases):
+    """{value: position of the first case with that value} when every case
+    of a match is a number or string literal, else None. Literals have no
+    side effects, so a lookup picks the same case as trying each in turn."""
+    table = {}
+    for i, case in enumerate(cases):
+        node = case.value
+        if node.type == 'Constant' or node.type == 'STRING':
+            value = node.value
+        elif node.type == 'NUMBER':
+            try:
+                value = number_value(node.value)
+            except ValueError:
+                return None
+        else:
+            return None
+        table.setdefault(value, i)
+    return table
+
+
+def case_index(table, value):
+    try:
+        return table.get(value)
+    except TypeError:
+        # Lists and maps are unhashable, and equal no literal either.
+        return None
+
+
+def parse_input(raw):
+    try:
+        if '.' in raw:
+            return float(raw)
+        return int(raw)
+    except ValueError:
+        return raw
+
+
+def iterate(value):
+    """Iterator for `loop (x in value)`: the items of a list or array, the
+    characters of a string, or what a native iterator yields."""
+    try:
+        return iter(value)
+    except TypeError:
+        raise TypeError(f"Cannot loop over {value!r}") from None
+
+
+class Map(dict):
+    """The value of a `{key: value}` literal: a dict that reports a missing
+    key in Axion's words. Being a subclass also keeps maps apart from the
+    plain dicts the tree interpreter uses as return signals."""
+    __slots__ = ()
+
+    def __missing__(self, key):
+        raise RuntimeError(f"Key {key!r} not found in map")
+
+
+def set_index(arr, idx, value):
+    # Lists grow to fit an index past the end, padding with None.
+    if arr.__class__ is list and idx >= len(arr):
+        arr.extend([None] * (idx - len(arr)))
+        arr.append(value)
+    else:
+        arr[idx] = value
+
+
+def get_member(obj, prop):
+    if isinstance(obj, dict) and prop in obj:
+        return obj[prop]
+    elif hasattr(obj, prop):
+        return getattr(obj, prop)
+    raise RuntimeError(f"Property '{prop}' not found on {obj}")
+
+
+# Entries kept by a `memo func` declared without a size.
+MEMO_SIZE = 128
+
+
+class Memo:
+    """Results of one `memo func`, keyed by its argument values and types.
+
+    Holds at most `maxsize` results and drops the least recently used one
+    when full. Calls with unhashable arguments (lists) are never cached.
+    """
+    __slots__ = ('name', 'maxsize', 'results', 'hits', 'misses')
+
+    def __init__(self, name, maxsize=0):
+        self.name = name
+        self.maxsize = maxsize or MEMO_SIZE
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def call(self, fn, args):
+        # Types are part of the key so that f(1) and f(1.0), which compare
+        # equal, do not share a result.
+        key = (*args, *map(type, args))
+        results = self.results
+        try:
+            result = results[key]
+        except KeyError:
+            pass
+        except TypeError:
+            self.misses += 1
+            return fn(*args)
+        else:
+            self.hits += 1
+            results.move_to_end(key)
+            return result
+        self.misses += 1
+        result = fn(*args)
+        results[key] = result
+        if len(results) > self.maxsize:
+            results.popitem(last=False)
+        return result
+
+    def __repr__(self):
+        calls = self.hits + self.misses
+        rate = f"{100 * self.hits / calls:.1f}%" if calls else "-"
+        return (f"memo {self.name}: {self.hits} hits, {self.misses} misses ({rate} hit rate), "
+                f"{len(self.results)}/{self.maxsize} entries")
+
+
+def memo_report(memos):
+    """One line per memoized function, for `axion run --memo-stats`."""
+    return "\n".join(repr(memo) for memo in memos)
+
+
+# Characters log and logln collect before writing them out, and how long
+# collected output may wait for a write that flushes it, in seconds.
+OUTPUT_BUFFER = 64 * 1024
+FLUSH_INTERVAL = 0.1
+# Lists longer than this are logged a slice at a time.
+LIST_CHUNK = 1024
+
+# Outputs of the programs running, innermost last.
+RUNNING = []
+
+
+class Output:
+    """Buffered sink that log and logln write to.
+
+    `stream` is a text file, a file descriptor, or None for whatever
+    sys.stdout is when the output is flushed. Text is collected until
+    `size` characters are waiting or a write comes `interval` seconds
+    after the last flush; a size of 0 writes everything through at once.
+    Engines run a program inside `with output:`, which flushes it when
+    the program ends or fails, and flush it before an `input` prompt.
+    """
+    __slots__ = ('stream', 'size', 'interval', 'parts', 'pending', 'deadline')
+
+    def __init__(self, stream=None, size=None, interval=None):
+        self.stream = stream
+        self.size = OUTPUT_BUFFER if size is None else size
+        self.interval = FLUSH_INTERVAL if interval is None else interval
+        self.parts = []
+        self.pending = 0
+        self.deadline = time.monotonic() + self.interval
+
+    def write(self, text):
+        self.parts.append(text)
+        self.pending += len(text)
+        if self.pending >= self.size or time.monotonic() >= self.deadline:
+            self.flush()
+
+    def log(self, value):
+        if value.__class__ is list and len(value) > LIST_CHUNK:
+            self.write_list(value)
+        else:
+            self.write(str(value))
+
+    def logln(self, value):
+        if value.__class__ is list and len(value) > LIST_CHUNK:
+            self.write_list(value)
+            self.write("\n")
+        else:
+            self.write(str(value) + "\n")
+
+    def write_list(self, items):
+        # Same text as str(items), without building all of it at once.
+        write = self.write
+        write("[")
+        for start in range(0, len(items), LIST_CHUNK):
+            text = ", ".join([repr(item) for item in items[start:start + LIST_CHUNK]])
+            write(text if start == 0 else ", " + text)
+        write("]")
+
+    def input(self, prompt):
+        self.flush()
+        return input(prompt)
+
+    def flush(self):
+        self.deadline = time.monotonic() + self.interval
+        text = "".join(self.parts)
+        self.parts.clear()
+        self.pending = 0
+        stream = sys.stdout if self.stream is None else self.stream
+        if stream.__class__ is int:
+            data = memoryview(text.encode("utf-8"))
+            while data:
+                data = data[os.write(stream, data):]
+        else:
+            if text:
+                stream.write(text)
+            stream.flush()
+
+    def __enter__(self):
+        RUNNING.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        RUNNING.pop()
+        self.flush()
+
+
+def output_for(stream):
+    """The Output for a `stdout` argument: an Output, a file, a file
+    descriptor or None."""
+    return stream if isinstance(stream, Output) else Output(stream)
+
+
+def is_stdlib_path(path):
+    return not (path.endswith(".ax") or path.startswith(".") or path.startswith("/"))
+
+
+def module_file(path):
+    """Return the file an `include` path refers to."""
+    if not is_stdlib_path(path):
+        abs_path = os.path.abspath(path)
+        if not os.path.exists(abs_path):
+            raise RuntimeError(f"Module file not found: {path}")
+        return abs_path
+    resource = importlib.resources.files("axion.stdlib") / f"{path}.ax"
+    if not resource.is_file():
+        raise RuntimeError(f"Stdlib module not found: {path}")
+    return str(resource)
+
+
+def read_module_source(path):
+    with open(module_file(path), "r") as f:
+        return f.read()
+
+
+def module_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
@@ -0,0 +1,291 @@
+"""
+Script execution server behind `axion serve`, and the `axion loadtest`
+client that measures it.
+
+The server listens on a TCP or Unix socket and speaks newline-delimited
+JSON. Each request is one JSON object on one line:
+
+    {"id": 1, "source": "return price * 2;", "globals": {"price": 21}}
+    {"id": 2, "script": "5f1c...", "globals": {"price": 4}, "timeout": 0.5}
+
+`source` is a script to run; the reply names it by `script`, an id that
+later requests can send instead of the source. `globals` are the input
+bindings (see `axion.embed`), `timeout` an optional time budget in seconds,
+capped by the server's own; a budget that is not a positive number is
+ignored. Each reply is one line:
+
+    {"id": 1, "ok": true, "script": "5f1c...", "result": 42,
+     "globals": {"price": 21}, "output": "", "ms": 0.4}
+
+with "ok": false and an "error" message when the script fails, runs out of
+time or is unknown. `globals` holds the final values of the bindings sent.
+Requests on one connection may be pipelined; replies come back as they
+finish, matched by `id`.
+
+Scripts run on a pool of worker processes. Each keeps the standard library
+and the Programs it has compiled, so a script is compiled at most once per
+worker. Output is captured in the worker and returned with the reply. A
+script that exceeds its budget is interrupted in the worker (with
+SIGALRM), so one runaway loop ties up one worker for at most the budget.
+"""
+
+import io
+import os
+import json
+import math
+import time
+import signal
+import asyncio
+import hashlib
+import statistics
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from axion.batch import JobTimeout, alarm, preload_stdlib
+from axion.embed import compile as compile_program
+
+# Compiled Programs kept by each worker process, by script id.
+PROGRAMS = OrderedDict()
+PROGRAM_CACHE_SIZE = 256
+# Set by init_worker() in each worker process.
+WORKER = {"opt_level": 1}
+
+
+def script_id(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): jsonable(v) for k, v in value.items()}
+    if hasattr(value, "tolist"):
+        return jsonable(value.tolist())
+    return repr(value)
+
+
+# -- worker side ---------------------------------------------------------------
+
+def init_worker(opt_level):
+    WORKER["opt_level"] = opt_level
+    preload_stdlib(opt_level, ("code",))
+
+
+def program_for(key, source):
+    program = PROGRAMS.get(key)
+    if program is None:
+        program = PROGRAMS[key] = compile_program(source, WORKER["opt_level"])
+        if len(PROGRAMS) > PROGRAM_CACHE_SIZE:
+            PROGRAMS.popitem(last=False)
+    else:
+        PROGRAMS.move_to_end(key)
+    return program
+
+
+def run_script(key, source, bindings, timeout):
+    """Run one request in this worker and return the reply fields."""
+    output = io.StringIO()
+    timer = timeout and hasattr(signal, "setitimer")
+    reply = {"ok": True}
+    start = time.perf_counter()
+    try:
+        program = program_for(key, source)
+        env = dict(bindings)
+        if timer:
+            signal.signal(signal.SIGALRM, alarm)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            result = program.run(globals=env, stdout=output)
+        finally:
+            if timer:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        reply["result"] = jsonable(result)
+        reply["globals"] = {name: jsonable(env.get(name)) for name in bindings}
+    except JobTimeout:
+        reply = {"ok": False, "error": f"timed out after {timeout} s"}
+    except RecursionError:
+        reply = {"ok": False, "error": "maximum recursion depth exceeded"}
+    except Exception as e:
+        reply = {"ok": False, "error": str(e)}
+    reply["output"] = output.getvalue()
+    reply["ms"] = (time.perf_counter() - start) * 1000
+    return reply
+
+
+# -- server side ---------------------------------------------------------------
+
+class Server:
+    def __init__(self, workers=None, timeout=1.0, opt_level=1, cache_size=1024):
+        self.workers = workers or os.cpu_count() or 1
+        # None: no budget.
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.opt_level = opt_level
+        # Script sources by id, so requests can name a script sent before.
+        self.sources = OrderedDict()
+        self.cache_size = cache_size
+        self.pool = None
+
+    def remember(self, source):
+        key = script_id(source)
+        self.sources[key] = source
+        self.sources.move_to_end(key)
+        if len(self.sources) > self.cache_size:
+            self.sources.popitem(last=False)
+        return key
+
+    def budget(self, requested):
+        """The time budget of a request: the server's, or the one it asks
+        for when that is shorter. Anything but a positive number of seconds
+        is ignored, so a request cannot lift the server's budget."""
+        if (not isinstance(requested, (int, float)) or isinstance(requested, bool)
+                or not 0 < requested < math.inf):
+            return self.timeout
+        return min(requested, self.timeout) if self.timeout else requested
+
+    async def handle(self, request):
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "a request must be a JSON object"}
+        reply = {"id": request.get("id")}
+        source = request.get("source")
+        if isinstance(source, str):
+            key = self.remember(source)
+        else:
+            key = request.get("script")
+            source = self.sources.get(key)
+            if source is None:
+                reply.update(ok=False, error=f"unknown script {key!r}")
+                return reply
+        bindings = request.get("globals") or {}
+        timeout = self.budget(request.get("timeout"))
+        reply["script"] = key
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self.pool, run_script, key, source, bindings, timeout)
+        try:
+            # The worker interrupts the script itself; this only guards
+            # against a worker stuck where the alarm cannot reach.
+            reply.update(await asyncio.wait_for(job, timeout + 5 if timeout else None))
+        except asyncio.TimeoutError:
+            reply.update(ok=False, error=f"timed out after {timeout} s")
+        except Exception as e:
+            reply.update(ok=False, error=str(e))
+        return reply
+
+    async def connection(self, reader, writer):
+        pending = set()
+
+        async def answer(line):
+            try:
+                reply = await self.handle(json.loads(line))
+            except ValueError as e:
+                reply = {"ok": False, "error": f"invalid JSON: {e}"}
+            writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(answer(line))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=7878, unix=None, ready=None):
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                        initargs=(self.opt_level,))
+        try:
+            if unix:
+                server = await asyncio.start_unix_server(self.connection, unix, limit=2 ** 24)
+                where = unix
+            else:
+                server = await asyncio.start_server(self.connection, host, port, limit=2 ** 24)
+                where = f"{host}:{port}"
+            if ready:
+                ready(where)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if unix and os.path.exists(unix):
+                os.unlink(unix)
+
+
+# -- load test client ------------------------------------------------------------
+
+async def open_connection(host, port, unix):
+    if unix:
+        return await asyncio.open_unix_connection(unix, limit=2 ** 24)
+    return await asyncio.open_connection(host, port, limit=2 ** 24)
+
+
+async def call(reader, writer, request):
+    writer.write(json.dumps(request).encode("utf-8") + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def load_test(source, requests=1000, concurrency=8, bindings=None,
+                    host="127.0.0.1", port=7878, unix=None):
+    """Send `source` once, then `requests` requests naming it by id over
+    `concurrency` connections, each waiting for a reply before sending the
+    next. Return the statistics."""
+    reader, writer = await open_connection(host, port, unix)
+    first = await call(reader, writer, {"id": 0, "source": source, "globals": bindings or {}})
+    writer.close()
+    if "script" not in first:
+        raise RuntimeError(first.get("error", "no script id in reply"))
+    request = {"script": first["script"], "globals": bindings or {}}
+    latencies = []
+    errors = []
+    counter = iter(range(1, requests + 1))
+
+    async def client():
+        reader, writer = await open_connection(host, port, unix)
+        try:
+            for n in counter:
+                start = time.perf_counter()
+                reply = await call(reader, writer, dict(request, id=n))
+                latencies.append(time.perf_counter() - start)
+                if not reply.get("ok"):
+                    errors.append(reply.get("error"))
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(50) if latencies else 0.0,
+        "p90_ms": percentile(90) if latencies else 0.0,
+        "p99_ms": percentile(99) if latencies else 0.0,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def format_load_test(stats):
+    lines = [f"{stats['requests']} requests, {stats['errors']} errors in {stats['seconds']:.2f} s: "
+             f"{stats['rps']:.0f} requests/s",
+             f"latency ms: mean {stats['mean_ms']:.2f}  p50 {stats['p50_ms']:.2f}  "
+             f"p90 {stats['p90_ms']:.2f}  p99 {stats['p99_ms']:.2f}  max {stats['max_ms']:.2f}"]
+    if stats["first_error"]:
+        lines.append(f"first error: {stats['first_error']}")
+    return "\n".join(lines)
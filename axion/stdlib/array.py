@@ -0,0 +1,233 @@
+"""
+Native `include "array";`: typed, fixed-size numeric arrays.
+
+    set a = array.of([1, 2, 3]);        // int array
+    set b = array.zeros(3);             // float array of 0.0
+    set c = a * 2 + b / 4;              // element-wise, returns a new array
+    set v = array.slice(c, 1, 3);       // view: writes go through to c
+    logln(array.dot(a, c));
+
+An array holds only ints ("int") or only floats ("float"). `+ - * /` work
+element-wise between two arrays of the same length or between an array and
+a number, on either side; `/` always gives a float array. Indexing works as
+for lists, but an array never grows: assigning past the end is an error.
+`sum`, `min`, `max` and `dot` also accept plain lists.
+
+Storage is a NumPy array when NumPy is installed, and otherwise a
+memoryview over an `array.array`, where element-wise operations and
+reductions run through `map()` and the builtin reductions in C.
+"""
+
+import builtins as _builtins
+import operator as _operator
+from array import array as _pyarray
+
+from axion.native import register_module
+
+try:
+    import numpy as _numpy
+except ImportError:
+    _numpy = None
+
+_TYPECODES = {"int": "q", "float": "d"}
+_TYPE_NAMES = {"q": "int", "d": "float"}
+
+
+if _numpy is not None:
+    _DTYPES = {"q": _numpy.int64, "d": _numpy.float64}
+
+    def _new(values, typecode):
+        return _numpy.array(values, dtype=_DTYPES[typecode])
+
+    def _zeros(n, typecode):
+        return _numpy.zeros(n, dtype=_DTYPES[typecode])
+
+    def _apply(op, left, right, typecode):
+        return op(left, right).astype(_DTYPES[typecode], copy=False)
+
+    def _scalar(value):
+        return value.item() if isinstance(value, _numpy.generic) else value
+
+    def _dot(left, right):
+        return _scalar(_numpy.dot(left, right))
+
+else:
+    def _new(values, typecode):
+        return memoryview(_pyarray(typecode, values))
+
+    def _zeros(n, typecode):
+        return memoryview(_pyarray(typecode, bytes(n * _pyarray(typecode).itemsize)))
+
+    def _apply(op, left, right, typecode):
+        if not isinstance(right, memoryview):
+            right = [right] * len(left)
+        elif not isinstance(left, memoryview):
+            left = [left] * len(right)
+        return memoryview(_pyarray(typecode, map(op, left, right)))
+
+    def _scalar(value):
+        return value
+
+    def _dot(left, right):
+        return _builtins.sum(map(_operator.mul, left, right))
+
+
+class Array:
+    __slots__ = ('data', 'typecode')
+    # Arrays are mutable: never a dict key or a `memo func` cache key.
+    __hash__ = None
+
+    def __init__(self, data, typecode):
+        self.data = data
+        self.typecode = typecode
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data.tolist())
+
+    def __getitem__(self, index):
+        return _scalar(self.data[index])
+
+    def __setitem__(self, index, value):
+        if self.typecode == "q" and not isinstance(value, int):
+            raise TypeError(f"int array element must be an integer, got {value!r}")
+        self.data[index] = value
+
+    def tolist(self):
+        return self.data.tolist()
+
+    def __str__(self):
+        return str(self.data.tolist())
+
+    __repr__ = __str__
+
+    def binary(self, op, other, reverse, divide=False):
+        if isinstance(other, Array):
+            if len(other) != len(self):
+                raise ValueError(f"array length mismatch: {len(self)} and {len(other)}")
+            other_code, other_data = other.typecode, other.data
+        elif isinstance(other, (int, float)) and not isinstance(other, bool):
+            other_code, other_data = ("q" if isinstance(other, int) else "d"), other
+        else:
+            return NotImplemented
+        typecode = "d" if divide or "d" in (self.typecode, other_code) else "q"
+        if reverse:
+            return Array(_apply(op, other_data, self.data, typecode), typecode)
+        return Array(_apply(op, self.data, other_data, typecode), typecode)
+
+    def __add__(self, other):
+        return self.binary(_operator.add, other, False)
+
+    def __radd__(self, other):
+        return self.binary(_operator.add, other, True)
+
+    def __sub__(self, other):
+        return self.binary(_operator.sub, other, False)
+
+    def __rsub__(self, other):
+        return self.binary(_operator.sub, other, True)
+
+    def __mul__(self, other):
+        return self.binary(_operator.mul, other, False)
+
+    def __rmul__(self, other):
+        return self.binary(_operator.mul, other, True)
+
+    def __truediv__(self, other):
+        return self.binary(_operator.truediv, other, False, divide=True)
+
+    def __rtruediv__(self, other):
+        return self.binary(_operator.truediv, other, True, divide=True)
+
+    def __neg__(self):
+        return self.binary(_operator.sub, 0, True)
+
+
+def _typecode(type_name):
+    typecode = _TYPECODES.get(type_name)
+    if typecode is None:
+        raise ValueError(f"Unknown array type '{type_name}', expected \"int\" or \"float\"")
+    return typecode
+
+
+def _values(a):
+    return a.data if isinstance(a, Array) else a
+
+
+def zeros(n, type_name="float"):
+    typecode = _typecode(type_name)
+    return Array(_zeros(int(n), typecode), typecode)
+
+
+def of(values, type_name=None):
+    values = list(values)
+    if type_name is None:
+        typecode = "d" if any(isinstance(v, float) for v in values) else "q"
+    else:
+        typecode = _typecode(type_name)
+        if typecode == "d":
+            values = [float(v) for v in values]
+    return Array(_new(values, typecode), typecode)
+
+
+def copy(a):
+    return Array(_new(a.data, a.typecode), a.typecode)
+
+
+def slice(a, start, end):
+    return Array(a.data[start:end], a.typecode)
+
+
+def length(a):
+    return len(a)
+
+
+def dtype(a):
+    return _TYPE_NAMES[a.typecode]
+
+
+def to_list(a):
+    return a.tolist()
+
+
+def _reduce(a, method, builtin):
+    values = _values(a)
+    if _numpy is not None and isinstance(values, _numpy.ndarray):
+        return _scalar(getattr(values, method)())
+    return builtin(values)
+
+
+def sum(a):
+    return _reduce(a, "sum", _builtins.sum)
+
+
+def min(a):
+    return _reduce(a, "min", _builtins.min)
+
+
+def max(a):
+    return _reduce(a, "max", _builtins.max)
+
+
+def dot(a, b):
+    a, b = _values(a), _values(b)
+    if len(a) != len(b):
+        raise ValueError(f"array length mismatch: {len(a)} and {len(b)}")
+    return _dot(a, b)
+
+
+register_module("array", {
+    "zeros": zeros,
+    "of": of,
+    "copy": {"impl": copy, "arity": 1},
+    "slice": {"impl": slice, "arity": 3},
+    "length": {"impl": length, "arity": 1, "pure": True},
+    "dtype": {"impl": dtype, "arity": 1, "pure": True},
+    "to_list": {"impl": to_list, "arity": 1},
+    "sum": {"impl": sum, "arity": 1, "pure": True},
+    "min": {"impl": min, "arity": 1, "pure": True},
+    "max": {"impl": max, "arity": 1, "pure": True},
+    "dot": {"impl": dot, "arity": 2, "pure": True},
+})
@@ -0,0 +1,329 @@
+"""
+Native `include "io";`: reading and writing files.
+
+    set text = io.read_all("notes.txt");
+    io.write_all("copy.txt", text);
+
+    set r = io.lines("access.log");      // lazy: one line at a time
+    while (invert io.done(r)) {
+        set fields = io.split(io.next(r));     // [1700000000, "GET", 0.25]
+    }
+
+    set table = io.read_table("data.csv", ",");   // all rows at once
+    set values = io.read_numbers("values.txt");   // every number in the file
+
+`lines` and `csv` return readers that read as the script asks for more:
+`io.next(r)` returns the next line (without its line break) or row, and
+`io.done(r)` tells whether there is none left. A reader closes its file
+once it is done; `io.close(r)` closes it earlier.
+
+`map` maps a file into memory for random access without reading it:
+`io.size(m)`, `io.slice(m, start, end)` and `io.find(m, text, start)`
+work on byte offsets, and `lines`, `read_table` and `read_numbers` accept a
+mapped file wherever they accept a path.
+
+Fields are typed the way `input` types a value, but without the guess on
+the decimal point: a field that parses as an integer is an int, one that
+parses as a float (`1.5`, `2e-3`) a float, and anything else stays a
+string. `read_table` and `read_numbers` split the file in large blocks in
+C, so they run close to the speed of reading the file; unlike `csv`,
+`read_table` knows nothing of quoting. Files are UTF-8;
+undecodable bytes become U+FFFD.
+"""
+
+import gc as _gc
+import csv as _csv
+import math as _math
+import mmap as _mmap
+import builtins as _builtins
+import operator as _operator
+import itertools as _itertools
+import contextlib as _contextlib
+
+from axion.native import register_module
+
+ENCODING = "utf-8"
+ERRORS = "replace"
+# Bytes read at a time by read_table and read_numbers.
+BLOCK_SIZE = 16 * 1024 * 1024
+# Fields converted one at a time below this, in bulk from it.
+BULK_FIELDS = 64
+
+_strip_newline = _operator.methodcaller("rstrip", "\r\n")
+_strip_line_end = _operator.methodcaller("rstrip", b"\r")
+
+
+class Reader:
+    """Lines or rows of a file, read one ahead so that `done` can answer."""
+    __slots__ = ('items', 'file', 'ahead', 'finished')
+
+    def __init__(self, items, file=None):
+        self.items = items
+        self.file = file
+        self.finished = False
+        self.advance()
+
+    def advance(self):
+        try:
+            self.ahead = _builtins.next(self.items)
+        except StopIteration:
+            self.ahead = None
+            self.close()
+
+    def close(self):
+        self.finished = True
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.finished:
+            raise StopIteration
+        item = self.ahead
+        self.advance()
+        return item
+
+    def __repr__(self):
+        return "<io reader>"
+
+
+class Mapped:
+    """A file mapped into memory."""
+    __slots__ = ('data', 'file', 'path')
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = _mmap.mmap(self.file.fileno(), 0, access=_mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped.
+            self.data = b""
+
+    def close(self):
+        if isinstance(self.data, _mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"<io mapped {self.path}>"
+
+
+def _decode(data):
+    return data.decode(ENCODING, ERRORS)
+
+
+def _word(text):
+    return text if text.__class__ is str else _decode(text)
+
+
+def _value(text):
+    if _DOT[text.__class__] not in text:
+        try:
+            return int(text)
+        except ValueError:
+            pass
+    try:
+        value = float(text)
+    except ValueError:
+        return _word(text)
+    # "nan", "inf" and "infinity" are words, not numbers.
+    return value if _math.isfinite(value) else _word(text)
+
+
+_DOT = {bytes: b".", str: "."}
+_strip_sign = {bytes: _operator.methodcaller("strip", b" \t+-"),
+               str: _operator.methodcaller("strip", " \t+-")}
+_is_whole = {bytes: bytes.isdigit, str: str.isdecimal}
+
+
+def _typed(fields):
+    """Fields converted to numbers where they are numbers. Long lists are
+    converted in a few passes of map(), which run in C."""
+    if len(fields) < BULK_FIELDS:
+        return [_value(field) for field in fields]
+    try:
+        return list(map(int, fields))
+    except ValueError:
+        pass
+    try:
+        values = list(map(float, fields))
+    except ValueError:
+        return [_value(field) for field in fields]
+    if not all(map(_math.isfinite, values)):
+        return [_value(field) for field in fields]
+    # Of the fields with integral values, those written without a decimal
+    # point or exponent are ints.
+    integral = list(map(float.is_integer, values))
+    if any(integral):
+        kind = fields[0].__class__
+        positions = list(_itertools.compress(range(len(fields)), integral))
+        candidates = list(_itertools.compress(fields, integral))
+        whole = list(map(_is_whole[kind], map(_strip_sign[kind], candidates)))
+        ints = map(int, _itertools.compress(candidates, whole))
+        for _ in map(values.__setitem__, _itertools.compress(positions, whole), ints):
+            pass
+    return values
+
+
+@_contextlib.contextmanager
+def _gc_paused():
+    # Building millions of lists would otherwise set off a full garbage
+    # collection again and again.
+    enabled = _gc.isenabled()
+    _gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            _gc.enable()
+
+
+def _blocks(source):
+    """The contents of a path or mapped file, a block at a time."""
+    if isinstance(source, Mapped):
+        data = source.data
+        for start in range(0, len(data), BLOCK_SIZE):
+            yield data[start:start + BLOCK_SIZE]
+        return
+    with open(source, "rb") as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+def _split_blocks(source, separator):
+    """Yield lists of complete pieces of `source` split on `separator`
+    (whitespace when None), a block at a time."""
+    rest = b""
+    for block in _blocks(source):
+        pieces = (rest + block).split(separator)
+        # The last piece may continue in the next block.
+        if separator is None and (block[-1:].isspace() or not pieces):
+            rest = b""
+        else:
+            rest = pieces.pop()
+        yield pieces
+    if rest:
+        yield [rest]
+
+
+def read_all(path):
+    with open(path, "r", encoding=ENCODING, errors=ERRORS, newline="") as f:
+        return f.read()
+
+
+def write_all(path, value):
+    """Write a string, or a list one item per line, and return the number
+    of characters written."""
+    if isinstance(value, list):
+        value = "".join([f"{item}\n" for item in value])
+    else:
+        value = str(value)
+    with open(path, "w", encoding=ENCODING, newline="") as f:
+        return f.write(value)
+
+
+def lines(source):
+    if isinstance(source, Mapped):
+        if not source.data:
+            return Reader(iter(()))
+        # A mapping of its own, so that readers do not share a position.
+        data = _mmap.mmap(source.file.fileno(), 0, access=_mmap.ACCESS_READ)
+        return Reader(map(_strip_newline, map(_decode, iter(data.readline, b""))), data)
+    f = open(source, "r", encoding=ENCODING, errors=ERRORS, newline="")
+    return Reader(map(_strip_newline, f), f)
+
+
+def csv(path, separator=","):
+    """A reader of the rows of a CSV file, as lists of typed fields.
+    Quoted fields may hold separators and line breaks."""
+    f = open(path, "r", encoding=ENCODING, errors=ERRORS, newline="")
+    return Reader(map(_typed, _csv.reader(f, delimiter=separator)), f)
+
+
+def done(reader):
+    return reader.finished
+
+
+def next(reader):
+    if reader.finished:
+        raise RuntimeError("io.next: no lines left")
+    return reader.__next__()
+
+
+def close(handle):
+    handle.close()
+
+
+def split(text, separator=""):
+    """The typed fields of `text`, split on `separator`, or on runs of
+    whitespace when it is empty or omitted."""
+    return _typed(text.split(separator or None))
+
+
+def read_table(source, separator=""):
+    """The rows of a file as lists of typed fields; blank lines are skipped."""
+    separator = separator.encode(ENCODING) if separator else None
+    split = _operator.methodcaller("split", separator)
+    rows = []
+    with _gc_paused():
+        for pieces in _split_blocks(source, b"\n"):
+            rows += map(split, map(_strip_line_end, pieces))
+        rows = [fields for fields in rows if fields and fields != [b""]]
+        if len(rows) > 1 and all(len(fields) == len(rows[0]) for fields in rows):
+            # Columns usually hold one type each, which _typed converts
+            # fastest; the first row, often a header, is typed apart.
+            columns = [_typed(column) for column in zip(*rows[1:])]
+            return [_typed(rows[0])] + list(map(list, zip(*columns)))
+        return list(map(_typed, rows))
+
+
+def read_numbers(source):
+    """Every whitespace-separated field of a file, typed."""
+    values = []
+    for pieces in _split_blocks(source, None):
+        values += _typed(pieces)
+    return values
+
+
+def map_file(path):
+    return Mapped(path)
+
+
+def size(mapped):
+    return len(mapped)
+
+
+def slice(mapped, start, end):
+    return _decode(mapped.data[start:end])
+
+
+def find(mapped, text, start=0):
+    return mapped.data.find(text.encode(ENCODING), start)
+
+
+register_module("io", {
+    "read_all": {"impl": read_all, "arity": 1},
+    "write_all": {"impl": write_all, "arity": 2},
+    "lines": {"impl": lines, "arity": 1},
+    "csv": csv,
+    "done": {"impl": done, "arity": 1},
+    "next": {"impl": next, "arity": 1},
+    "close": {"impl": close, "arity": 1},
+    "split": split,
+    "read_table": read_table,
+    "read_numbers": {"impl": read_numbers, "arity": 1},
+    "map": {"impl": map_file, "arity": 1},
+    "size": {"impl": size, "arity": 1},
+    "slice": {"impl": slice, "arity": 3},
+    "find": find,
+})
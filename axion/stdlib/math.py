@@ -0,0 +1,167 @@
+"""
+Native implementation of `include "math";`.
+
+Same functions and signatures as the Axion version kept in `math_pure.ax`,
+computed with Python's `math` and `random` instead of interpreted loops.
+Results are exact where the Axion version approximates (`sqrt`, `ln`,
+`exp`, the trigonometric functions) or goes wrong (`pow` halved the
+exponent with float division, `max`/`min` returned nothing for equal
+arguments). `factorial` of a fraction is the factorial of its integer
+part, which is what the Axion version's loop from 2 to n computes.
+`floor`, `ceil` and `round` return integers, and `round` still rounds
+halves up. `LOG` keeps returning the rounded logarithm.
+
+Domain errors are reported the way the Axion version reports them: a
+"Math Error: ..." message is logged and the call returns "".
+"""
+
+import math as _math
+import random as _random_module
+
+from axion.native import register_module, write
+
+_random = _random_module.Random()
+
+
+def _error(message):
+    write(f"Math Error: {message}")
+    return ""
+
+
+def square(x):
+    return x * x
+
+
+def cube(x):
+    return x * x * x
+
+
+def _pow(base, exponent):
+    return base ** exponent
+
+
+def _abs(x):
+    return -x if x < 0 else x
+
+
+def factorial(n):
+    if n < 0:
+        return _error("Factorial not defined for negative numbers")
+    return _math.factorial(int(n))
+
+
+def _max(a, b):
+    return b if b > a else a
+
+
+def _min(a, b):
+    return b if b < a else a
+
+
+def gcd(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return _math.gcd(a, b)
+    while b != 0:
+        a, b = b, a % b
+    return a
+
+
+def lcm(a, b):
+    if a == 0 or b == 0:
+        return 0
+    if isinstance(a, int) and isinstance(b, int):
+        return _math.lcm(a, b)
+    return _abs(a * b) / gcd(a, b)
+
+
+def rand(min, max):
+    return min + _random.randint(0, int(max - min))
+
+
+def sqrt(x):
+    if x < 0:
+        return _error("sqrt not defined for negative numbers")
+    return _math.sqrt(x)
+
+
+def floor(x):
+    return _math.floor(x)
+
+
+def ceil(x):
+    return _math.ceil(x)
+
+
+def _round(x):
+    return _math.floor(x + 0.5)
+
+
+def ln(x):
+    if x <= 0:
+        return _error("ln not defined for non-positive numbers")
+    return _math.log(x)
+
+
+def LOG(x, base):
+    if x <= 0 or base <= 0:
+        return _error("ln not defined for non-positive numbers")
+    if base == 1:
+        return _error("Invalid base for log")
+    return _round(_math.log(x) / _math.log(base))
+
+
+def exp(x):
+    return _math.exp(x)
+
+
+def PI():
+    return _math.pi
+
+
+def normalize_angle(x):
+    return x % _math.tau
+
+
+def sin(x):
+    return _math.sin(x)
+
+
+def cos(x):
+    return _math.cos(x)
+
+
+def tan(x):
+    return _math.tan(x)
+
+
+def length(x):
+    return len(x)
+
+
+# Functions that can log a Math Error are not marked pure: folding a call
+# ahead of time would move its output.
+register_module("math", {
+    "square": {"impl": square, "arity": 1, "pure": True},
+    "cube": {"impl": cube, "arity": 1, "pure": True},
+    "pow": {"impl": _pow, "arity": 2, "pure": True},
+    "abs": {"impl": _abs, "arity": 1, "pure": True},
+    "factorial": {"impl": factorial, "arity": 1},
+    "max": {"impl": _max, "arity": 2, "pure": True},
+    "min": {"impl": _min, "arity": 2, "pure": True},
+    "gcd": {"impl": gcd, "arity": 2, "pure": True},
+    "lcm": {"impl": lcm, "arity": 2, "pure": True},
+    "rand": {"impl": rand, "arity": 2},
+    "sqrt": {"impl": sqrt, "arity": 1},
+    "floor": {"impl": floor, "arity": 1, "pure": True},
+    "ceil": {"impl": ceil, "arity": 1, "pure": True},
+    "round": {"impl": _round, "arity": 1, "pure": True},
+    "ln": {"impl": ln, "arity": 1},
+    "LOG": {"impl": LOG, "arity": 2},
+    "exp": {"impl": exp, "arity": 1, "pure": True},
+    "PI": {"impl": PI, "arity": 0, "pure": True},
+    "normalize_angle": {"impl": normalize_angle, "arity": 1, "pure": True},
+    "sin": {"impl": sin, "arity": 1, "pure": True},
+    "cos": {"impl": cos, "arity": 1, "pure": True},
+    "tan": {"impl": tan, "arity": 1, "pure": True},
+    "length": {"impl": length, "arity": 1, "pure": True},
+})
@@ -0,0 +1,846 @@
+"""
+Ahead-of-time transpiler from the Axion AST to Python.
+
+`transpile(program)` returns Python source for a parsed Program; `PyEngine`
+compiles that source once with `compile()` and runs it, so Axion functions
+become real Python functions.
+
+Axion names are mangled so they can never collide with the runtime helpers:
+top-level variables become module globals (`v_name`), function locals
+become Python locals (`l_name`) and functions become `f_name`. Block scopes
+are resolved statically; a declaration that shadows a visible name gets a
+numbered suffix.
+
+Axion functions run in the scope of their caller. A free name in a function
+is the top-level variable unless some nested block, parameter or loop
+variable declares the same name; a free name that a caller could bind is
+looked up by name at run time instead, like the VM does. Every declaration
+of such a name is then kept in a dict of its frame (`_s`) rather than in a
+Python local, the frames of the running calls are kept on a stack with the
+module's globals at the bottom, and a block's entries are removed from the
+dict when the block is left. Programs without such names transpile to plain
+locals and globals.
+"""
+
+import re
+import math
+from axion.ast import Node
+from axion.cache import read_module, load_program
+from axion.resolver import shadowed_names
+from axion.runtime import (invert, both, either, parse_input, set_index, get_member,
+                           module_name, number_value, Map, Memo, Output, iterate,
+                           case_table)
+from axion.native import BUILTINS as BUILTIN_FUNCTIONS, load_module
+
+COMPARE_OPS = {'+', '-', '*', '/', '%', '==', '!=', '<', '<=', '>', '>='}
+BITWISE_OPS = {'&', '|', '^', '<<', '>>'}
+AUG_OPS = {'+=': '+', '-=': '-', '*=': '*', '/=': '/', '%=': '%'}
+# Matches with fewer literal cases run faster as an if/elif chain.
+TABLE_CASES = 16
+
+NAME_ERROR = re.compile(r"'([vlf])_(\w+?)(?:_\d+)?'")
+
+
+class ProgramExit(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+class Binding:
+    __slots__ = ('pyname', 'const', 'dynamic')
+
+    def __init__(self, pyname, const, dynamic=False):
+        self.pyname = pyname
+        self.const = const
+        # Kept in the frame's `_s` dict so that callees can find it by name.
+        self.dynamic = dynamic
+
+
+class FunctionState:
+    def __init__(self):
+        self.scopes = [{}]
+        self.globals = set()
+        # Index in `scopes` of the body scope of each enclosing loop.
+        self.loops = []
+        # {name: [(suffix, pyname)]} of the dynamic bindings declared.
+        self.dynamic = {}
+        self.consts = set()
+
+
+def has_side_effects(expr):
+    if isinstance(expr, Node):
+        if expr.type in ('Call', 'Assignment'):
+            return True
+        return any(has_side_effects(v) for _, v in expr.fields())
+    if isinstance(expr, list):
+        return any(has_side_effects(v) for v in expr)
+    return False
+
+
+def collect_functions(node, names):
+    if isinstance(node, Node):
+        if node.type == 'FuncDecl':
+            names.add(node.name)
+        for _, v in node.fields():
+            collect_functions(v, names)
+    elif isinstance(node, list):
+        for v in node:
+            collect_functions(v, names)
+    return names
+
+
+class Transpiler:
+    def __init__(self):
+        self.lines = []
+        self.indent = 0
+        self.temp_count = 0
+        self.top_scopes = [{}]
+        self.top = FunctionState()
+        self.function = None
+        self.function_names = set()
+        self.global_consts = set()
+        # Names a function might find in its caller's scope.
+        self.shadowed = set()
+        # The free names of functions that are looked up at run time, or
+        # None while collecting them.
+        self.dynamic = None
+        self.free = set()
+        # Module-level dicts of the match statements dispatched by table.
+        self.tables = []
+
+    def transpile(self, program, dynamic=None):
+        self.function_names = collect_functions(program, set())
+        self.shadowed = shadowed_names(program)
+        self.dynamic = dynamic
+        for stmt in program.body:
+            if stmt.type == 'ConstDecl':
+                self.global_consts.add(stmt.name)
+        for stmt in program.body:
+            self.statement(stmt)
+        if self.dynamic:
+            # The module's globals are the bottom frame of every lookup.
+            self.tables.append("_s = globals()")
+            self.tables.append(f"_frames.append((_s, {self.frame_tables(self.top)}))")
+        return "\n".join(self.tables + self.lines) + "\n"
+
+    def exports(self):
+        names = {name: b.pyname for name, b in self.top_scopes[0].items()}
+        for name in self.function_names:
+            names.setdefault(name, "f_" + name)
+        return names
+
+    # -- output helpers -----------------------------------------------------
+
+    def line(self, text):
+        self.lines.append("    " * self.indent + text)
+
+    def temp(self):
+        self.temp_count += 1
+        return f"_t{self.temp_count}"
+
+    def body(self, stmts, tail=False):
+        start = len(self.lines)
+        self.indent += 1
+        self.scopes().append({})
+        last = len(stmts) - 1
+        for i, stmt in enumerate(stmts):
+            self.statement(stmt, tail and i == last)
+        self.clear(self.scopes().pop())
+        if len(self.lines) == start:
+            self.line("pass")
+        self.indent -= 1
+
+    # -- scope handling -----------------------------------------------------
+
+    def scopes(self):
+        return self.function.scopes if self.function else self.top_scopes
+
+    def state(self):
+        return self.function or self.top
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes()):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def declare(self, name, const=False):
+        prefix = "l_" if self.function else "v_"
+        visible = {b.pyname for scope in self.scopes() for b in scope.values()}
+        pyname = prefix + name
+        n = 0
+        while pyname in visible:
+            n += 1
+            pyname = f"{prefix}{name}_{n}"
+        binding = Binding(pyname, const, bool(self.dynamic) and name in self.dynamic)
+        if binding.dynamic:
+            state = self.state()
+            state.dynamic.setdefault(name, []).append((n, pyname))
+            if const:
+                state.consts.add(pyname)
+        self.scopes()[-1][name] = binding
+        return binding
+
+    def frame_tables(self, state):
+        """Source of the {name: pynames, innermost first} table and the set
+        of constants of a frame's dynamic bindings."""
+        names = {name: tuple(pyname for _, pyname in sorted(set(found), reverse=True))
+                 for name, found in state.dynamic.items()}
+        return f"{names!r}, {state.consts!r}" if state.consts else f"{names!r}, ()"
+
+    def load(self, binding):
+        if binding.dynamic and self.function:
+            return f"_s[{binding.pyname!r}]"
+        return binding.pyname
+
+    def assign(self, binding, value):
+        """Statement storing `value` in `binding`."""
+        if binding.dynamic and self.function:
+            return f"_s[{binding.pyname!r}] = {value}"
+        return f"{binding.pyname} = {value}"
+
+    def clear(self, scope):
+        # A callee must not find the dynamic bindings of a block once it
+        # is left, as in the VM.
+        for binding in scope.values():
+            if binding.dynamic:
+                self.line(f"_s.pop({binding.pyname!r}, None)")
+
+    def reference(self, name):
+        binding = self.lookup(name)
+        if binding is not None:
+            return self.load(binding)
+        if self.function:
+            if name in self.function_names:
+                return "f_" + name
+            if self.is_dynamic(name):
+                return f"_load({name!r})"
+            return "v_" + name
+        if name in self.function_names or name in BUILTIN_FUNCTIONS:
+            return "f_" + name
+        return f"_undefined({name!r})"
+
+    def is_dynamic(self, name):
+        """Whether a free name of a function is looked up at run time: when
+        a caller could declare the same name."""
+        if name not in self.shadowed:
+            return False
+        if self.dynamic is None:
+            self.free.add(name)
+            return False
+        return True
+
+    def assign_target(self, name):
+        """Return the binding an assignment to `name` stores in, a Binding
+        without a pyname when the name is looked up at run time, or None
+        when the name is not declared anywhere the statement can see it."""
+        binding = self.lookup(name)
+        if binding is not None:
+            return binding
+        if self.function:
+            if self.is_dynamic(name):
+                return Binding(None, False)
+            pyname = "v_" + name
+            self.function.globals.add(pyname)
+            return Binding(pyname, name in self.global_consts)
+        return None
+
+    # -- statements ---------------------------------------------------------
+
+    def statement(self, stmt, tail=False):
+        getattr(self, 'stmt_' + stmt.type)(stmt, tail)
+
+    def stmt_VarDecl(self, stmt, tail):
+        value = self.expr(stmt.value) if stmt.value else "None"
+        self.declaration(stmt.name, value, const=False)
+
+    def stmt_ConstDecl(self, stmt, tail):
+        if stmt.value is None:
+            self.line(f"raise ValueError({'Constant ' + repr(stmt.name) + ' must be initialized'!r})")
+            return
+        self.declaration(stmt.name, self.expr(stmt.value), const=True)
+
+    def declaration(self, name, value, const):
+        if name in self.scopes()[-1]:
+            self.line(f"_t = {value}")
+            self.line(f"raise NameError({'Variable ' + repr(name) + ' already declared in this scope'!r})")
+            return
+        binding = self.declare(name, const)
+        self.line(self.assign(binding, value))
+
+    def stmt_ExpressionStatement(self, stmt, tail):
+        expr = stmt.expr
+        if tail:
+            self.line(f"return {self.expr(expr)}")
+        elif expr.type == 'Assignment':
+            self.assignment(expr, statement=True)
+        else:
+            self.line(self.expr(expr))
+
+    def stmt_IO(self, stmt, tail):
+        action = stmt.action
+        if action == 'log':
+            self.line(f"_log({self.expr(stmt.expr)})")
+        elif action == 'logln':
+            self.line(f"_logln({self.expr(stmt.expr)})")
+        elif action == 'input':
+            message = self.expr(stmt.message) if stmt.message else "''"
+            value = f"_parse_input(_input(str({message})))"
+            target = stmt.target
+            if target.type == 'IDENTIFIER':
+                self.store(target.value, value, "Cannot reassign constant")
+            elif target.type == 'Index':
+                self.line(self.index_store(target, None, value))
+            else:
+                self.line(value)
+
+    def stmt_IfStatement(self, stmt, tail):
+        keyword = "if"
+        branches = [(stmt.condition, stmt.body)]
+        branches += [(e.condition, e.body) for e in stmt.elseifs]
+        for condition, body in branches:
+            self.line(f"{keyword} {self.expr(condition)}:")
+            self.body(body, tail)
+            keyword = "elif"
+        if stmt.orelse:
+            self.line("else:")
+            self.body(stmt.orelse, tail)
+
+    def stmt_FuncDecl(self, stmt, tail):
+        if self.function:
+            self.function.globals.add("f_" + stmt.name)
+        outer = (self.function, self.lines, self.indent)
+        self.function = FunctionState()
+        self.lines = []
+        self.indent = 1
+        params = [self.declare(pname) for pname in stmt.params]
+        last = len(stmt.body) - 1
+        for i, s in enumerate(stmt.body):
+            self.statement(s, i == last)
+        body = self.lines or ["    pass"]
+        declared_globals = sorted(self.function.globals)
+        function, self.function, self.lines, self.indent = self.function, *outer
+
+        names = ", ".join([b.pyname + "=None" for b in params] + ["*_extra"])
+        self.line(f"def f_{stmt.name}({names}):")
+        if declared_globals:
+            self.line(f"    global {', '.join(declared_globals)}")
+        indent = "    " * self.indent
+        if function.dynamic:
+            # Put this call's frame on the stack callees search.
+            table = f"_frame{len(self.tables) + 1}"
+            self.tables.append(f"{table} = {self.frame_tables(function)}")
+            values = ", ".join(f"{b.pyname!r}: {b.pyname}" for b in params if b.dynamic)
+            self.line(f"    _s = {{{values}}}")
+            self.line(f"    _frames.append((_s, *{table}))")
+            self.line("    try:")
+            self.lines.extend(indent + "    " + l for l in body)
+            self.line("    finally:")
+            self.line("        _frames.pop()")
+        else:
+            self.lines.extend(indent + l for l in body)
+        if stmt.memo is not None:
+            self.line(f"f_{stmt.name} = _memo(f_{stmt.name}, {stmt.name!r}, {stmt.memo})")
+
+    def stmt_ReturnStatement(self, stmt, tail):
+        value = self.expr(stmt.expr)
+        if self.function:
+            self.line(f"return {value}")
+        else:
+            self.line(f"raise _ProgramExit({value})")
+
+    def leave_loop_body(self, keyword):
+        loops = self.state().loops
+        if not loops:
+            raise SyntaxError(f"'{keyword}' outside loop")
+        for scope in self.scopes()[loops[-1]:]:
+            self.clear(scope)
+
+    def stmt_BreakStatement(self, stmt, tail):
+        self.leave_loop_body('break')
+        self.line("break")
+
+    def stmt_SkipStatement(self, stmt, tail):
+        self.leave_loop_body('skip')
+        self.line("continue")
+
+    def loop(self, header, body, var=None):
+        self.line(header)
+        self.indent += 1
+        self.scopes().append({})
+        self.state().loops.append(len(self.scopes()) - 1)
+        start = len(self.lines)
+        if var is not None:
+            name, source = var
+            self.line(self.assign(self.declare(name), source))
+        for stmt in body:
+            self.statement(stmt)
+        self.state().loops.pop()
+        self.clear(self.scopes().pop())
+        if len(self.lines) == start:
+            self.line("pass")
+        self.indent -= 1
+
+    def stmt_ForLoop(self, stmt, tail):
+        start = self.expr(stmt.start)
+        end = self.expr(stmt.end)
+        step = self.expr(stmt.step)
+        counter = self.temp()
+        self.loop(f"for {counter} in _count({start}, {end}, {step}):", stmt.body,
+                  var=(stmt.var, counter))
+
+    def stmt_ForInLoop(self, stmt, tail):
+        item = self.temp()
+        self.loop(f"for {item} in _iterate({self.expr(stmt.iterable)}):", stmt.body,
+                  var=(stmt.var, item))
+
+    def stmt_WhileLoop(self, stmt, tail):
+        self.loop(f"while {self.expr(stmt.condition)}:", stmt.body)
+
+    def stmt_DoWhileLoop(self, stmt, tail):
+        # `skip` restarts the body without testing the condition, as in the
+        # tree-walking interpreter.
+        self.line("while True:")
+        self.indent += 1
+        self.scopes().append({})
+        self.state().loops.append(len(self.scopes()) - 1)
+        for s in stmt.body:
+            self.statement(s)
+        self.state().loops.pop()
+        self.clear(self.scopes().pop())
+        self.line(f"if not {self.expr(stmt.condition)}:")
+        self.line("    break")
+        self.indent -= 1
+
+    def stmt_MatchStatement(self, stmt, tail):
+        subject = self.temp()
+        self.line(f"{subject} = {self.expr(stmt.expr)}")
+        table = case_table(stmt.cases) if len(stmt.cases) >= TABLE_CASES else None
+        if table is not None:
+            self.match_table(stmt, subject, table, tail)
+            return
+        keyword = "if"
+        for case in stmt.cases:
+            self.line(f"{keyword} {subject} == {self.expr(case.value)}:")
+            self.body([case.body], tail)
+            keyword = "elif"
+        if stmt.orelse:
+            if keyword == "if":
+                self.body_inline([stmt.orelse.body], tail)
+            else:
+                self.line("else:")
+                self.body([stmt.orelse.body], tail)
+
+    def match_table(self, stmt, subject, table, tail):
+        # Look the case up in a dict built once with the module, then reach
+        # its arm through a binary tree of comparisons on its position.
+        name = f"_cases{len(self.tables) + 1}"
+        items = ", ".join(f"{self.literal(value)}: {i}" for value, i in table.items())
+        self.tables.append(f"{name} = {{{items}}}")
+        arms = [[case.body] for case in stmt.cases]
+        arms.append([stmt.orelse.body] if stmt.orelse else [])
+        index = self.temp()
+        self.line("try:")
+        self.line(f"    {index} = {name}.get({subject}, {len(stmt.cases)})")
+        self.line("except TypeError:")
+        self.line(f"    {index} = {len(stmt.cases)}")
+        self.arm_tree(index, arms, 0, len(arms), tail)
+
+    def arm_tree(self, index, arms, low, high, tail):
+        if high - low == 1:
+            start = len(self.lines)
+            self.body_inline(arms[low], tail)
+            if len(self.lines) == start:
+                self.line("pass")
+            return
+        middle = (low + high) // 2
+        self.line(f"if {index} < {middle}:")
+        self.indent += 1
+        self.arm_tree(index, arms, low, middle, tail)
+        self.indent -= 1
+        self.line("else:")
+        self.indent += 1
+        self.arm_tree(index, arms, middle, high, tail)
+        self.indent -= 1
+
+    def body_inline(self, stmts, tail):
+        self.scopes().append({})
+        for s in stmts:
+            self.statement(s, tail)
+        self.clear(self.scopes().pop())
+
+    def stmt_Include(self, stmt, tail):
+        # Including an already loaded module declares nothing, like the
+        # tree-walking interpreter.
+        module = self.temp()
+        name = module_name(stmt.path)
+        binding = self.scopes()[-1].get(name) or self.declare(name)
+        self.line(f"{module} = _include({stmt.path!r})")
+        self.line(f"if {module} is not None:")
+        self.line(f"    {self.assign(binding, module)}")
+
+    # -- assignments --------------------------------------------------------
+
+    def store(self, name, value, const_message="Cannot modify constant"):
+        target = self.assign_target(name)
+        if target is None:
+            self.line(f"_undefined({name!r}, {value})")
+        elif target.const:
+            self.line(f"_const_error({name!r}, {value}, {const_message!r})")
+        elif target.pyname is None:
+            self.line(f"_store({name!r}, {value})")
+        else:
+            self.line(self.assign(target, value))
+
+    def index_store(self, target, op, value):
+        inner = target.target
+        if inner.type == 'IDENTIFIER':
+            binding = self.lookup(inner.value)
+            const = binding.const if binding else (inner.value in self.global_consts)
+            if const:
+                return f"_const_error({inner.value!r}, {value})"
+        arr = self.expr(inner)
+        idx = self.expr(target.index)
+        if op is None:
+            return f"_set_index({arr}, {idx}, {value})"
+        return f"_aug_index({arr}, {idx}, {value}, {op!r})"
+
+    def assignment(self, expr, statement=False):
+        target = expr.target
+        value = self.expr(expr.value)
+        op = expr.op
+        if target.type == 'IDENTIFIER':
+            name = target.value
+            resolved = self.assign_target(name)
+            if resolved is None:
+                result = f"_undefined({name!r}, {value})"
+            elif resolved.const:
+                result = f"_const_error({name!r}, {value})"
+            elif resolved.pyname is None:
+                aug = "" if op == '=' else f", {AUG_OPS[op]!r}"
+                result = f"_store({name!r}, {value}{aug})"
+            else:
+                current = self.load(resolved)
+                if op != '=':
+                    if has_side_effects(expr.value):
+                        value = f"_aug({value}, {current}, {AUG_OPS[op]!r})"
+                    else:
+                        value = f"{current} {AUG_OPS[op]} {value}"
+                if statement:
+                    self.line(self.assign(resolved, value))
+                    return None
+                if current != resolved.pyname:
+                    result = f"_put(_s, {resolved.pyname!r}, {value})"
+                else:
+                    result = f"({current} := {value})"
+        elif target.type == 'Index':
+            result = self.index_store(target, None if op == '=' else AUG_OPS[op], value)
+        else:
+            result = f"_discard({value})"
+        if statement:
+            self.line(result)
+            return None
+        return result
+
+    # -- expressions --------------------------------------------------------
+
+    def expr(self, expr):
+        return getattr(self, 'expr_' + expr.type)(expr)
+
+    def expr_NUMBER(self, expr):
+        # The lexeme may not be a Python literal, as in `007`.
+        return self.literal(number_value(expr.value))
+
+    def expr_STRING(self, expr):
+        return repr(expr.value)
+
+    def expr_Constant(self, expr):
+        return self.literal(expr.value)
+
+    def literal(self, value):
+        if isinstance(value, float) and math.isinf(value):
+            return f"float({repr(value)!r})"
+        return repr(value)
+
+    def expr_Template(self, expr):
+        pieces = []
+        for part in expr.parts:
+            if isinstance(part, str):
+                pieces.append(repr(part))
+            else:
+                pieces.append(f"str({self.expr(part)})")
+        return "''.join((" + ", ".join(pieces) + ",))"
+
+    def expr_IDENTIFIER(self, expr):
+        return self.reference(expr.value)
+
+    def expr_MemberAccess(self, expr):
+        return f"_member({self.expr(expr.object)}, {expr.property!r})"
+
+    def expr_BinaryOp(self, expr):
+        op = expr.op
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        if op in COMPARE_OPS:
+            return f"({left} {op} {right})"
+        if op in BITWISE_OPS:
+            return f"(int({left}) {op} int({right}))"
+        # Both operands are evaluated, so `and`/`or` may only skip a right
+        # operand that cannot fail.
+        if self.cannot_fail(expr.right):
+            return f"({left} {'and' if op == 'both' else 'or'} {right})"
+        return f"{'_both' if op == 'both' else '_either'}({left}, {right})"
+
+    def cannot_fail(self, expr):
+        """Whether evaluating `expr` can neither raise nor have an effect: a
+        literal, or a variable declared where it is read."""
+        if expr.type in ('NUMBER', 'STRING', 'Constant'):
+            return True
+        return expr.type == 'IDENTIFIER' and self.lookup(expr.value) is not None
+
+    def expr_UnaryOp(self, expr):
+        op = expr.op
+        operand = self.expr(expr.expr)
+        if op == 'invert':
+            return f"_invert({operand})"
+        if op in ('-', '~'):
+            return f"({op}{operand})"
+        raise SyntaxError(f"Unknown unary operator: {op}")
+
+    def expr_Assignment(self, expr):
+        return self.assignment(expr)
+
+    def expr_Call(self, expr):
+        callee = expr.callee
+        args = ", ".join(self.expr(a) for a in expr.args)
+        if callee.type == 'IDENTIFIER':
+            name = callee.value
+            if name in self.function_names or name in BUILTIN_FUNCTIONS:
+                return f"f_{name}({args})"
+            if not self.function and self.lookup(name) is None:
+                return f"_raise({'Error: Function ' + repr(name) + ' is not defined'!r})"
+            return f"{self.reference(name)}({args})"
+        if callee.type == 'MemberAccess':
+            return f"_member({self.expr(callee.object)}, {callee.property!r})({args})"
+        if callee.type == 'Index':
+            return f"{self.expr(callee.target)}[{self.expr(callee.index)}]({args})"
+        return f"_raise({'Error: Unsupported callee type ' + callee.type!r})"
+
+    def expr_ArrayLiteral(self, expr):
+        return "[" + ", ".join(self.expr(e) for e in expr.elements) + "]"
+
+    def expr_MapLiteral(self, expr):
+        items = ", ".join(f"{self.expr(k)}: {self.expr(v)}" for k, v in zip(expr.keys, expr.values))
+        return f"_Map({{{items}}})"
+
+    def expr_Index(self, expr):
+        return f"{self.expr(expr.target)}[{self.expr(expr.index)}]"
+
+
+def run_transpiler(program):
+    """Return (transpiler, source) for `program`. The first pass finds the
+    free names of functions that a caller could bind; only a program with
+    such names is transpiled again to keep them where callees find them."""
+    transpiler = Transpiler()
+    source = transpiler.transpile(program)
+    if transpiler.free:
+        free = transpiler.free
+        transpiler = Transpiler()
+        source = transpiler.transpile(program, dynamic=free)
+    return transpiler, source
+
+
+def transpile(program):
+    return run_transpiler(program)[1]
+
+
+class CompiledModule:
+    __slots__ = ('source', 'code', 'exports')
+
+    def __init__(self, program, filename="<axion>"):
+        transpiler, self.source = run_transpiler(program)
+        self.code = compile(self.source, filename, "exec")
+        self.exports = transpiler.exports()
+
+
+# -- runtime support --------------------------------------------------------
+
+def _count(start, end, step):
+    if type(start) is int and type(end) is int and type(step) is int and step > 0:
+        return range(start, end + 1, step)
+    return _count_slow(start, end, step)
+
+
+def _count_slow(i, end, step):
+    while i <= end:
+        yield i
+        i += step
+
+
+def _undefined(name, *value):
+    raise NameError(f"Variable '{name}' is not defined")
+
+
+def _const_error(name, value=None, message="Cannot modify constant"):
+    raise ValueError(f"{message} '{name}'")
+
+
+def _raise(message):
+    raise Exception(message)
+
+
+def _discard(value):
+    return None
+
+
+AUG_FUNCS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '%': lambda a, b: a % b,
+}
+
+
+def _aug(value, current, op):
+    return AUG_FUNCS[op](current, value)
+
+
+def _aug_index(arr, idx, value, op):
+    arr[idx] = AUG_FUNCS[op](arr[idx], value)
+    return arr[idx]
+
+
+def _set_index(arr, idx, value):
+    set_index(arr, idx, value)
+    return arr[idx]
+
+
+def _put(values, key, value):
+    values[key] = value
+    return value
+
+
+class CallerFrames(list):
+    """Frames of the running calls of one module that keep bindings by
+    name, innermost last, above the module's globals. A frame is a
+    (values, names, consts) triple: the dict of its bindings, {name: keys
+    in values, innermost block first} and the keys of its constants."""
+
+    def find(self, name):
+        for values, names, consts in reversed(self):
+            for key in names.get(name, ()):
+                if key in values:
+                    return values, key, consts
+        raise NameError(f"Variable '{name}' is not defined")
+
+    def load(self, name):
+        values, key, _ = self.find(name)
+        return values[key]
+
+    def store(self, name, value, op=None):
+        values, key, consts = self.find(name)
+        if key in consts:
+            raise ValueError(f"Cannot modify constant '{name}'")
+        if op is not None:
+            value = AUG_FUNCS[op](values[key], value)
+        values[key] = value
+        return value
+
+
+class PyEngine:
+    def __init__(self, ast, opt_level=1, use_cache=True):
+        self.ast = ast
+        self.opt_level = opt_level
+        self.use_cache = use_cache
+        self.global_env = None
+        self.loaded_modules = set()
+        self.source = None
+        # Result caches of `memo func` declarations, by function code.
+        self.memos = {}
+        # Where log and logln write, shared with modules.
+        self.output = Output()
+
+    def namespace(self):
+        frames = CallerFrames()
+        ns = {
+            "__name__": "__axion__",
+            "_count": _count,
+            "_undefined": _undefined,
+            "_const_error": _const_error,
+            "_raise": _raise,
+            "_discard": _discard,
+            "_aug": _aug,
+            "_aug_index": _aug_index,
+            "_set_index": _set_index,
+            "_put": _put,
+            "_frames": frames,
+            "_load": frames.load,
+            "_store": frames.store,
+            "_member": get_member,
+            "_invert": invert,
+            "_both": both,
+            "_either": either,
+            "_parse_input": parse_input,
+            "_iterate": iterate,
+            "_Map": Map,
+            "_log": self.output.log,
+            "_logln": self.output.logln,
+            "_input": self.output.input,
+            "_include": self.include,
+            "_memo": self.memoize,
+            "_ProgramExit": ProgramExit,
+        }
+        for name, impl in BUILTIN_FUNCTIONS.items():
+            ns["f_" + name] = impl
+            ns["v_" + name] = impl
+        return ns
+
+    def execute(self, module):
+        ns = self.namespace()
+        try:
+            with self.output:
+                exec(module.code, ns)
+        except ProgramExit as e:
+            return e.value, ns
+        except NameError as e:
+            raise translate_name_error(e) from None
+        return None, ns
+
+    def run(self):
+        module = CompiledModule(self.ast)
+        self.source = module.source
+        return self.execute(module)[0]
+
+    def memoize(self, fn, name, size):
+        memo = self.memos.get(fn.__code__)
+        if memo is None:
+            memo = self.memos[fn.__code__] = Memo(name, size)
+
+        def call(*args):
+            return memo.call(fn, args)
+        return call
+
+    def include(self, path):
+        if path in self.loaded_modules:
+            return None
+        native = load_module(path)
+        if native is not None:
+            self.loaded_modules.add(path)
+            return native
+        filename, source = read_module(path)
+        program = load_program(source, filename, self.opt_level, self.use_cache)
+        self.loaded_modules.add(path)
+        module = CompiledModule(program, f"<axion module {path}>")
+        _, ns = self.execute(module)
+        return {name: ns[pyname] for name, pyname in module.exports.items() if pyname in ns}
+
+
+def translate_name_error(error):
+    match = NAME_ERROR.search(str(error))
+    if match is None:
+        return error
+    kind, name = match.groups()
+    if kind == 'f':
+        return Exception(f"Error: Function '{name}' is not defined")
+    return NameError(f"Variable '{name}' is not defined")
@@ -0,0 +1,445 @@
+"""
+Stack virtual machine that executes code produced by `axion.compiler`.
+
+Each call runs in a `Frame` holding one value slot per declaration in the
+function. A frame's parent is the caller's frame, which is what names the
+resolver left unbound are looked up through.
+
+Calls between functions of the same program do not recurse in Python:
+`execute()` keeps the suspended callers on its own list, so recursion depth
+is limited only by memory, and a call directly followed by RETURN replaces
+the caller's frame instead of stacking a new one.
+"""
+
+from axion.compiler import *
+from axion.compiler import compile_program
+from axion.cache import read_module, load_code
+from axion.resolver import BUILTINS
+from axion.runtime import (RUNNING, Map, Memo, Output, iterate, parse_input, get_member,
+                           set_index)
+from axion.native import BUILTINS as NATIVE_BUILTINS, load_module
+
+
+class Function:
+    __slots__ = ('name', 'code', 'vm', 'memo')
+
+    def __init__(self, code, vm):
+        self.name = code.name
+        self.code = code
+        self.vm = vm
+        self.memo = None if code.memo is None else vm.memo_for(code)
+
+    def __call__(self, *args):
+        return self.vm.call(self, args, self.vm.global_frame)
+
+    def __repr__(self):
+        return f"<function {self.name}>"
+
+
+class Unset:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<unset>"
+
+
+UNSET = Unset()
+
+
+class Frame:
+    __slots__ = ('code', 'values', 'parent')
+
+    def __init__(self, code, values, parent):
+        self.code = code
+        self.values = values
+        self.parent = parent
+
+
+def new_frame(code, args, parent):
+    values = [UNSET] * code.nlocals
+    nparams = len(code.params)
+    # Parameters a call leaves out stay unset and are looked up by name.
+    values[:min(len(args), nparams)] = args[:nparams]
+    return Frame(code, values, parent)
+
+
+def find_dynamic(frame, name):
+    """Find the caller-chain frame and slot currently binding `name`."""
+    while frame is not None:
+        values = frame.values
+        for slot in frame.code.slots_by_name.get(name, ()):
+            if values[slot] is not UNSET:
+                return frame, slot
+        frame = frame.parent
+    raise NameError(f"Variable '{name}' is not defined")
+
+
+def store_dynamic(frame, name):
+    frame, slot = find_dynamic(frame, name)
+    if slot in frame.code.const_slots:
+        raise ValueError(f"Cannot modify constant '{name}'")
+    return frame.values, slot
+
+
+def uses_dynamic(code):
+    """Whether `code` or a function nested in it resolves names at run time."""
+    for op, arg in zip(code.ops, code.args):
+        if op in (LOAD_DYNAMIC, STORE_DYNAMIC, AUG_DYNAMIC):
+            return True
+        if op == CALL_NAME and arg[2] is None:
+            return True
+        if op == ASSIGN_INDEX and arg[1] is not None:
+            return True
+        if op == MAKE_FUNCTION and uses_dynamic(code.consts[arg]):
+            return True
+    return False
+
+
+class VM:
+    def __init__(self, ast=None, code=None, opt_level=1, use_cache=True):
+        self.ast = ast
+        self.code = code
+        self.opt_level = opt_level
+        self.use_cache = use_cache
+        self.global_frame = None
+        self.functions = {}
+        self.modules = {}
+        self.functions.update(NATIVE_BUILTINS)
+        # Whether any code of the program looks names up through parent
+        # frames, which keeps finished callers alive as parents.
+        self.dynamic = True
+        # Frames of returned calls, reused by later calls.
+        self.frame_pool = []
+        # Result caches of `memo func` declarations, shared with modules.
+        self.memos = {}
+        # Where log and logln write.
+        self.output = Output()
+
+    def run(self, host=None):
+        """Run the program. `host` is an optional frame that names the
+        program does not declare itself are looked up in."""
+        if self.code is None:
+            self.code = compile_program(self.ast)
+        self.dynamic = uses_dynamic(self.code)
+        self.global_frame = Frame(self.code, [UNSET] * self.code.nlocals, host)
+        for slot, name in enumerate(BUILTINS):
+            self.global_frame.values[slot] = self.functions[name]
+        with self.output:
+            return self.execute(self.code, self.global_frame)
+
+    def call(self, fn, args, parent):
+        if fn.memo is not None:
+            return fn.memo.call(lambda *a: fn.vm.execute(fn.code, new_frame(fn.code, a, parent)), args)
+        return fn.vm.execute(fn.code, new_frame(fn.code, args, parent))
+
+    def memo_for(self, code):
+        memo = self.memos.get(code)
+        if memo is None:
+            memo = self.memos[code] = Memo(code.name, code.memo)
+        return memo
+
+    def call_name(self, name, args, frame, location):
+        fn = self.functions.get(name)
+        if fn is not None:
+            if fn.__class__ is not Function:
+                return fn(*args)
+            return self.call(fn, args, frame)
+        if location is None:
+            try:
+                owner, slot = find_dynamic(frame, name)
+            except NameError:
+                raise Exception(f"Error: Function '{name}' is not defined")
+            func = owner.values[slot]
+        elif location[0] == LOCAL:
+            func = frame.values[location[1]]
+        else:
+            func = self.global_frame.values[location[1]]
+        if func is UNSET:
+            raise Exception(f"Error: Function '{name}' is not defined")
+        if not callable(func):
+            raise Exception(f"Error: Variable '{name}' is not callable")
+        return func(*args)
+
+    def handle_include(self, path):
+        module_dict = self.modules.get(path)
+        if module_dict is not None:
+            return module_dict
+        module_dict = load_module(path)
+        if module_dict is not None:
+            self.modules[path] = module_dict
+            return module_dict
+        filename, source = read_module(path)
+        code = load_code(source, filename, self.opt_level, self.use_cache)
+
+        module_vm = VM(code=code, opt_level=self.opt_level, use_cache=self.use_cache)
+        module_vm.modules = self.modules
+        module_vm.memos = self.memos
+        module_vm.output = self.output
+        module_vm.run()
+
+        module_dict = {}
+        values = module_vm.global_frame.values
+        for name, slot in module_vm.code.names.items():
+            if name not in BUILTINS and values[slot] is not UNSET:
+                module_dict[name] = values[slot]
+        for name, fn in module_vm.functions.items():
+            if fn.__class__ is Function:
+                module_dict[name] = fn
+        self.modules[path] = module_dict
+        return module_dict
+
+    def execute(self, code, frame):
+        ops = code.ops
+        args = code.args
+        consts = code.consts
+        functions = self.functions
+        values = frame.values
+        globals_ = self.global_frame.values
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        # Callers suspended by CALL_NAME: (code, pc, stack, frame).
+        calls = []
+        # Write to the run in progress: a function of a module shared by
+        # several runs (see axion.embed) may be called by a later run than
+        # the one that loaded the module.
+        output = RUNNING[-1] if RUNNING else self.output
+        log = output.log
+        logln = output.logln
+        pool = self.frame_pool
+        dynamic = self.dynamic
+
+        while True:
+            op = ops[pc]
+            arg = args[pc]
+            pc += 1
+
+            if op == LOAD_LOCAL:
+                push(values[arg])
+            elif op == LOAD_PARAM:
+                value = values[arg]
+                if value is UNSET:
+                    owner, slot = find_dynamic(frame.parent, code.slot_names[arg])
+                    value = owner.values[slot]
+                push(value)
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == BINARY_CONST:
+                fn, right = arg
+                stack[-1] = fn(stack[-1], right)
+            elif op == BINARY:
+                right = pop()
+                stack[-1] = arg(stack[-1], right)
+            elif op == STORE_LOCAL:
+                values[arg] = pop()
+            elif op == AUG_LOCAL:
+                slot, fn = arg
+                values[slot] = fn(values[slot], pop())
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == POP:
+                pop()
+            elif op == FOR_ITER:
+                counter = stack[-3]
+                if counter <= stack[-2]:
+                    stack[-3] = counter + stack[-1]
+                    values[arg[1]] = counter
+                else:
+                    pc = arg[0]
+            elif op == LOAD_GLOBAL:
+                value = globals_[arg[0]]
+                if value is UNSET:
+                    raise NameError(f"Variable '{arg[1]}' is not defined")
+                push(value)
+            elif op == CALL_NAME:
+                name, argc, location = arg
+                if argc:
+                    call_args = stack[-argc:]
+                    del stack[-argc:]
+                else:
+                    call_args = []
+                fn = functions.get(name)
+                if fn.__class__ is Function and fn.vm is self and fn.memo is None:
+                    # Calls to functions of this program (not of an included
+                    # module, which has its own globals) switch frames in
+                    # this loop instead of recursing into execute().
+                    fn_code = fn.code
+                    fn_values = [UNSET] * fn_code.nlocals
+                    nparams = len(fn_code.params)
+                    if argc == nparams:
+                        fn_values[:argc] = call_args
+                    elif argc > nparams:
+                        fn_values[:nparams] = call_args[:nparams]
+                    else:
+                        fn_values[:argc] = call_args
+                    if ops[pc] != RETURN:
+                        calls.append((code, pc, stack, frame))
+                        parent = frame
+                        frame = pool.pop() if pool else Frame(None, None, None)
+                        frame.parent = parent
+                    elif dynamic or argc < nparams or frame is self.global_frame:
+                        # Tail call: nothing is left to run in the caller,
+                        # but its frame must stay reachable as the callee's
+                        # parent when names, including parameters the call
+                        # left out, are looked up through parents.
+                        frame = Frame(None, None, frame)
+                    # Otherwise a tail call reuses the caller's frame, keeping
+                    # its parent, so the call stack does not grow.
+                    frame.code = code = fn_code
+                    frame.values = values = fn_values
+                    ops = code.ops
+                    args = code.args
+                    consts = code.consts
+                    stack = []
+                    push = stack.append
+                    pop = stack.pop
+                    pc = 0
+                else:
+                    push(self.call_name(name, call_args, frame, location))
+            elif op == RETURN:
+                value = pop()
+                if not calls:
+                    return value
+                if not dynamic:
+                    frame.values = frame.parent = None
+                    pool.append(frame)
+                code, pc, stack, frame = calls.pop()
+                ops = code.ops
+                args = code.args
+                consts = code.consts
+                values = frame.values
+                push = stack.append
+                pop = stack.pop
+                push(value)
+            elif op == STORE_GLOBAL:
+                slot, name = arg
+                if globals_[slot] is UNSET:
+                    raise NameError(f"Variable '{name}' is not defined")
+                globals_[slot] = pop()
+            elif op == AUG_GLOBAL:
+                slot, name, fn = arg
+                if globals_[slot] is UNSET:
+                    raise NameError(f"Variable '{name}' is not defined")
+                globals_[slot] = fn(globals_[slot], pop())
+            elif op == LOAD_DYNAMIC:
+                owner, slot = find_dynamic(frame, arg)
+                push(owner.values[slot])
+            elif op == STORE_PARAM:
+                if values[arg] is UNSET:
+                    target, slot = store_dynamic(frame.parent, code.slot_names[arg])
+                    target[slot] = pop()
+                else:
+                    values[arg] = pop()
+            elif op == AUG_PARAM:
+                slot, fn = arg
+                if values[slot] is UNSET:
+                    target, slot = store_dynamic(frame.parent, code.slot_names[slot])
+                    target[slot] = fn(target[slot], pop())
+                else:
+                    values[slot] = fn(values[slot], pop())
+            elif op == STORE_DYNAMIC:
+                target, slot = store_dynamic(frame, arg)
+                target[slot] = pop()
+            elif op == AUG_DYNAMIC:
+                name, fn = arg
+                target, slot = store_dynamic(frame, name)
+                target[slot] = fn(target[slot], pop())
+            elif op == LOAD_FUNCTION:
+                push(functions.get(arg))
+            elif op == INDEX:
+                index = pop()
+                stack[-1] = stack[-1][index]
+            elif op == UNARY:
+                stack[-1] = arg(stack[-1])
+            elif op == JUMP_IF_TRUE:
+                if pop():
+                    pc = arg
+            elif op == DUP:
+                push(stack[-1])
+            elif op == POP_N:
+                del stack[-arg:]
+            elif op == ASSIGN_INDEX:
+                fn, const_name = arg
+                index = pop()
+                arr = pop()
+                if const_name is not None:
+                    store_dynamic(frame, const_name)
+                value = stack[-1]
+                if fn is None:
+                    set_index(arr, index, value)
+                else:
+                    arr[index] = fn(arr[index], value)
+                stack[-1] = arr[index]
+            elif op == LOAD_MEMBER:
+                stack[-1] = get_member(stack[-1], arg)
+            elif op == CALL_MEMBER:
+                prop, argc = arg
+                call_args = stack[len(stack) - argc:]
+                del stack[len(stack) - argc:]
+                obj = stack[-1]
+                func = None
+                if isinstance(obj, dict) and prop in obj:
+                    func = obj[prop]
+                elif hasattr(obj, prop):
+                    func = getattr(obj, prop)
+                if not callable(func):
+                    raise Exception(f"Error: '{prop}' is not callable on {obj}")
+                stack[-1] = func(*call_args)
+            elif op == CALL_INDEX:
+                call_args = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                index = pop()
+                func = stack[-1][index]
+                if not callable(func):
+                    raise Exception(f"Error: Element at index {index} is not callable")
+                stack[-1] = func(*call_args)
+            elif op == BUILD_LIST:
+                items = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                push(items)
+            elif op == BUILD_STRING:
+                parts = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                push("".join([str(p) for p in parts]))
+            elif op == LOGLN:
+                logln(pop())
+            elif op == LOG:
+                log(pop())
+            elif op == INPUT:
+                stack[-1] = parse_input(output.input(str(stack[-1])))
+            elif op == NEXT_ITER:
+                # One step of a for loop: the item, or the else at the end.
+                for item in stack[-1]:
+                    values[arg[1]] = item
+                    break
+                else:
+                    pc = arg[0]
+            elif op == GET_ITER:
+                stack[-1] = iterate(stack[-1])
+            elif op == BUILD_MAP:
+                items = stack[len(stack) - 2 * arg:]
+                del stack[len(stack) - 2 * arg:]
+                push(Map(zip(items[::2], items[1::2])))
+            elif op == MATCH_CASE:
+                try:
+                    pc = arg.get(pop(), pc)
+                except TypeError:
+                    # Lists and maps equal no literal: fall through to else.
+                    pass
+            elif op == CLEAR_SLOTS:
+                for slot in arg:
+                    values[slot] = UNSET
+            elif op == MAKE_FUNCTION:
+                fn_code = consts[arg]
+                functions[fn_code.name] = Function(fn_code, self)
+            elif op == INCLUDE:
+                push(self.handle_include(arg))
+            elif op == RAISE:
+                exc_type, message = arg
+                raise exc_type(message)
+            else:
+                raise RuntimeError(f"Unknown opcode {op}")
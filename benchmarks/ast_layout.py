@@ -0,0 +1,67 @@
+"""
+Compare the memory used by the slotted AST against the dict layout it
+replaced (as produced by `to_dict()`), and time the tree-walking engine.
+
+    PYTHONPATH=. python benchmarks/ast_layout.py [copies]
+"""
+
+import io
+import sys
+import time
+import tracemalloc
+import contextlib
+
+from axion.lexer import tokenization
+from axion.parser import parser
+from axion.interpreter import Interpreter
+
+SAMPLE = """
+func weight(a, b) {
+    if (a > b) then {
+        return a * 2 - b;
+    } else {
+        return b % 7 + a;
+    }
+}
+loop (i from 1 to 40 step 1) {
+    total += weight(i, 20) * 3;
+    set items = [i, i + 1, i + 2];
+    match (i % 3) {
+        0 -> total -= items[0];
+        1 -> total += items[1];
+        else -> total += 1;
+    }
+}
+"""
+
+
+def retained(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tokens = tokenization("set total = 0;" + SAMPLE * copies)
+
+    program, node_bytes = retained(lambda: parser(tokens).parse_program())
+    _, dict_bytes = retained(program.to_dict)
+    print(f"statements: {len(program.body)}")
+    print(f"nodes:      {node_bytes / 1e6:8.2f} MB")
+    print(f"dicts:      {dict_bytes / 1e6:8.2f} MB  ({dict_bytes / node_bytes:.1f}x)")
+
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            Interpreter(program).run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"tree eval:  {best:8.3f} s (best of 5)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Lexer throughput on generated sources of growing size. Time per MB should
+stay flat as the input grows.
+
+    PYTHONPATH=. python benchmarks/lexer_throughput.py [max_mb]
+"""
+
+import sys
+import time
+
+from axion.lexer import tokenize
+
+CHUNK = """// running totals
+set total_{n} = 0;
+loop (i from 1 to 100 step 1) {
+    /* weighted step */
+    total_{n} += i * 2 % 7 << 1;
+    if (total_{n} >= 1000 both i != 3) then {
+        logln("total={total_{n}} i={i}");
+    }
+}
+"""
+
+
+def generate(size):
+    parts = []
+    length = 0
+    n = 0
+    while length < size:
+        chunk = CHUNK.replace("{n}", str(n))
+        parts.append(chunk)
+        length += len(chunk)
+        n += 1
+    return "".join(parts)
+
+
+def main():
+    max_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    mb = 1
+    while mb <= max_mb:
+        source = generate(mb * 1024 * 1024)
+        start = time.perf_counter()
+        count = 0
+        for _ in tokenize(source):
+            count += 1
+        elapsed = time.perf_counter() - start
+        print(f"{mb:3d} MB  {count:9d} tokens  {elapsed:7.3f} s  "
+              f"{elapsed / mb:6.3f} s/MB  {mb / elapsed:6.2f} MB/s")
+        mb *= 2
+
+
+if __name__ == "__main__":
+    main()
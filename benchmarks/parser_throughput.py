@@ -0,0 +1,55 @@
+"""
+Parser throughput on generated programs of growing size. Tokens are lexed
+up front so only `parser.parse_program()` is timed.
+
+    PYTHONPATH=. python benchmarks/parser_throughput.py [max_kb]
+"""
+
+import sys
+import time
+
+from axion.lexer import tokenize
+from axion.parser import parser
+
+CHUNK = """set total_{n} = 0;
+func step_{n}(a, b) {
+    return (a * 3 + b % 7) << 1 >= b - 2 both a != b any invert a;
+}
+loop (i from 1 to 100 step 1) {
+    total_{n} += step_{n}(i, total_{n}) * nums[i % 3] - -i;
+    if (total_{n} >= 1000 both i != 3) then {
+        logln("total={total_{n}} i={i}");
+    } else {
+        total_{n} = math.max(total_{n} / 2, [1, 2, nums[i % 3] & 255 | 16]);
+    }
+}
+"""
+
+
+def generate(size):
+    parts = []
+    length = 0
+    n = 0
+    while length < size:
+        chunk = CHUNK.replace("{n}", str(n))
+        parts.append(chunk)
+        length += len(chunk)
+        n += 1
+    return "".join(parts)
+
+
+def main():
+    max_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    kb = 64
+    while kb <= max_kb:
+        tokens = list(tokenize(generate(kb * 1024)))
+        start = time.perf_counter()
+        parser(tokens).parse_program()
+        elapsed = time.perf_counter() - start
+        print(f"{kb:5d} KB  {len(tokens):8d} tokens  {elapsed:7.3f} s  "
+              f"{len(tokens) / elapsed / 1e6:5.2f} M tokens/s")
+        kb *= 2
+
+
+if __name__ == "__main__":
+    main()
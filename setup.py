@@ -4,6 +4,10 @@ setup(
     name="axion",
     version="0.1",
     packages=find_packages(),
+    package_data={
+        'axion.stdlib': ['*.ax'],
+        'axion.corpus': ['*.ax'],
+    },
     entry_points={
         'console_scripts': [
             'axion=axion.cli:main',
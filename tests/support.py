@@ -0,0 +1,44 @@
+"""
+Helpers shared by the tests: run a program on an engine and capture what
+it prints, the way `axion run` does.
+"""
+
+import io
+
+from axion.ast import to_dict
+from axion.cache import load_program, load_code
+from axion.cli import ENGINES
+from axion.lexer import tokenize
+from axion.parser import parser
+from axion.runtime import Output
+
+
+def load(source, engine="vm", opt_level=1, filename="<test>", use_cache=False):
+    """The `engine` interpreter for `source`, ready to run."""
+    options = dict(opt_level=opt_level, use_cache=use_cache)
+    if engine == "vm":
+        return ENGINES[engine](code=load_code(source, filename, **options), **options)
+    return ENGINES[engine](load_program(source, filename, **options), **options)
+
+
+def run(source, engine="vm", opt_level=1, filename="<test>", use_cache=False):
+    """Run `source` on `engine` and return its output, ending with the
+    "Error: ..." line `axion run` prints when the program fails."""
+    out = io.StringIO()
+    try:
+        program = load(source, engine, opt_level, filename, use_cache)
+        program.output = Output(out)
+        program.run()
+    except Exception as e:
+        out.write(f"Error: {e}\n")
+    return out.getvalue()
+
+
+def parse(source, compat=True):
+    return parser(tokenize(source), compat).parse_program()
+
+
+def same_tree(a, b):
+    """Whether two trees have the same shape and fields. Nodes themselves
+    compare by identity; `line` is not a field, so it is ignored."""
+    return to_dict(a) == to_dict(b)
@@ -0,0 +1,12 @@
+from axion import bench
+
+
+def test_default_corpus_comes_from_the_package():
+    names = [name for name, _ in bench.find_benchmarks([], source_kb=1)]
+    assert bench.GENERATED in names
+    assert {"fib", "match_dispatch", "nested_loops"} <= set(names)
+
+
+def test_sample_times_every_phase():
+    timings = bench.sample("set x = 1 + 2;", "vm", 1)
+    assert set(timings) == set(bench.PHASES)
@@ -0,0 +1,52 @@
+"""
+The on-disk cache: entries are reused while the source and the native
+modules it includes stay the same, and rebuilt when either changes.
+"""
+
+import os
+
+import pytest
+
+from axion import native
+from axion.cache import CACHE_DIR
+
+from support import run
+
+
+SOURCE = 'include "cachetest";\nlogln(cachetest.scale(21));\n'
+
+
+def double(x):
+    return x * 2
+
+
+def triple(x):
+    return x * 3
+
+
+@pytest.fixture
+def script(tmp_path):
+    yield str(tmp_path / "main.ax")
+    native.MODULES.pop("cachetest", None)
+
+
+def register(impl):
+    native.register_module("cachetest", {"scale": {"impl": impl, "arity": 1, "pure": True}})
+
+
+@pytest.mark.parametrize("engine", ["vm", "tree"])
+def test_entries_are_reused(engine, script):
+    register(double)
+    assert run(SOURCE, engine, filename=script, use_cache=True) == "42\n"
+    assert os.listdir(os.path.join(os.path.dirname(script), CACHE_DIR))
+    assert run(SOURCE, engine, filename=script, use_cache=True) == "42\n"
+
+
+@pytest.mark.parametrize("engine", ["vm", "tree"])
+def test_changed_native_module_rebuilds(engine, script):
+    register(double)
+    assert run(SOURCE, engine, filename=script, use_cache=True) == "42\n"
+    # `scale(21)` was folded into the cached program: a new implementation
+    # has to invalidate it.
+    register(triple)
+    assert run(SOURCE, engine, filename=script, use_cache=True) == "63\n"
@@ -0,0 +1,87 @@
+"""
+The VM keeps Axion calls on its own stack, so recursion is not limited by
+Python's, and a call in tail position does not grow it.
+"""
+
+import pytest
+
+from support import run
+
+ENGINES = ("vm", "tree", "py")
+
+
+def test_deep_recursion():
+    source = """
+func down(n) { if (n == 0) then { return 0; } return 1 + down(n - 1); }
+logln(down(20000));
+"""
+    assert run(source, "vm") == "20000\n"
+
+
+def test_tail_calls():
+    source = """
+func count(n, acc) { if (n == 0) then { return acc; } return count(n - 1, acc + 1); }
+logln(count(300000, 0));
+"""
+    assert run(source, "vm") == "300000\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_mutual_recursion(engine):
+    source = """
+func is_even(n) { if (n == 0) then { return 1; } return is_odd(n - 1); }
+func is_odd(n) { if (n == 0) then { return 0; } return is_even(n - 1); }
+logln(is_even(10));
+logln(is_odd(7));
+"""
+    assert run(source, engine) == "1\n1\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tail_call_in_a_loop_returns(engine):
+    source = """
+func id(x) { return x; }
+func first(xs, n) { loop (i from 0 to n - 1 step 1) { return id(xs[i]); } return -1; }
+logln(first([7, 8], 2));
+logln(first([], 0));
+"""
+    assert run(source, engine) == "7\n-1\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_error_inside_a_call(engine):
+    source = """
+func inner() { logln("in"); return missing; }
+func outer() { return inner(); }
+outer();
+"""
+    assert run(source, engine) == "in\nError: Variable 'missing' is not defined\n"
+
+
+MISSING_ARGUMENTS = """
+func show(a, b) { logln(b); }
+set b = 5;
+show(1);
+func caller() { set b = 7; show(1); }
+caller();
+func tail() { set b = 8; return show(1); }
+tail();
+func block() { if (1) then { set b = 9; } show(1); }
+block();
+func bump(a, b) { b += 1; }
+bump(1);
+logln(b);
+memo func twice(a, b) { return b * 2; }
+logln(twice(1));
+func missing(x, y) { logln(y); }
+missing(1);
+"""
+
+
+@pytest.mark.parametrize("opt_level", [0, 1])
+@pytest.mark.parametrize("engine", ["vm", "tree"])
+def test_missing_arguments_are_looked_up(engine, opt_level):
+    # A parameter the call leaves out is not bound: reading or assigning it
+    # reaches the caller's variable of the same name, or fails.
+    assert run(MISSING_ARGUMENTS, engine, opt_level) == (
+        "5\n7\n8\n5\n6\n12\nError: Variable 'y' is not defined\n")
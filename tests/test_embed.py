@@ -0,0 +1,28 @@
+import io
+
+import axion
+
+
+def run_twice(program, **globals):
+    outputs = []
+    for run in range(2):
+        out = io.StringIO()
+        env = {name: value + run for name, value in globals.items()}
+        program.run(globals=env, stdout=out)
+        outputs.append(out.getvalue())
+    return outputs
+
+
+def test_globals_in_and_out():
+    program = axion.compile("set doubled = price * 2; price = price + 1; return doubled;")
+    env = {"price": 21}
+    assert program.run(globals=env, stdout=io.StringIO()) == 42
+    assert env == {"price": 22, "doubled": 42}
+
+
+def test_module_output_goes_to_each_run(tmp_path, monkeypatch):
+    # The module is loaded by the first run and shared with the second.
+    (tmp_path / "mod.ax").write_text('func hello(n) { logln("hello {n}"); }\n')
+    monkeypatch.chdir(tmp_path)
+    program = axion.compile('include "./mod.ax";\nmod.hello(x);\nlogln("main {x}");\n')
+    assert run_twice(program, x=0) == ["hello 0\nmain 0\n", "hello 1\nmain 1\n"]
@@ -0,0 +1,36 @@
+"""
+The engines run the same language: every program in tests/programs and
+the benchmark corpus prints the same thing on each of them, optimized or
+not.
+"""
+
+import os
+
+import pytest
+
+from axion.bench import corpus
+from support import run
+
+PROGRAMS = os.path.join(os.path.dirname(__file__), "programs")
+ENGINES = ("vm", "tree", "py")
+
+
+def programs():
+    found = []
+    for name in sorted(os.listdir(PROGRAMS)):
+        if name.endswith(".ax"):
+            with open(os.path.join(PROGRAMS, name)) as f:
+                found.append(pytest.param(f.read(), id=name))
+    found += [pytest.param(source, id=f"corpus/{name}") for name, source in corpus()]
+    return found
+
+
+@pytest.mark.parametrize("source", programs())
+def test_engines_agree(source, monkeypatch):
+    # Includes are relative to the directory the program runs from.
+    monkeypatch.chdir(PROGRAMS)
+    expected = run(source, "tree")
+    assert expected
+    for engine in ENGINES:
+        for opt_level in (0, 1):
+            assert run(source, engine, opt_level) == expected, (engine, opt_level)
@@ -0,0 +1,56 @@
+import pytest
+
+from support import run
+
+ENGINES = ("vm", "tree", "py")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("source, output", [
+    ("loop (x in [1, 2, 3]) { log(x); }", "123"),
+    ('loop (c in "héllo") { log("{c}."); }', "h.é.l.l.o."),
+    ("loop (i in range(3)) { log(i); }", "012"),
+    ("loop (i in range(2, 5)) { log(i); }", "234"),
+    ("loop (i in range(6, 0, -2)) { log(i); }", "642"),
+    ("loop (x in []) { log(x); } log(\"done\");", "done"),
+])
+def test_loop_in(engine, source, output):
+    assert run(source, engine) == output
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_range_is_lazy(engine):
+    source = """
+set total = 0;
+loop (i in range(1000000000000)) { if (i == 4) then { break; } total += i; }
+logln(total);
+"""
+    assert run(source, engine) == "6\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_native_iterator(engine, tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_text("one\ntwo\nthree\n")
+    source = f'include "io";\nloop (line in io.lines("{path}")) {{ log("<{{line}}>"); }}'
+    assert run(source, engine) == "<one><two><three>"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("source, error", [
+    ("loop (x in 5) { }", "Cannot loop over 5"),
+    ("range(1.5);", "range() arguments must be integers, got 1.5"),
+    ("range(1, 5, 0);", "range() step must not be zero"),
+])
+def test_errors(engine, source, error):
+    assert run(source, engine) == f"Error: {error}\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_list_changed_while_looping(engine):
+    source = """
+set xs = [1, 2];
+set n = 2;
+loop (x in xs) { if (x < 4) then { xs[n] = x + 2; n += 1; } log(x); }
+"""
+    assert run(source, engine) == "12345"
@@ -0,0 +1,54 @@
+import pytest
+
+from support import run
+
+ENGINES = ("vm", "tree", "py")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_get_set_and_builtins(engine):
+    source = """
+set m = {"a": 1, 2: "two"};
+m["b"] = 3;
+m["a"] += 1;
+logln(m["a"]);
+logln(m[2]);
+logln(has(m, "b"));
+logln(keys(m));
+logln(remove(m, 2));
+logln(m);
+"""
+    assert run(source, engine) == ("2\ntwo\nTrue\n['a', 2, 'b']\ntwo\n"
+                                   "{'a': 2, 'b': 3}\n")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("source, error", [
+    ('set m = {"a": 1}; logln(m["b"]);', "Key 'b' not found in map"),
+    ('set m = {}; remove(m, "b");', "Key 'b' not found in map"),
+    ("keys([1, 2]);", "keys() expects a map, got [1, 2]"),
+])
+def test_errors(engine, source, error):
+    assert run(source, engine).endswith(f"Error: {error}\n")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_map_shaped_like_a_return_signal(engine):
+    # The tree engine returns {"type": "return", ...} dicts internally.
+    source = """
+func make() { set r = {"type": "return", "value": 1}; return r; }
+func body() { set r = {"type": "return", "value": 2}; r; return 3; }
+logln(make());
+logln(body());
+"""
+    assert run(source, engine) == "{'type': 'return', 'value': 1}\n3\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_loop_over_keys_in_order(engine):
+    source = """
+set m = {"z": 1, "a": 2};
+m["m"] = 3;
+loop (k in m) { log(k); }
+"""
+    assert run(source, engine) == "zam"
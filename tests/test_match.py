@@ -0,0 +1,67 @@
+"""
+Matches on literal cases look the subject up in a table; the py engine
+only builds one for 16 cases or more, so each test runs below and above
+that.
+"""
+
+import pytest
+
+from support import run
+
+ENGINES = ("vm", "tree", "py")
+
+
+def classify(extra_cases):
+    filler = "".join(f'        {100 + i} -> r = "filler";\n' for i in range(extra_cases))
+    return f"""
+func classify(x) {{
+    set r = "";
+    match (x) {{
+        1 -> r = "one";
+        "a" -> r = "letter";
+        1 -> r = "second one";
+        2.5 -> r = "float";
+{filler}        else -> r = "other";
+    }}
+    return r;
+}}
+"""
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("extra_cases", [0, 20])
+@pytest.mark.parametrize("subject, result", [
+    ("1", "one"),
+    ("1.0", "one"),
+    ("1 == 1", "one"),
+    ('"a"', "letter"),
+    ("2.5", "float"),
+    ("3", "other"),
+    ('"1"', "other"),
+    ("[1]", "other"),
+    ('{"a": 1}', "other"),
+])
+def test_first_equal_case(engine, extra_cases, subject, result):
+    source = classify(extra_cases) + f"logln(classify({subject}));"
+    assert run(source, engine) == f"{result}\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("extra_cases", [0, 20])
+def test_cases_with_expressions_run_in_order(engine, extra_cases):
+    filler = "".join(f"    {100 + i} -> logln(\"filler\");\n" for i in range(extra_cases))
+    source = f"""
+func f(n) {{ log("f{{n}} "); return n; }}
+match (2) {{
+{filler}    f(1) -> logln("one");
+    f(2) -> logln("two");
+    f(3) -> logln("three");
+}}
+"""
+    assert run(source, engine) == "f1 f2 two\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_no_case_and_no_else(engine):
+    source = 'match ("x") { "y" -> logln("y"); }\nlogln("after");'
+    assert run(source, engine) == "after\n"
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from axion.runtime import Output
+from support import load, run
+
+ENGINES = ("vm", "tree", "py")
+
+
+def run_memos(source, engine):
+    """(output, {name: Memo}) of running `source`."""
+    program = load(source, engine)
+    out = io.StringIO()
+    program.output = Output(out)
+    program.run()
+    return out.getvalue(), {memo.name: memo for memo in program.memos.values()}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_hits_and_misses(engine):
+    source = """
+memo func fib(n) {
+    if (n < 2) then { return n; }
+    return fib(n - 1) + fib(n - 2);
+}
+logln(fib(30));
+logln(fib(30));
+"""
+    output, memos = run_memos(source, engine)
+    assert output == "832040\n832040\n"
+    assert (memos["fib"].hits, memos["fib"].misses) == (29, 31)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_least_recently_used_is_dropped(engine):
+    source = """
+memo(2) func sq(x) { log("<{x}>"); return x * x; }
+sq(1); sq(2); sq(1); sq(3); sq(1); sq(2);
+"""
+    output, memos = run_memos(source, engine)
+    assert output == "<1><2><3><2>"
+    assert list(memos["sq"].results) == [(1, int), (2, int)]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_argument_types_are_part_of_the_key(engine):
+    source = 'memo func f(x) { log("<{x}>"); return x; }\nlogln(f(1)); logln(f(1.0)); logln(f(1));'
+    assert run(source, engine) == "<1>1\n<1.0>1.0\n1\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_lists_are_not_cached(engine):
+    source = """
+memo func total(xs) { log("<sum>"); return xs[0] + xs[1]; }
+set xs = [1, 2];
+logln(total(xs));
+xs[1] = 5;
+logln(total(xs));
+"""
+    output, memos = run_memos(source, engine)
+    assert output == "<sum>3\n<sum>6\n"
+    assert (memos["total"].hits, memos["total"].misses) == (0, 2)
+
+
+@pytest.mark.parametrize("size", ["0", "2.5"])
+def test_bad_size(size):
+    source = f"memo({size}) func f(x) {{ return x; }}"
+    assert run(source).startswith("Error: memo size must be a positive integer")
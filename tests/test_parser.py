@@ -0,0 +1,32 @@
+"""
+The precedence parser against the trees the recursive-descent parser
+built, quirks included.
+"""
+
+import pytest
+
+from support import parse, same_tree
+
+
+COMPAT = [
+    ("set a = 2 + 3 << 1;", "set a = (2 + 3) << 1;"),
+    ("set a = 1 << 2 + 1;", "set a = (1 << 2) + 1;"),
+    ("set a = 1 + 2 * 3 - 4;", "set a = (1 + (2 * 3)) - 4;"),
+    ("set a = x < y + 1 == z;", "set a = (x < (y + 1)) == z;"),
+    ("set a = -x * y both z;", "set a = ((-x) * y) both z;"),
+]
+
+
+@pytest.mark.parametrize("source, grouped", COMPAT)
+def test_compat_grouping(source, grouped):
+    assert same_tree(parse(source), parse(grouped))
+
+
+def test_lines_are_not_compared():
+    assert same_tree(parse("set a = 1;"), parse("\n\nset a = 1;"))
+
+
+def test_nodes_compare_by_identity():
+    a, b = parse("set a = 1;"), parse("set a = 1;")
+    assert a != b
+    assert len({a, b}) == 2
@@ -0,0 +1,118 @@
+"""
+Functions run in their caller's scope: a free name in a function body is
+looked up in the blocks of its callers, innermost first, and a block's
+names are gone once it is left.
+"""
+
+import pytest
+
+from support import run
+
+ENGINES = ("vm", "tree", "py")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_callee_sees_loop_variable(engine):
+    source = """
+func show_i() { logln(i); }
+loop (i from 1 to 2 step 1) { show_i(); }
+func show_k() { logln(k); }
+loop (k in [3, 4]) { show_k(); }
+"""
+    assert run(source, engine) == "1\n2\n3\n4\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_callee_sees_block_local(engine):
+    source = """
+func show() { logln(x); }
+func caller() { if (1) then { set x = 5; show(); } }
+caller();
+"""
+    assert run(source, engine) == "5\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_innermost_block_first(engine):
+    source = """
+func show() { logln(y); }
+func outer() {
+    set y = "outer";
+    if (1) then { set y = "inner"; show(); }
+    show();
+}
+outer();
+"""
+    assert run(source, engine) == "inner\nouter\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_assignment_reaches_block_local(engine):
+    source = """
+func bump() { n += 1; }
+if (1) then { set n = 1; bump(); bump(); logln(n); }
+"""
+    assert run(source, engine) == "3\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("body", [
+    # left normally
+    "if (1) then { set z = 1; }",
+    # left by break
+    "loop (j from 1 to 3 step 1) { set z = j; if (j == 2) then { break; } }",
+    # declared by an earlier iteration only
+    "loop (j from 1 to 2 step 1) { if (j == 2) then { seez(); } set z = j; }",
+    # left by skip
+    "loop (j from 1 to 2 step 1) { if (j == 1) then { set z = 1; skip; } seez(); }",
+    # a match arm
+    "match (1) { 1 -> set z = 1; }",
+])
+def test_left_block_is_not_visible(engine, body):
+    source = f"func seez() {{ logln(z); }}\n{body}\nseez();\n"
+    assert run(source, engine).endswith("Error: Variable 'z' is not defined\n")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_global_read_while_another_function_shadows_it(engine):
+    source = """
+set x = 1;
+func show() { logln(x); }
+func other(x) { return x; }
+func caller() { set x = 5; show(); }
+show();
+caller();
+logln(other(3));
+"""
+    assert run(source, engine) == "1\n5\n3\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_constant_in_callers_scope(engine):
+    source = """
+func bump() { n += 1; }
+func caller() { const n = 1; bump(); }
+caller();
+"""
+    assert run(source, engine) == "Error: Cannot modify constant 'n'\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_assignment_expression_to_callers_variable(engine):
+    source = """
+func set_it() { return (v = 7); }
+func caller() { set v = 1; logln(set_it()); logln(v); }
+caller();
+"""
+    assert run(source, engine) == "7\n7\n"
+
+
+def test_functions_of_globals():
+    source = """
+set total = 0;
+func add(n) { total += n; return total; }
+loop (k from 1 to 3 step 1) { add(k); }
+logln(total);
+"""
+    for engine in ENGINES:
+        assert run(source, engine) == "6\n"
@@ -0,0 +1,46 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from axion.server import Server, init_worker
+
+
+@pytest.mark.parametrize("requested, budget", [
+    (None, 2.0), (0.5, 0.5), (5, 2.0), (0, 2.0), (-1, 2.0), ("1", 2.0), (True, 2.0),
+    (float("nan"), 2.0), (float("inf"), 2.0),
+])
+def test_budget_is_capped_by_the_server(requested, budget):
+    assert Server(timeout=2.0).budget(requested) == budget
+
+
+def test_budget_without_a_server_budget():
+    server = Server(timeout=0)
+    assert server.budget(0.5) == 0.5
+    assert server.budget(-1) is None
+
+
+def handle(server, request):
+    async def go():
+        server.pool = ProcessPoolExecutor(1, initializer=init_worker, initargs=(1,))
+        try:
+            return await server.handle(request)
+        finally:
+            server.pool.shutdown(cancel_futures=True)
+    return asyncio.run(go())
+
+
+@pytest.mark.parametrize("timeout", [0, -5])
+def test_non_positive_timeout_is_still_bounded(timeout):
+    reply = handle(Server(workers=1, timeout=0.3),
+                   {"id": 7, "source": "while (1) {}", "timeout": timeout})
+    assert reply["id"] == 7
+    assert not reply["ok"]
+    assert reply["error"] == "timed out after 0.3 s"
+
+
+def test_script_result():
+    reply = handle(Server(workers=1), {"id": 1, "source": "logln(price); return price * 2;",
+                                       "globals": {"price": 21}})
+    assert reply["ok"]
+    assert (reply["result"], reply["output"]) == (42, "21\n")
@@ -0,0 +1,29 @@
+"""
+The py engine compiles Axion to Python source; these programs once gave a
+different result there than on the other engines.
+"""
+
+import pytest
+
+from support import run
+
+ENGINES = ("vm", "tree", "py")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("opt_level", [0, 1])
+@pytest.mark.parametrize("source, output", [
+    ("set b = 0 both (1/0);", "Error: division by zero\n"),
+    ("set b = 1 any missing;", "Error: Variable 'missing' is not defined\n"),
+    ("set xs = [1]; set b = 0 both xs[5];", "Error: list index out of range\n"),
+    ("set a = 2; logln(0 both a); logln(3 any a);", "0\n3\n"),
+])
+def test_both_and_any_evaluate_the_right_operand(engine, opt_level, source, output):
+    assert run(source, engine, opt_level) == output
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("opt_level", [0, 1])
+def test_number_literals(engine, opt_level):
+    source = "set a = 007; logln(a); logln(00.50 + 1); logln(a - 010);"
+    assert run(source, engine, opt_level) == "7\n1.5\n-3\n"